@@ -0,0 +1,265 @@
+# asincrono.py
+"""
+Fachada asyncio sobre los managers, para servicios asíncronos (tablero web, notificaciones).
+
+Cada llamada corre el método sync del manager (mismo SQL, mismas validaciones) en un hilo:
+- Lecturas: pool de `lectores` hilos. Cada hilo tiene su conexión de solo lectura y cada llamada
+  corre dentro de un Database.snapshot(), así que ve un estado consistente de la base.
+- Escrituras: un único hilo con su propia conexión de escritura (dao.escritor.EscritorAgrupado):
+  quedan serializadas y, bajo carga, se confirman de a lotes en una transacción (group commit).
+- `max_concurrencia` limita las llamadas en curso por event loop (el resto espera su turno).
+- Cancelar la tarea que espera cancela la llamada: si todavía no empezó no se ejecuta; una lectura
+  en curso se interrumpe (Connection.interrupt); una escritura en curso termina igual.
+- `iterar` recorre resultados grandes en lotes con `async for`, con contrapresión: el hilo lector
+  no se adelanta más de COLA_LOTES lotes al consumidor.
+
+Uso:
+    movs = await AsyncMovimientoManager.internaciones_abiertas()
+    mov = await AsyncMovimientoManager.ingresar(cama_id=1, paciente_id=2, medico_id=3, fecha_ingreso=ahora)
+    async with aclosing(ejecutor_por_defecto().iterar(*MovimientoManager._consulta_ingresados_entre(a, b))) as lotes:
+        async for lote in lotes:
+            ...
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlite3 import Connection
+from typing import Any, AsyncIterator, Callable
+
+from dao.conn import Database
+from dao.escritor import EscritorAgrupado
+from dao.managers import (
+    BaseManager,
+    SQLBuilder,
+    PacienteManager,
+    MedicoManager,
+    HabitacionManager,
+    CamaManager,
+    MovimientoManager,
+)
+
+LECTORES = 4
+MAX_CONCURRENCIA = 32
+COLA_LOTES = 2
+_FIN = object()
+
+
+class _Trabajo:
+    """Una llamada enviada a un hilo. Cancelable antes de empezar y, si es lectura, en curso."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cancelado = False
+        self._conexion: Connection | None = None
+
+    def empezar(self, conexion: Connection | None) -> None:
+        with self._lock:
+            if self.cancelado:
+                raise concurrent.futures.CancelledError()
+            self._conexion = conexion
+
+    def terminar(self) -> None:
+        with self._lock:
+            self._conexion = None
+
+    def cancelar(self) -> None:
+        # Bajo el lock: interrupt() solo alcanza a la consulta de este trabajo, no a la siguiente del hilo.
+        with self._lock:
+            self.cancelado = True
+            if self._conexion is not None:
+                self._conexion.interrupt()
+
+
+class EjecutorAsync:
+    """Hilos lectores y escritor con sus conexiones; expone corrutinas para correr código de los managers."""
+
+    def __init__(self, lectores: int = LECTORES, max_concurrencia: int = MAX_CONCURRENCIA):
+        Database()  # el singleton tiene que existir antes de abrir conexiones en otros hilos
+        self.max_concurrencia = max_concurrencia
+        self._lectores = ThreadPoolExecutor(lectores, thread_name_prefix="dao-lector")
+        self._escritor = EscritorAgrupado()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._limite: asyncio.Semaphore | None = None
+
+    def _semaforo(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._limite = loop, asyncio.Semaphore(self.max_concurrencia)
+        return self._limite
+
+    @staticmethod
+    def _correr(trabajo: _Trabajo, lectura: bool, funcion: Callable, args: tuple, kwargs: dict) -> Any:
+        if not lectura:
+            trabajo.empezar(None)
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                trabajo.terminar()
+        with Database.snapshot() as conexion:
+            trabajo.empezar(conexion)
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                trabajo.terminar()
+
+    async def _ejecutar(self, pool: concurrent.futures.Executor, lectura: bool, funcion: Callable,
+                        args: tuple, kwargs: dict) -> Any:
+        trabajo = _Trabajo()
+        async with self._semaforo():
+            futuro = pool.submit(self._correr, trabajo, lectura, funcion, args, kwargs)
+            try:
+                return await asyncio.wrap_future(futuro)
+            except asyncio.CancelledError:
+                trabajo.cancelar()
+                raise
+
+    async def leer(self, funcion: Callable, *args, **kwargs) -> Any:
+        """Corre `funcion` en un hilo lector, dentro de un snapshot."""
+        return await self._ejecutar(self._lectores, True, funcion, args, kwargs)
+
+    async def escribir(self, funcion: Callable, *args, **kwargs) -> Any:
+        """Corre `funcion` en el hilo escritor."""
+        return await self._ejecutar(self._escritor, False, funcion, args, kwargs)
+
+    async def iterar(self, query: str, params: tuple = (), batch_size: int = 1000) -> AsyncIterator[list[tuple]]:
+        """Lotes de filas de `query`, leídos en un hilo lector mientras el consumidor avanza."""
+        loop = asyncio.get_running_loop()
+        cola: asyncio.Queue = asyncio.Queue(maxsize=COLA_LOTES)
+        trabajo = _Trabajo()
+
+        def entregar(valor: Any) -> bool:
+            futuro = asyncio.run_coroutine_threadsafe(cola.put(valor), loop)
+            while True:
+                try:
+                    futuro.result(timeout=0.1)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if trabajo.cancelado:
+                        futuro.cancel()
+                        return False
+
+        def producir() -> None:
+            try:
+                for lote in Database.iter_execute(query, params, batch_size):
+                    if trabajo.cancelado or not entregar(lote):
+                        return
+            finally:
+                if not trabajo.cancelado:
+                    entregar(_FIN)
+
+        async with self._semaforo():
+            futuro = asyncio.wrap_future(self._lectores.submit(self._correr, trabajo, True, producir, (), {}))
+            terminado = False
+            try:
+                while (lote := await cola.get()) is not _FIN:
+                    yield lote
+                terminado = True
+                await futuro  # propaga el error del hilo lector, si lo hubo
+            finally:
+                if not terminado:
+                    # El consumidor cortó (break, aclose o cancelación): se interrumpe la lectura y se
+                    # vacía la cola para liberar al hilo si estaba esperando lugar.
+                    trabajo.cancelar()
+                    while not cola.empty():
+                        cola.get_nowait()
+                    futuro.cancel()
+
+    def cerrar(self) -> None:
+        self._escritor.shutdown()
+        self._lectores.shutdown()
+
+
+_ejecutor: EjecutorAsync | None = None
+
+
+def ejecutor_por_defecto() -> EjecutorAsync:
+    global _ejecutor
+    if _ejecutor is None:
+        _ejecutor = EjecutorAsync()
+    return _ejecutor
+
+
+def cerrar() -> None:
+    """Cierra el ejecutor por defecto (si se creó) y sus conexiones."""
+    global _ejecutor
+    if _ejecutor is not None:
+        _ejecutor.cerrar()
+        _ejecutor = None
+
+
+# -------------------- managers --------------------
+def _lectura(nombre: str):
+    async def metodo(cls, *args, **kwargs):
+        return await cls._ejecutor().leer(getattr(cls.manager, nombre), *args, **kwargs)
+    metodo.__name__ = metodo.__qualname__ = nombre
+    return classmethod(metodo)
+
+
+def _escritura(nombre: str):
+    async def metodo(cls, *args, **kwargs):
+        return await cls._ejecutor().escribir(getattr(cls.manager, nombre), *args, **kwargs)
+    metodo.__name__ = metodo.__qualname__ = nombre
+    return classmethod(metodo)
+
+
+class AsyncBaseManager:
+    """Versión async de un manager: mismos métodos, delegados al manager sync en el ejecutor."""
+    manager: type[BaseManager]
+    ejecutor: EjecutorAsync | None = None  # None: ejecutor_por_defecto()
+
+    @classmethod
+    def _ejecutor(cls) -> EjecutorAsync:
+        return cls.ejecutor or ejecutor_por_defecto()
+
+    get_one = _lectura("get_one")
+    get_list = _lectura("get_list")
+    filter = _lectura("filter")
+    create = _escritura("create")
+    update = _escritura("update")
+    delete = _escritura("delete")
+
+    @classmethod
+    async def iterar(cls, batch_size: int = 1000) -> AsyncIterator[list]:
+        """Toda la tabla en lotes de objetos del modelo."""
+        query = SQLBuilder.build_select_query(cls.manager.table_name, cls.manager.keys) + " ORDER BY id"
+        async for lote in cls._ejecutor().iterar(query, (), batch_size):
+            yield [cls.manager._crear_desde_fila(f) for f in lote]
+
+
+class AsyncPacienteManager(AsyncBaseManager):
+    manager = PacienteManager
+
+
+class AsyncMedicoManager(AsyncBaseManager):
+    manager = MedicoManager
+    listar_ordenado = _lectura("listar_ordenado")
+
+
+class AsyncHabitacionManager(AsyncBaseManager):
+    manager = HabitacionManager
+
+
+class AsyncCamaManager(AsyncBaseManager):
+    manager = CamaManager
+    esta_ocupada = _lectura("esta_ocupada")
+    camas_libres = _lectura("camas_libres")
+    contar_en_habitacion = _lectura("contar_en_habitacion")
+
+
+class AsyncMovimientoManager(AsyncBaseManager):
+    manager = MovimientoManager
+    ingresar = _escritura("ingresar")
+    dar_alta = _escritura("dar_alta")
+    tiene_internacion_abierta = _lectura("tiene_internacion_abierta")
+    ocupante_en = _lectura("ocupante_en")
+    estadias_solapadas = _lectura("estadias_solapadas")
+    internaciones_abiertas = _lectura("internaciones_abiertas")
+    ingresados_por_medico = _lectura("ingresados_por_medico")
+    ingresados_entre = _lectura("ingresados_entre")
+    altas_entre = _lectura("altas_entre")
+    pacientes_con_multiples_ingresos = _lectura("pacientes_con_multiples_ingresos")
+    readmisiones = _lectura("readmisiones")
+    total_internados_hoy = _lectura("total_internados_hoy")
+    detalle_camas_ocupadas = _lectura("detalle_camas_ocupadas")
@@ -0,0 +1,280 @@
+# benchmark.py
+"""
+Benchmarks de la capa DAO y de las consultas de Informes.
+
+Genera (o reutiliza) bases sintéticas con dao.generador a distintas escalas, corre cada
+camino CRUD de BaseManager y cada consulta de MovimientoManager sobre una copia de trabajo,
+y reporta percentiles de latencia, filas/segundo y pico de memoria (tracemalloc).
+Los resultados se guardan en JSON y pueden compararse contra un baseline previo.
+
+Uso por consola:
+    python -m dao.benchmark --escalas 10000 100000 --salida bench.json
+    python -m dao.benchmark --escalas 10000 --baseline bench.json --tolerancia 0.25
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from dao.conn import Database
+from dao import generador
+from dao.managers import (
+    BaseManager,
+    PacienteManager,
+    MedicoManager,
+    HabitacionManager,
+    CamaManager,
+    MovimientoManager,
+)
+
+ESCALAS_DEFAULT = (10_000, 100_000, 1_000_000)
+HASTA_BENCH = generador.HASTA
+SEED_BENCH = 1234
+
+
+@dataclass
+class Caso:
+    """Una operación a medir. `preparar` corre fuera del cronómetro y devuelve los argumentos."""
+    nombre: str
+    ejecutar: Callable[..., Any]
+    preparar: Callable[[], tuple] = lambda: ()
+    pesado: bool = False  # recorre tablas completas: menos repeticiones
+
+
+@dataclass
+class Medicion:
+    nombre: str
+    muestras: list[float] = field(default_factory=list)
+    filas: int = 0
+    pico_memoria: int = 0
+
+    def percentil(self, p: float) -> float:
+        ordenadas = sorted(self.muestras)
+        k = (len(ordenadas) - 1) * p
+        i = int(k)
+        j = min(i + 1, len(ordenadas) - 1)
+        return ordenadas[i] + (ordenadas[j] - ordenadas[i]) * (k - i)
+
+    def to_dict(self) -> dict:
+        p50 = self.percentil(0.5)
+        return {
+            "repeticiones": len(self.muestras),
+            "p50_ms": round(p50 * 1000, 4),
+            "p90_ms": round(self.percentil(0.9) * 1000, 4),
+            "p99_ms": round(self.percentil(0.99) * 1000, 4),
+            "media_ms": round(statistics.fmean(self.muestras) * 1000, 4),
+            "filas": self.filas,
+            "filas_por_seg": round(self.filas / p50, 1) if p50 > 0 and self.filas else None,
+            "pico_memoria_kb": round(self.pico_memoria / 1024, 1),
+        }
+
+
+def _contar(resultado: Any) -> int:
+    if resultado is None:
+        return 0
+    if isinstance(resultado, (list, tuple)):
+        return len(resultado)
+    return 1
+
+
+# -------------------- casos --------------------
+def _casos(rng: random.Random) -> list[Caso]:
+    ids = {
+        m: [r[0] for r in Database.get_execute(f"SELECT id FROM {m.table_name}")]
+        for m in (PacienteManager, MedicoManager, HabitacionManager, CamaManager, MovimientoManager)
+    }
+    rango = Database.get_execute("SELECT min(fecha_ingreso), max(fecha_ingreso) FROM movimientos", single=True)
+    fin = datetime.fromisoformat(rango[1]) if rango and rango[1] else HASTA_BENCH
+    mes = (fin - timedelta(days=30), fin)
+
+    def id_de(manager: type[BaseManager]) -> Callable[[], tuple]:
+        return lambda: (rng.choice(ids[manager]),)
+
+    def nuevo_paciente() -> dict:
+        return {"nombre": "Bench", "obra_social": "OSDE", "numero_afiliado": "1", "domicilio": "-", "telefono": "-"}
+
+    def cama_libre() -> int:
+        libres = CamaManager.camas_libres()
+        if libres:
+            return libres[0].id
+        # Hospital lleno: se da de alta la internación más antigua para liberar su cama.
+        abierta = MovimientoManager.internaciones_abiertas()[0]
+        MovimientoManager.dar_alta(abierta.id, fin + timedelta(minutes=1))
+        return abierta.cama_id
+
+    def preparar_ingreso() -> tuple:
+        paciente = PacienteManager.create(nuevo_paciente())
+        return (cama_libre(), paciente.id, rng.choice(ids[MedicoManager]))
+
+    def ingresar(cama_id: int, paciente_id: int, medico_id: int):
+        return MovimientoManager.ingresar(cama_id=cama_id, paciente_id=paciente_id, medico_id=medico_id,
+                                          fecha_ingreso=fin + timedelta(minutes=1))
+
+    def preparar_alta() -> tuple:
+        return (ingresar(*preparar_ingreso()).id,)
+
+    def preparar_update() -> tuple:
+        paciente_id = rng.choice(ids[PacienteManager])
+        return (paciente_id, {"id": paciente_id, **nuevo_paciente()})
+
+    def preparar_delete() -> tuple:
+        return (PacienteManager.create(nuevo_paciente()).id,)
+
+    casos = [
+        # CRUD genérico de BaseManager
+        Caso("paciente.create", lambda: PacienteManager.create(nuevo_paciente())),
+        Caso("paciente.get_one", PacienteManager.get_one, id_de(PacienteManager)),
+        Caso("paciente.update", PacienteManager.update, preparar_update),
+        Caso("paciente.delete", PacienteManager.delete, preparar_delete),
+        Caso("paciente.filter", lambda: PacienteManager.filter(obra_social="PAMI"), pesado=True),
+        Caso("medico.get_list", MedicoManager.get_list),
+        Caso("medico.listar_ordenado", lambda: MedicoManager.listar_ordenado("nombre")),
+        Caso("habitacion.get_list", HabitacionManager.get_list),
+        Caso("cama.get_list", CamaManager.get_list),
+        Caso("cama.esta_ocupada", CamaManager.esta_ocupada, id_de(CamaManager)),
+        Caso("cama.camas_libres", CamaManager.camas_libres),
+        Caso("movimiento.get_one", MovimientoManager.get_one, id_de(MovimientoManager)),
+        Caso("movimiento.filter_cama", lambda cama_id: MovimientoManager.filter(cama_id=cama_id),
+             id_de(CamaManager), pesado=True),
+        Caso("movimiento.get_list", MovimientoManager.get_list, pesado=True),
+        # Reglas de negocio e Informes
+        Caso("movimiento.tiene_internacion_abierta", MovimientoManager.tiene_internacion_abierta, id_de(PacienteManager)),
+        Caso("movimiento.ingresar", ingresar, preparar_ingreso),
+        Caso("movimiento.dar_alta", lambda mid: MovimientoManager.dar_alta(mid, fin + timedelta(days=1)), preparar_alta),
+        Caso("informe.internaciones_abiertas", MovimientoManager.internaciones_abiertas),
+        Caso("informe.ingresados_por_medico", MovimientoManager.ingresados_por_medico, id_de(MedicoManager), pesado=True),
+        Caso("informe.ingresados_entre", lambda: MovimientoManager.ingresados_entre(*mes), pesado=True),
+        Caso("informe.altas_entre", lambda: MovimientoManager.altas_entre(*mes), pesado=True),
+        Caso("informe.pacientes_con_multiples_ingresos", MovimientoManager.pacientes_con_multiples_ingresos, pesado=True),
+        Caso("informe.total_internados_hoy", MovimientoManager.total_internados_hoy),
+        Caso("informe.detalle_camas_ocupadas", MovimientoManager.detalle_camas_ocupadas),
+    ]
+    return casos
+
+
+def medir(caso: Caso, repeticiones: int) -> Medicion:
+    medicion = Medicion(caso.nombre)
+    reps = min(repeticiones, 3) if caso.pesado else repeticiones
+    for _ in range(reps):
+        args = caso.preparar()
+        t0 = time.perf_counter()
+        resultado = caso.ejecutar(*args)
+        medicion.muestras.append(time.perf_counter() - t0)
+        medicion.filas = _contar(resultado)
+    # Pasada aparte para memoria: tracemalloc distorsiona los tiempos.
+    args = caso.preparar()
+    tracemalloc.start()
+    caso.ejecutar(*args)
+    medicion.pico_memoria = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return medicion
+
+
+# -------------------- orquestación --------------------
+def preparar_base(directorio: str, estadias: int) -> str:
+    """Devuelve la ruta de la base generada para la escala (la crea solo si no existe)."""
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, f"nosocomio_{estadias}.db")
+    if not os.path.exists(ruta):
+        print(f"Generando base de {estadias} estadías en {ruta}...")
+        try:
+            generador.generar(ruta, estadias, anios=3, seed=SEED_BENCH, hasta=HASTA_BENCH)
+        except BaseException:
+            Database.close_connection()
+            if os.path.exists(ruta):
+                os.remove(ruta)
+            raise
+    return ruta
+
+
+def correr_escala(directorio: str, estadias: int, repeticiones: int, filtro: str | None = None) -> dict:
+    origen = preparar_base(directorio, estadias)
+    trabajo = os.path.join(directorio, f"trabajo_{estadias}.db")
+    shutil.copyfile(origen, trabajo)
+    Database.open(trabajo)
+    try:
+        rng = random.Random(SEED_BENCH)
+        resultados = {}
+        for caso in _casos(rng):
+            if filtro and filtro not in caso.nombre:
+                continue
+            medicion = medir(caso, repeticiones)
+            resultados[caso.nombre] = medicion.to_dict()
+            print(f"  {estadias:>9} {caso.nombre:<42} p50={resultados[caso.nombre]['p50_ms']:>10.3f} ms")
+        return resultados
+    finally:
+        Database.close_connection()
+        os.remove(trabajo)
+
+
+def comparar(actual: dict, baseline: dict, tolerancia: float) -> list[str]:
+    """Lista de regresiones: casos cuyo p50 empeoró más de `tolerancia` respecto del baseline."""
+    regresiones = []
+    for escala, casos in actual["resultados"].items():
+        base_escala = baseline.get("resultados", {}).get(escala, {})
+        for nombre, datos in casos.items():
+            base = base_escala.get(nombre)
+            if not base or not base.get("p50_ms"):
+                continue
+            ratio = datos["p50_ms"] / base["p50_ms"]
+            if ratio > 1 + tolerancia:
+                regresiones.append(
+                    f"{escala} {nombre}: p50 {base['p50_ms']:.3f} -> {datos['p50_ms']:.3f} ms (x{ratio:.2f})"
+                )
+    return regresiones
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks de la capa DAO.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS_DEFAULT), help="estadías por base")
+    parser.add_argument("--dir", default="bench_data", help="carpeta de bases generadas")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--filtro", help="solo casos cuyo nombre contenga este texto")
+    parser.add_argument("--salida", default="bench_resultados.json")
+    parser.add_argument("--baseline", help="JSON de una corrida previa para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="empeoramiento admitido (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    actual = {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "repeticiones": args.repeticiones,
+        },
+        "resultados": {},
+    }
+    for estadias in args.escalas:
+        actual["resultados"][str(estadias)] = correr_escala(args.dir, estadias, args.repeticiones, args.filtro)
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(actual, f, indent=2, ensure_ascii=False)
+    print(f"Resultados en {args.salida}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regresiones = comparar(actual, baseline, args.tolerancia)
+        if regresiones:
+            print("Regresiones detectadas:")
+            for r in regresiones:
+                print(f"  {r}")
+            sys.exit(1)
+        print("Sin regresiones respecto del baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# cache.py
+"""
+Cache de resultados de informes, validado por versión de datos (dao.versiones).
+
+La clave es (informe, parámetros normalizados) y cada entrada guarda la versión de las tablas de
+las que depende el informe: la misma que usan los ETags del servicio HTTP, más si el histórico
+está adjunto. Un acierto exige que esa versión sea la vigente, leída en el mismo snapshot en el
+que se calcularía el informe: un resultado de datos que ya cambiaron nunca se sirve.
+
+- Memoria: LRU acotada a `max_entradas`.
+- Disco (opcional, apagado por defecto): archivo SQLite aparte (nosocomio.db -> nosocomio_cache.db)
+  con el resultado en pickle, acotado a `max_entradas_disco` por último uso. Sobrevive a reinicios;
+  la fila "base" de versiones (un número al azar por base) evita servir resultados de otro archivo
+  de datos. Quien pueda escribir ese archivo elige qué se deserializa, así que la lectura solo
+  acepta tipos de datos conocidos (ver _Deserializador) y conviene activarlo únicamente con el
+  archivo en un disco local (NOSOCOMIO_CACHE_DISCO=1 en la UI).
+
+Uso:
+    cache = CacheResultados(archivo=archivo_por_defecto())
+    with Database.snapshot():
+        filas = cache.resolver("censo", (desde, hasta, "dia"), ("movimientos", "camas", "habitaciones"),
+                               lambda: censo.calcular(desde, hasta))
+"""
+from __future__ import annotations
+
+import dataclasses
+import io
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable
+
+from dao import versiones
+from dao.conn import Database
+
+MAX_ENTRADAS = 128
+MAX_ENTRADAS_DISCO = 1000
+
+
+def archivo_por_defecto() -> str:
+    raiz, ext = os.path.splitext(Database.db_file)
+    return f"{raiz}_cache{ext or '.db'}"
+
+
+def _normalizar(valor: Any) -> Any:
+    """Parámetros como valores JSON estables: fechas en ISO, secuencias como listas, dicts ordenados."""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor]
+    if isinstance(valor, dict):
+        return [[str(k), _normalizar(v)] for k, v in sorted(valor.items(), key=lambda kv: str(kv[0]))]
+    if valor is None or isinstance(valor, (str, int, float, bool)):
+        return valor
+    raise TypeError(f"Parámetro no cacheable: {valor!r}")
+
+
+def _clave(informe: str, parametros: tuple) -> str:
+    return json.dumps([informe, _normalizar(parametros)], separators=(",", ":"), ensure_ascii=False)
+
+
+class _Deserializador(pickle.Unpickler):
+    """
+    Unpickler que solo resuelve tipos de datos: los dataclasses del proyecto y unos pocos de la
+    biblioteca estándar. Cualquier otra función o clase (os.system, eval, ...) corta la lectura.
+    """
+    PERMITIDOS = {
+        ("builtins", "set"), ("builtins", "frozenset"), ("builtins", "complex"), ("builtins", "bytearray"),
+        ("datetime", "datetime"), ("datetime", "date"), ("datetime", "time"), ("datetime", "timedelta"),
+        ("datetime", "timezone"), ("collections", "OrderedDict"), ("collections", "Counter"),
+        ("array", "array"), ("array", "_array_reconstructor"),
+    }
+
+    def find_class(self, module: str, name: str) -> Any:
+        if (module, name) in self.PERMITIDOS:
+            return super().find_class(module, name)
+        if module.split(".")[0] in ("dao", "tk_src"):
+            clase = super().find_class(module, name)
+            if isinstance(clase, type) and dataclasses.is_dataclass(clase):
+                return clase
+        raise pickle.UnpicklingError(f"Tipo no permitido en el cache: {module}.{name}")
+
+
+def _cargar(datos: bytes) -> Any:
+    return _Deserializador(io.BytesIO(datos)).load()
+
+
+class CacheResultados:
+    """LRU en memoria, con segundo nivel opcional en disco, de resultados validados por versión."""
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS, archivo: str | None = None,
+                 max_entradas_disco: int = MAX_ENTRADAS_DISCO):
+        self.max_entradas = max_entradas
+        self.max_entradas_disco = max_entradas_disco
+        self.aciertos = 0
+        self.fallos = 0
+        self._memoria: OrderedDict[str, tuple[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disco: sqlite3.Connection | None = None
+        if archivo:
+            self._disco = sqlite3.connect(archivo, check_same_thread=False)
+            with self._disco:
+                self._disco.execute("""
+                    CREATE TABLE IF NOT EXISTS resultados (
+                        clave TEXT PRIMARY KEY, version TEXT NOT NULL, valor BLOB NOT NULL, usado REAL NOT NULL
+                    )""")
+                self._disco.execute("CREATE INDEX IF NOT EXISTS idx_resultados_usado ON resultados(usado)")
+
+    @staticmethod
+    def version(tablas: tuple[str, ...]) -> str:
+        """Versión vigente de `tablas`; llamar dentro del snapshot que calcula (o calcularía) el informe."""
+        return f"{versiones.etag(tablas)}|{int(Database.refrescar_historico())}"
+
+    # ---------- lectura / escritura ----------
+    def _leer(self, clave: str, version: str) -> tuple[bool, Any]:
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                if entrada[0] == version:
+                    self._memoria.move_to_end(clave)
+                    return True, entrada[1]
+                del self._memoria[clave]  # de datos que ya cambiaron: no sirve más
+            if self._disco is None:
+                return False, None
+            fila = self._disco.execute("SELECT version, valor FROM resultados WHERE clave = ?", (clave,)).fetchone()
+            if fila is None:
+                return False, None
+            with self._disco:
+                if fila[0] != version:
+                    self._disco.execute("DELETE FROM resultados WHERE clave = ?", (clave,))
+                    return False, None
+                self._disco.execute("UPDATE resultados SET usado = ? WHERE clave = ?", (time.time(), clave))
+            try:
+                valor = _cargar(fila[1])
+            except (pickle.UnpicklingError, AttributeError, ImportError, EOFError):
+                with self._disco:
+                    self._disco.execute("DELETE FROM resultados WHERE clave = ?", (clave,))
+                return False, None
+            self._recordar(clave, version, valor)
+            return True, valor
+
+    def _recordar(self, clave: str, version: str, valor: Any) -> None:
+        self._memoria[clave] = (version, valor)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def _guardar(self, clave: str, version: str, valor: Any) -> None:
+        with self._lock:
+            self._recordar(clave, version, valor)
+            if self._disco is None:
+                return
+            with self._disco:
+                self._disco.execute("INSERT OR REPLACE INTO resultados (clave, version, valor, usado) VALUES (?, ?, ?, ?)",
+                                    (clave, version, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL), time.time()))
+                self._disco.execute("""
+                    DELETE FROM resultados WHERE clave IN (
+                        SELECT clave FROM resultados ORDER BY usado DESC LIMIT -1 OFFSET ?
+                    )""", (self.max_entradas_disco,))
+
+    # ---------- API ----------
+    def buscar(self, informe: str, parametros: tuple, tablas: tuple[str, ...]) -> tuple[bool, Any]:
+        """(True, resultado) si hay uno vigente; (False, None) si no. No calcula nada."""
+        with Database.snapshot():
+            acierto, valor = self._leer(_clave(informe, parametros), self.version(tablas))
+        if acierto:
+            self.aciertos += 1
+        return acierto, valor
+
+    def resolver(self, informe: str, parametros: tuple, tablas: tuple[str, ...], calcular: Callable[[], Any]) -> Any:
+        """Resultado vigente del cache o, si no hay, `calcular()` y guardarlo con la versión leída."""
+        clave = _clave(informe, parametros)
+        with Database.snapshot():
+            version = self.version(tablas)
+            acierto, valor = self._leer(clave, version)
+            if acierto:
+                self.aciertos += 1
+                return valor
+            self.fallos += 1
+            valor = calcular()
+        self._guardar(clave, version, valor)
+        return valor
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._memoria.clear()
+            if self._disco is not None:
+                with self._disco:
+                    self._disco.execute("DELETE FROM resultados")
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._disco is not None:
+                self._disco.close()
+                self._disco = None
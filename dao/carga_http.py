@@ -0,0 +1,154 @@
+# carga_http.py
+"""
+Prueba de carga del servicio HTTP (dao.servicio): N puestos simulados, cada uno en su hilo con
+una conexión keep-alive, repiten una mezcla de operaciones durante S segundos.
+
+Cada puesto recuerda el ETag de cada URL y lo manda en If-None-Match, como haría un cliente que
+refresca sus listas; así el reporte muestra también qué fracción de lecturas terminó en 304.
+Con --escrituras una fracción de las iteraciones ingresa un paciente en una cama libre y le da el alta.
+
+Uso por consola (con el servicio ya corriendo):
+    python -m dao.carga_http --puestos 16 --segundos 10
+    python -m dao.carga_http --url http://127.0.0.1:8765 --escrituras 0.1 --salida carga.json
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+URL = "http://127.0.0.1:8765"
+
+# (nombre, ruta, peso)
+LECTURAS = (
+    ("pacientes_pagina", "/api/pacientes?limite=100", 4),
+    ("paciente", "/api/pacientes/{paciente}", 6),
+    ("camas_libres", "/api/camas/libres", 3),
+    ("internaciones_abiertas", "/api/informes/internaciones_abiertas", 2),
+    ("camas_ocupadas", "/api/informes/camas_ocupadas", 1),
+)
+
+
+@dataclass
+class Estadistica:
+    latencias: list[float] = field(default_factory=list)
+    no_modificadas: int = 0
+    rechazos: int = 0  # 4xx: p.ej. 409 si el paciente elegido ya estaba internado
+    errores: int = 0
+
+    def resumen(self, segundos: float) -> dict:
+        lat = sorted(self.latencias)
+        def p(q: float) -> float:
+            return lat[min(len(lat) - 1, int(q * len(lat)))] * 1000 if lat else 0.0
+        return {
+            "pedidos": len(lat), "por_segundo": len(lat) / segundos,
+            "p50_ms": p(0.5), "p95_ms": p(0.95), "p99_ms": p(0.99),
+            "promedio_ms": statistics.fmean(lat) * 1000 if lat else 0.0,
+            "no_modificadas": self.no_modificadas, "rechazos": self.rechazos, "errores": self.errores,
+        }
+
+
+class Puesto(threading.Thread):
+    def __init__(self, url: str, hasta: float, escrituras: float, semilla: int, max_paciente: int):
+        super().__init__(daemon=True)
+        partes = urlsplit(url)
+        self.conexion = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+        self.hasta = hasta
+        self.escrituras = escrituras
+        self.rng = random.Random(semilla)
+        self.max_paciente = max_paciente
+        self.etags: dict[str, str] = {}
+        self.cache: dict[str, object] = {}  # último cuerpo de cada URL, para responder un 304
+        self.stats: dict[str, Estadistica] = defaultdict(Estadistica)
+
+    def pedir(self, nombre: str, metodo: str, ruta: str, cuerpo: dict | None = None) -> tuple[int, object]:
+        headers = {"Content-Type": "application/json"} if cuerpo is not None else {}
+        if metodo == "GET" and ruta in self.etags:
+            headers["If-None-Match"] = self.etags[ruta]
+        inicio = time.perf_counter()
+        self.conexion.request(metodo, ruta, body=json.dumps(cuerpo) if cuerpo is not None else None, headers=headers)
+        respuesta = self.conexion.getresponse()
+        datos = respuesta.read()
+        stats = self.stats[nombre]
+        stats.latencias.append(time.perf_counter() - inicio)
+        if respuesta.status == 304:
+            stats.no_modificadas += 1
+            return 304, self.cache.get(ruta)
+        if respuesta.status >= 500:
+            stats.errores += 1
+        elif respuesta.status >= 400:
+            stats.rechazos += 1
+        cuerpo = json.loads(datos) if datos else None
+        if respuesta.getheader("ETag"):
+            self.etags[ruta] = respuesta.getheader("ETag")
+            self.cache[ruta] = cuerpo
+        return respuesta.status, cuerpo
+
+    def escribir(self) -> None:
+        estado, libres = self.pedir("camas_libres", "GET", "/api/camas/libres")
+        if not libres:
+            return
+        cama = self.rng.choice(libres)["id"]
+        estado, mov = self.pedir("ingresar", "POST", "/api/movimientos", {
+            "cama_id": cama, "paciente_id": self.rng.randint(1, self.max_paciente), "medico_id": 1})
+        if estado == 201:
+            self.pedir("dar_alta", "POST", f"/api/movimientos/{mov['id']}/alta", {})
+
+    def run(self) -> None:
+        nombres, rutas, pesos = zip(*LECTURAS)
+        while time.perf_counter() < self.hasta:
+            if self.escrituras and self.rng.random() < self.escrituras:
+                self.escribir()
+                continue
+            i = self.rng.choices(range(len(nombres)), weights=pesos)[0]
+            self.pedir(nombres[i], "GET", rutas[i].format(paciente=self.rng.randint(1, self.max_paciente)))
+        self.conexion.close()
+
+
+def correr(url: str, puestos: int, segundos: float, escrituras: float = 0.0, max_paciente: int = 1000) -> dict:
+    hasta = time.perf_counter() + segundos
+    hilos = [Puesto(url, hasta, escrituras, i, max_paciente) for i in range(puestos)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    total: dict[str, Estadistica] = defaultdict(Estadistica)
+    for h in hilos:
+        for nombre, s in h.stats.items():
+            total[nombre].latencias += s.latencias
+            total[nombre].no_modificadas += s.no_modificadas
+            total[nombre].rechazos += s.rechazos
+            total[nombre].errores += s.errores
+    return {nombre: s.resumen(segundos) for nombre, s in sorted(total.items())}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio HTTP del nosocomio.")
+    parser.add_argument("--url", default=URL)
+    parser.add_argument("--puestos", type=int, default=8, help="clientes concurrentes")
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--escrituras", type=float, default=0.0, help="fracción de iteraciones que ingresan y dan alta")
+    parser.add_argument("--max-paciente", type=int, default=1000, help="ids de paciente a consultar (1..N)")
+    parser.add_argument("--salida", help="guardar el resultado en JSON")
+    args = parser.parse_args(argv)
+
+    resultado = correr(args.url, args.puestos, args.segundos, args.escrituras, args.max_paciente)
+    print(f"{'operación':<24} {'pedidos':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'304':>6} {'4xx':>6} {'5xx':>6}")
+    for nombre, r in resultado.items():
+        print(f"{nombre:<24} {r['pedidos']:>8} {r['por_segundo']:>8.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['no_modificadas']:>6} {r['rechazos']:>6} {r['errores']:>6}")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "puestos": args.puestos, "segundos": args.segundos,
+                       "escrituras": args.escrituras, "resultado": resultado}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# censo.py
+"""
+Censo de camas ocupadas por día u hora sobre un rango arbitrario de fechas.
+
+Barrido lineal: los ingresos (ordenados por fecha_ingreso) y las altas (ordenadas por
+fecha_egreso) se leen como dos streams ya ordenados por sus índices y se mezclan con
+heapq.merge, O(n log n) en el peor caso y O(n) en la práctica. La ocupación al inicio del
+rango sale de una consulta que solo toca las estadías abiertas o cerradas después del inicio.
+Para cada intervalo y tipo de habitación se informa el censo al cierre, el pico y el promedio
+ponderado por tiempo, y la tasa de ocupación contra las camas actuales de ese tipo.
+
+Incluye las estadías archivadas (dao.historico) cuando el rango empieza antes del corte.
+
+Uso por consola:
+    python -m dao.censo --desde 2024-10-01 --hasta 2024-12-31
+    python -m dao.censo --desde 2024-12-01 --hasta 2024-12-07 --por-hora -o censo.csv
+"""
+from __future__ import annotations
+
+import argparse
+import calendar
+import csv
+import heapq
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Iterator
+
+from dao import columnar
+from dao.conn import Database
+from dao.managers import MovimientoManager
+
+TOTAL = "Total"
+PASOS = {"dia": timedelta(days=1), "hora": timedelta(hours=1)}
+
+
+@dataclass
+class FilaCenso:
+    inicio: datetime
+    tipo: str
+    camas: int
+    censo: int       # ocupadas al cierre del intervalo
+    pico: int        # máximo simultáneo dentro del intervalo
+    promedio: float  # ocupadas promedio, ponderado por tiempo
+
+    @property
+    def ocupacion(self) -> float:
+        return self.promedio / self.camas if self.camas else 0.0
+
+
+def camas_por_tipo() -> dict[str, int]:
+    q = """
+        SELECT h.tipo, COUNT(*) FROM camas c
+        JOIN habitaciones h ON h.id = c.habitacion_id
+        GROUP BY h.tipo
+    """
+    return dict(Database.get_execute(q))
+
+
+def _tipo_de_cama() -> dict[int, str]:
+    q = "SELECT c.id, h.tipo FROM camas c JOIN habitaciones h ON h.id = c.habitacion_id"
+    return dict(Database.get_execute(q))
+
+
+def _ocupacion_inicial(inicio: str, tipo_de_cama: dict[int, str]) -> Counter:
+    """
+    Ocupación justo antes de `inicio`: estadías ingresadas antes y abiertas o cerradas en `inicio`
+    o después. Los eventos del instante `inicio` van en el stream, así el pico del primer intervalo
+    cuenta una cama que se libera justo al empezar, igual que en el barrido de un rango más largo.
+    """
+    q, p = MovimientoManager._union_historico("fecha_egreso >= ? AND fecha_ingreso < ?", (inicio, inicio), desde=inicio)
+    abiertas = f"SELECT {', '.join(MovimientoManager.keys)} FROM movimientos WHERE fecha_egreso IS NULL AND fecha_ingreso < ?"
+    conteo: Counter = Counter()
+    for lote in Database.iter_execute(f"{q} UNION ALL {abiertas}", p + (inicio,)):
+        for fila in lote:
+            conteo[tipo_de_cama.get(fila[1], "-")] += 1
+    return conteo
+
+
+def _stream(columna: str, delta: int, inicio: str, fin: str, tipo_de_cama: dict[int, str]) -> Iterator[tuple[str, int, str]]:
+    """(fecha, delta, tipo) de los eventos de `columna` en [inicio, fin), en orden."""
+    q, p = MovimientoManager._union_historico(f"{columna} >= ? AND {columna} < ?", (inicio, fin), desde=inicio)
+    i = MovimientoManager.keys.index(columna)
+    for lote in Database.iter_execute(f"{q} ORDER BY {columna}", p, batch_size=5000):
+        for fila in lote:
+            yield fila[i], delta, tipo_de_cama.get(fila[1], "-")
+
+
+def eventos(inicio: datetime, fin: datetime) -> tuple[Counter, Iterator[tuple[str, int, str]]]:
+    """Ocupación justo antes de `inicio` y eventos ordenados hasta `fin` (a igual instante, altas primero)."""
+    tipo_de_cama = _tipo_de_cama()
+    ini, fn = inicio.isoformat(), fin.isoformat()
+    altas = _stream("fecha_egreso", -1, ini, fn, tipo_de_cama)
+    ingresos = _stream("fecha_ingreso", 1, ini, fn, tipo_de_cama)
+    return _ocupacion_inicial(ini, tipo_de_cama), heapq.merge(altas, ingresos, key=lambda e: (e[0], e[1]))
+
+
+def completar_tipos(filas: list[FilaCenso], tipos: set[str]) -> list[FilaCenso]:
+    """
+    Reordena cada intervalo con una fila por tipo de `tipos`, en orden, y la fila TOTAL al final.
+    Un tipo sin fila en un intervalo no tenía camas ni estadías ahí: su fila va en cero. Así el
+    resultado no depende de en qué intervalo apareció cada tipo por primera vez.
+    """
+    por_intervalo: dict[datetime, dict[str, FilaCenso]] = {}
+    for fila in filas:
+        por_intervalo.setdefault(fila.inicio, {})[fila.tipo] = fila
+    salida = []
+    for inicio, grupo in por_intervalo.items():
+        salida.extend(grupo.get(t) or FilaCenso(inicio, t, 0, 0, 0, 0.0) for t in sorted(tipos))
+        salida.append(grupo[TOTAL])
+    return salida
+
+
+def calcular(f_ini: datetime, f_fin: datetime, paso: str = "dia") -> list[FilaCenso]:
+    """
+    Censo de cada intervalo entre el inicio del día `f_ini` y el fin del día `f_fin`.
+    Por intervalo devuelve una fila por tipo de habitación y una fila TOTAL.
+    """
+    if paso not in PASOS:
+        raise ValueError(f"Paso inválido: {paso}. Opciones: {', '.join(PASOS)}")
+    salto = PASOS[paso]
+    inicio = datetime.combine(f_ini.date(), time())
+    fin = datetime.combine(f_fin.date() + timedelta(days=1), time())
+    camas = camas_por_tipo()
+    ocupadas, stream = eventos(inicio, fin)
+    tipos = sorted(set(camas) | set(ocupadas))
+
+    filas: list[FilaCenso] = []
+    desde, hasta = inicio, inicio + salto
+    area: Counter = Counter()   # minutos-cama acumulados en el intervalo
+    pico = Counter(ocupadas)
+    ultimo = {t: inicio for t in tipos}
+
+    def cerrar_intervalo() -> None:
+        minutos = (hasta - desde).total_seconds() / 60
+        total = FilaCenso(desde, TOTAL, sum(camas.values()), 0, 0, 0.0)
+        for t in tipos:
+            area[t] += ocupadas[t] * (hasta - ultimo[t]).total_seconds() / 60
+            ultimo[t] = hasta
+            fila = FilaCenso(desde, t, camas.get(t, 0), ocupadas[t], pico[t], area[t] / minutos)
+            filas.append(fila)
+            total.censo += fila.censo
+            total.pico += fila.pico  # cota superior: los picos de cada tipo pueden no coincidir
+            total.promedio += fila.promedio
+        filas.append(total)
+        area.clear()
+        pico.clear()
+        pico.update(ocupadas)
+
+    for fecha, delta, tipo in stream:
+        instante = datetime.fromisoformat(fecha)
+        while instante >= hasta:
+            cerrar_intervalo()
+            desde, hasta = hasta, hasta + salto
+        if tipo not in ultimo:
+            tipos.append(tipo)
+            ultimo[tipo] = desde
+        area[tipo] += ocupadas[tipo] * (instante - ultimo[tipo]).total_seconds() / 60
+        ultimo[tipo] = instante
+        ocupadas[tipo] += delta
+        if ocupadas[tipo] > pico[tipo]:
+            pico[tipo] = ocupadas[tipo]
+    while desde < fin:
+        cerrar_intervalo()
+        desde, hasta = hasta, hasta + salto
+    return completar_tipos(filas, set(tipos))
+
+
+def cierres_diarios(f_ini: datetime, f_fin: datetime, usar_numpy: bool | None = None) -> list[int]:
+    """
+    Camas ocupadas al cierre de cada día entre `f_ini` y `f_fin` (el censo de las filas TOTAL de
+    `calcular`), en modo columnar: con los ingresos y las altas de las estadías en curso en el
+    rango ordenados, el censo al instante T es #(ingresos < T) - #(altas < T).
+    """
+    inicio = datetime.combine(f_ini.date(), time())
+    dias = (f_fin.date() - f_ini.date()).days + 1
+    cols = MovimientoManager.columnas(inicio, inicio + timedelta(days=dias - 1), por="solapa", usar_numpy=usar_numpy)
+    primero = calendar.timegm(inicio.timetuple())
+    cierres = [primero + 86400 * (i + 1) for i in range(dias)]
+    # Las abiertas llevan egreso intervalos.SIN_EGRESO_SEGUNDOS, posterior a cualquier cierre.
+    ingresados = columnar.contar_menores(columnar.ordenar(cols["ingreso"]), cierres)
+    egresados = columnar.contar_menores(columnar.ordenar(cols["egreso"]), cierres)
+    return [i - e for i, e in zip(ingresados, egresados)]
+
+
+def _consulta_ocupacion_por_habitacion(f_ini: datetime, f_fin: datetime) -> tuple[str, tuple]:
+    """
+    Por habitación, entre el inicio del día `f_ini` y el fin del día `f_fin`: camas actuales,
+    estadías en curso en algún momento del rango, camas ocupadas promedio (ponderado por tiempo)
+    y ocupación. Las estadías salen del R*Tree (MovimientoManager._consulta_intervalos).
+    """
+    inicio = datetime.combine(f_ini.date(), time())
+    fin = datetime.combine(f_fin.date() + timedelta(days=1), time())
+    estadias, p = MovimientoManager._consulta_intervalos(inicio, fin)
+    ini, fn = inicio.isoformat(), fin.isoformat()
+    q = f"""
+        SELECT h.id AS habitacion_id, h.numero, h.tipo, COUNT(DISTINCT c.id) AS camas,
+               COUNT(m.id) AS estadias,
+               COALESCE(SUM(julianday(min(COALESCE(m.fecha_egreso, ?), ?)) - julianday(max(m.fecha_ingreso, ?))), 0)
+                   / (julianday(?) - julianday(?)) AS promedio,
+               COALESCE(SUM(julianday(min(COALESCE(m.fecha_egreso, ?), ?)) - julianday(max(m.fecha_ingreso, ?))), 0)
+                   / (julianday(?) - julianday(?)) / NULLIF(COUNT(DISTINCT c.id), 0) AS ocupacion
+        FROM habitaciones h
+        LEFT JOIN camas c ON c.habitacion_id = h.id
+        LEFT JOIN ({estadias}) m ON m.cama_id = c.id
+        GROUP BY h.id
+        ORDER BY h.numero
+    """
+    promedio = (fn, fn, ini, fn, ini)
+    return q, promedio + promedio + p
+
+
+def ocupacion_por_habitacion(f_ini: datetime, f_fin: datetime) -> list[tuple[int, int, str, int, int, float, float | None]]:
+    """(habitacion_id, numero, tipo, camas, estadias, promedio, ocupacion) de cada habitación."""
+    return Database.get_execute(*_consulta_ocupacion_por_habitacion(f_ini, f_fin))
+
+
+def escribir_csv(filas: list[FilaCenso], destino: str) -> None:
+    with open(destino, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("inicio", "tipo", "camas", "censo", "pico", "promedio", "ocupacion"))
+        for fila in filas:
+            writer.writerow((fila.inicio.isoformat(), fila.tipo, fila.camas, fila.censo, fila.pico,
+                             round(fila.promedio, 3), round(fila.ocupacion, 4)))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Censo diario u horario de camas ocupadas.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite")
+    parser.add_argument("--desde", type=datetime.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--hasta", type=datetime.fromisoformat, required=True, help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--por-hora", action="store_true", help="intervalos de una hora en lugar de un día")
+    parser.add_argument("--tipo", help="solo este tipo de habitación (o Total)")
+    parser.add_argument("-o", "--salida", help="CSV destino (default: tabla por pantalla)")
+    args = parser.parse_args(argv)
+
+    Database.open(args.db)
+    try:
+        with Database.snapshot():
+            filas = calcular(args.desde, args.hasta, "hora" if args.por_hora else "dia")
+    finally:
+        Database.close_connection()
+    if args.tipo:
+        filas = [f for f in filas if f.tipo == args.tipo]
+    if args.salida:
+        escribir_csv(filas, args.salida)
+        print(f"{len(filas)} filas escritas en {args.salida}")
+        return
+    print(f"{'inicio':<17} {'tipo':<26} {'camas':>5} {'censo':>5} {'pico':>5} {'prom':>7} {'ocup%':>6}")
+    for f in filas:
+        print(f"{f.inicio:%Y-%m-%d %H:%M} {f.tipo:<26} {f.camas:>5} {f.censo:>5} {f.pico:>5} "
+              f"{f.promedio:>7.2f} {f.ocupacion * 100:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# columnar.py
+"""
+Modo columnar para la analítica sobre movimientos: en lugar de una lista de Movimiento (un
+objeto y dos datetime por estadía) el resultado es un buffer por columna, `array('q')` de
+enteros (ids y fechas como segundos desde 1970, calculados en SQLite) o `array('d')` de reales.
+Si NumPy está instalado los buffers se devuelven como arrays de NumPy (sin copia) y los helpers
+de este módulo (contar, agrupar, contar_menores) usan sus operaciones vectoriales; si no, caen a
+las equivalentes de la biblioteca estándar. Los resultados son los mismos en los dos caminos.
+
+Las fechas son UTC "ingenuas": el mismo reloj de pared que guardan las columnas TEXT, así que
+las diferencias en segundos coinciden con las de julianday(). Una estadía abierta lleva egreso
+intervalos.SIN_EGRESO_SEGUNDOS (posterior a cualquier fecha real) y un id NULL (p.ej. una estadía sin médico asignado) se lee como SIN_ID, porque
+array('q') no admite None.
+
+Usado por MovimientoManager.columnas, estadias.analizar_columnas y censo.cierres_diarios.
+
+Benchmark contra el camino por objetos (tiempo y pico de memoria, y verificación de igualdad):
+    python -m dao.columnar --desde 2023-01-01 --hasta 2024-12-31
+    python -m dao.columnar --desde 2024-01-01 --hasta 2024-12-31 --sin-numpy
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import time
+import tracemalloc
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Sequence
+
+from dao.conn import Database
+from dao.intervalos import SIN_EGRESO_SEGUNDOS
+
+try:
+    import numpy as np
+except ImportError:  # opcional: sin NumPy se usan array('q') y la biblioteca estándar
+    np = None
+
+SIN_ID = -1  # los ids de SQLite son positivos
+TIPOS_NUMPY = {"q": "int64", "d": "float64"}
+
+
+def segundos_sql(expresion: str) -> str:
+    """Expresión SQL: la fecha ISO de `expresion` en segundos desde 1970 (NULL si es NULL)."""
+    return f"CAST(strftime('%s', {expresion}) AS INTEGER)"
+
+
+def hay_numpy(usar_numpy: bool | None = None) -> bool:
+    """None: NumPy si está instalado. False fuerza el camino de la biblioteca estándar."""
+    if usar_numpy and np is None:
+        raise RuntimeError("NumPy no está instalado.")
+    return np is not None if usar_numpy is None else usar_numpy
+
+
+def leer(query: str, params: tuple, columnas: dict[str, str], usar_numpy: bool | None = None,
+         batch_size: int = 5000) -> dict[str, Sequence]:
+    """
+    Ejecuta `query` (que devuelve las columnas en el orden de `columnas`, nombre -> 'q' o 'd') y
+    devuelve {nombre: buffer}. Los lotes de filas se transponen y se vuelcan a cada array sin
+    crear objetos por fila.
+    """
+    buffers = {nombre: array(tipo) for nombre, tipo in columnas.items()}
+    destinos = list(buffers.values())
+    for lote in Database.iter_execute(query, params, batch_size=batch_size):
+        for destino, valores in zip(destinos, zip(*lote)):
+            destino.extend(valores)
+    if not hay_numpy(usar_numpy):
+        return buffers
+    return {nombre: np.frombuffer(b, dtype=TIPOS_NUMPY[b.typecode]) for nombre, b in buffers.items()}
+
+
+# -------------------- operaciones --------------------
+def contar(valores: Sequence) -> dict:
+    """{valor: cantidad de apariciones}."""
+    if np is not None and isinstance(valores, np.ndarray):
+        claves, cantidades = np.unique(valores, return_counts=True)
+        return dict(zip(claves.tolist(), cantidades.tolist()))
+    return dict(Counter(valores))
+
+
+def ordenar(valores: Sequence) -> Sequence:
+    if np is not None and isinstance(valores, np.ndarray):
+        return np.sort(valores)
+    return array(valores.typecode, sorted(valores)) if isinstance(valores, array) else sorted(valores)
+
+
+def contar_menores(ordenados: Sequence, umbrales: Sequence) -> list[int]:
+    """Por cada umbral, cuántos valores de `ordenados` (ascendente) son estrictamente menores."""
+    if np is not None and isinstance(ordenados, np.ndarray):
+        return np.searchsorted(ordenados, np.asarray(umbrales), side="left").tolist()
+    return [bisect.bisect_left(ordenados, u) for u in umbrales]
+
+
+def agrupar(claves: Sequence, *columnas: Sequence) -> dict[Any, list[Sequence]]:
+    """
+    {clave: [valores de cada columna para esa clave]}, conservando el orden original dentro de
+    cada grupo. Sin NumPy ordena las posiciones por clave y corta cada grupo con bisect, así el
+    trabajo por fila queda dentro de sorted/map.
+    """
+    if np is not None and isinstance(claves, np.ndarray):
+        orden = np.argsort(claves, kind="stable")
+        unicas, inicios = np.unique(claves[orden], return_index=True)
+        partes = [np.split(np.asarray(c)[orden], inicios[1:]) for c in columnas]
+        return {clave: [p[k] for p in partes] for k, clave in enumerate(unicas.tolist())}
+    orden = sorted(range(len(claves)), key=claves.__getitem__)
+    ordenadas = list(map(claves.__getitem__, orden))
+    tipos = [c.typecode if isinstance(c, array) else "d" for c in columnas]
+    grupos: dict[Any, list[Sequence]] = {}
+    a = 0
+    while a < len(ordenadas):
+        clave = ordenadas[a]
+        b = bisect.bisect_right(ordenadas, clave, a)
+        posiciones = orden[a:b]
+        grupos[clave] = [array(t, map(c.__getitem__, posiciones)) for t, c in zip(tipos, columnas)]
+        a = b
+    return grupos
+
+
+# -------------------- benchmark --------------------
+def _medir(funcion: Callable[[], Any], repeticiones: int) -> tuple[float, int, Any]:
+    """(mejor tiempo en s, pico de memoria en bytes, resultado). La memoria se mide en una corrida aparte."""
+    mejor, resultado = float("inf"), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    tracemalloc.start()
+    try:
+        funcion()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return mejor, pico, resultado
+
+
+def _casos(f_ini: datetime, f_fin: datetime, usar_numpy: bool) -> list[tuple[str, Callable, Callable, Callable, Callable]]:
+    """(nombre, por objetos, columnar, comparable de objetos, comparable columnar)."""
+    from dao import censo, estadias
+    from dao.managers import MovimientoManager
+
+    def sketches(resultado: dict) -> dict:
+        return {d: {c: (s.n, s.suma, s.minimo, s.maximo, s.ceros, s.cubetas) for c, s in g.items()}
+                for d, g in resultado.items()}
+
+    return [
+        ("estadias del rango",
+         lambda: MovimientoManager.ingresados_entre(f_ini, f_fin),
+         lambda: MovimientoManager.columnas(f_ini, f_fin, usar_numpy=usar_numpy),
+         lambda movs: sorted(m.id for m in movs),
+         lambda cols: sorted(cols["id"])),
+        ("ingresos por médico",
+         lambda: Counter(m.medico_id for m in MovimientoManager.ingresados_entre(f_ini, f_fin)),
+         lambda: contar(MovimientoManager.columnas(f_ini, f_fin, usar_numpy=usar_numpy)["medico_id"]),
+         dict, lambda conteo: {None if k == SIN_ID else k: c for k, c in conteo.items()}),
+        ("duración de estadías",
+         lambda: estadias.analizar(f_ini, f_fin),
+         lambda: estadias.analizar_columnas(f_ini, f_fin, usar_numpy=usar_numpy),
+         sketches, sketches),
+        ("censo diario al cierre",
+         lambda: censo.calcular(f_ini, f_fin),
+         lambda: censo.cierres_diarios(f_ini, f_fin, usar_numpy=usar_numpy),
+         lambda filas: [f.censo for f in filas if f.tipo == censo.TOTAL], list),
+    ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compara el modo columnar contra filas de objetos.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite")
+    parser.add_argument("--desde", type=datetime.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--hasta", type=datetime.fromisoformat, required=True, help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-numpy", action="store_true", help="forzar array('q') aunque NumPy esté instalado")
+    args = parser.parse_args(argv)
+    usar_numpy = hay_numpy(False if args.sin_numpy else None)
+
+    Database.open(args.db)
+    distintos = []
+    try:
+        print(f"Columnar con {'NumPy' if usar_numpy else 'array'}; mejor de {args.repeticiones} corridas.")
+        print(f"{'caso':<24} {'objetos ms':>11} {'columnar ms':>12} {'x':>6} {'objetos KB':>11} {'columnar KB':>12}")
+        with Database.snapshot():
+            for nombre, objetos, columnas, comparable_o, comparable_c in _casos(args.desde, args.hasta, usar_numpy):
+                t_o, m_o, r_o = _medir(objetos, args.repeticiones)
+                t_c, m_c, r_c = _medir(columnas, args.repeticiones)
+                print(f"{nombre:<24} {t_o * 1000:>11.1f} {t_c * 1000:>12.1f} {t_o / t_c:>6.1f} "
+                      f"{m_o / 1024:>11.0f} {m_c / 1024:>12.0f}")
+                if comparable_o(r_o) != comparable_c(r_c):
+                    distintos.append(nombre)
+    finally:
+        Database.close_connection()
+    if distintos:
+        raise SystemExit(f"Resultados distintos en: {', '.join(distintos)}")
+    print("Resultados idénticos.")
+
+
+if __name__ == "__main__":
+    main()
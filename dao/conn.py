@@ -1,21 +1,266 @@
 # conn.py
-from sqlite3 import connect, Connection
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from sqlite3 import connect, Connection, OperationalError
+from time import monotonic, perf_counter
+from typing import Iterator
+
+from dao.instrumentacion import instrumentacion
+
+# Estado por hilo: conexión de solo lectura cacheada, snapshot activo (ver Database.snapshot)
+# conexión de escritura propia de hilos de fondo (ver Database.abrir_escritor_del_hilo) y lote abierto
+# (ver Database.lote), y cursores de iter_execute abiertos dentro del snapshot.
+_local = threading.local()
+
+
+class ConsultaCancelada(Exception):
+    """La consulta se canceló (Cancelacion.cancelar) o superó su tiempo límite."""
+
+
+class Cancelacion:
+    """
+    Token para cortar las lecturas de un snapshot (ver Database.snapshot) desde otro hilo o por tiempo.
+    SQLite llama a un progress handler cada PASOS instrucciones de su VM: si el token se canceló o
+    venció el límite, la consulta en curso termina con "interrupted". `cancelar` además llama a
+    Connection.interrupt() para no esperar al próximo chequeo.
+    """
+    PASOS = 10_000
+
+    def __init__(self, limite_segundos: float | None = None):
+        self._lock = threading.Lock()
+        self._conexion: Connection | None = None
+        self._vence = monotonic() + limite_segundos if limite_segundos else None
+        self.limite_segundos = limite_segundos
+        self.cancelada = False
+        self.vencida = False
+
+    def cancelar(self) -> None:
+        with self._lock:
+            self.cancelada = True
+            if self._conexion is not None:
+                self._conexion.interrupt()
+
+    def _progreso(self) -> int:
+        if not self.cancelada and self._vence is not None and monotonic() > self._vence:
+            self.cancelada = self.vencida = True
+        return int(self.cancelada)
+
+    def _vincular(self, conexion: Connection) -> None:
+        with self._lock:
+            self._conexion = conexion
+            conexion.set_progress_handler(self._progreso, self.PASOS)
+
+    def _desvincular(self, conexion: Connection) -> None:
+        # Bajo el lock: un cancelar() tardío no interrumpe la próxima consulta de la conexión.
+        with self._lock:
+            self._conexion = None
+            conexion.set_progress_handler(None, 0)
+
+    def error(self) -> ConsultaCancelada:
+        if self.vencida:
+            return ConsultaCancelada(f"La consulta superó el tiempo límite de {self.limite_segundos:g} s.")
+        return ConsultaCancelada("La consulta fue cancelada.")
+
 
 class Database:
     """ Singleton Database Connection """
     _instance: "Database" = None
     connection: Connection
+    hilo: int  # hilo dueño de `connection` (sqlite3 no deja usarla desde otro)
     db_file: str = "nosocomio.db"
+    historico_adjunto: bool = False  # hay base de estadías archivadas; cada conexión la adjunta como "historico"
+    instrumentacion = instrumentacion
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance.connection = connect(cls.db_file)
+            cls._instance.connection = cls._connect_writer()
+            cls._instance.hilo = threading.get_ident()
         return cls._instance
 
+    @classmethod
+    def _connect_writer(cls) -> Connection:
+        connection = connect(cls.db_file)
+        # Las reglas de negocio viven en el esquema (ver BaseManager._restricciones).
+        connection.execute("PRAGMA foreign_keys = ON")
+        cls.historico_adjunto = cls.adjuntar_historico(connection)
+        return connection
+
+    @classmethod
+    def activar_wal(cls) -> None:
+        """
+        WAL: los lectores (snapshots de informes) no bloquean a las escrituras ni viceversa.
+        El modo queda guardado en el archivo, así que basta con pedirlo al abrir la base
+        explícitamente (open, create_table); importar dao.managers no toca el archivo.
+        """
+        cls.get_connection().execute("PRAGMA journal_mode = WAL")
+
+    @classmethod
+    def historico_file(cls) -> str:
+        """Archivo de estadías archivadas (ver dao.historico): nosocomio.db -> nosocomio_historico.db."""
+        raiz, ext = os.path.splitext(cls.db_file)
+        return f"{raiz}_historico{ext or '.db'}"
+
+    @classmethod
+    def adjuntar_historico(cls, connection: Connection, read_only: bool = False, crear: bool = False) -> bool:
+        """ATTACH del histórico como esquema "historico". Ya adjunto, o sin archivo (y sin `crear`), no hace nada."""
+        if any(fila[1] == "historico" for fila in connection.execute("PRAGMA database_list")):
+            return True
+        ruta = cls.historico_file()
+        if not crear and not os.path.exists(ruta):
+            return False
+        if read_only:
+            ruta = Path(ruta).resolve().as_uri() + "?mode=ro"
+        connection.execute("ATTACH DATABASE ? AS historico", (ruta,))
+        return True
+
+    @classmethod
+    def refrescar_historico(cls) -> bool:
+        """
+        ¿Las lecturas de este hilo ven el histórico? Mientras no exista se vuelve a mirar el archivo:
+        el primer `python -m dao.historico` puede correr con la aplicación ya abierta. Fuera de un
+        snapshot lo adjunta a la conexión de escritura del hilo si le falta; un snapshot responde
+        con el estado con que se abrió (su conexión se reabre cuando cambia, ver snapshot).
+        """
+        if getattr(_local, "snapshot", None) is not None:
+            return _local.read_only_clave[1]
+        if cls._buscar_historico():
+            connection = getattr(_local, "writer", None)
+            if connection is None and cls._instance.hilo == threading.get_ident():
+                connection = cls._instance.connection
+            # Un hilo sin conexión de escritura propia lee por read_only_connection, que ya adjunta.
+            if connection is not None:
+                cls.adjuntar_historico(connection)
+        return cls.historico_adjunto
+
+    @classmethod
+    def _buscar_historico(cls) -> bool:
+        if not cls.historico_adjunto:
+            cls.historico_adjunto = os.path.exists(cls.historico_file())
+        return cls.historico_adjunto
+
     @classmethod
     def get_connection(cls) -> Connection:
-        return cls._instance.connection
+        """Conexión de escritura: la propia del hilo si la abrió (abrir_escritor_del_hilo), o la principal."""
+        return getattr(_local, "writer", None) or cls._instance.connection
+
+    @classmethod
+    def abrir_escritor_del_hilo(cls) -> Connection:
+        """
+        Conexión de escritura propia del hilo actual: los managers usados desde ese hilo escriben
+        (y leen fuera de un snapshot) por ella. Para hilos de fondo dedicados a escribir.
+        """
+        connection = _local.writer = cls._connect_writer()
+        return connection
+
+    @classmethod
+    def cerrar_escritor_del_hilo(cls) -> None:
+        connection = getattr(_local, "writer", None)
+        if connection is not None:
+            _local.writer = None
+            connection.close()
+
+    @classmethod
+    def _read_connection(cls) -> Connection:
+        """Conexión para lecturas: la del snapshot activo en este hilo, o la principal."""
+        return getattr(_local, "snapshot", None) or cls.get_connection()
+
+    @classmethod
+    def open(cls, db_file: str) -> "Database":
+        """Reapunta el singleton a otro archivo (herramientas de consola, benchmarks)."""
+        cls.close_connection()
+        cls.db_file = db_file
+        if cls._instance is None:
+            cls()
+        else:
+            cls._instance.connection = cls._connect_writer()
+            cls._instance.hilo = threading.get_ident()
+        cls.activar_wal()
+        return cls._instance
+
+    @classmethod
+    def new_connection(cls, **kwargs) -> Connection:
+        """Conexión independiente al mismo archivo (p.ej. para hilos de fondo)."""
+        connection = connect(cls.db_file, **kwargs)
+        connection.execute("PRAGMA foreign_keys = ON")
+        return connection
+
+    @classmethod
+    def read_only_connection(cls, **kwargs) -> Connection:
+        """Conexión `mode=ro` en autocommit: las transacciones de lectura se abren explícitamente."""
+        uri = Path(cls.db_file).resolve().as_uri() + "?mode=ro"
+        connection = connect(uri, uri=True, isolation_level=None, **kwargs)
+        if cls.historico_adjunto:
+            cls.adjuntar_historico(connection, read_only=True)
+        return connection
+
+    @classmethod
+    @contextmanager
+    def snapshot(cls, cancelacion: Cancelacion | None = None) -> Iterator[Connection]:
+        """
+        Transacción de lectura sobre una conexión de solo lectura propia del hilo.
+        Dentro del bloque, get_execute/iter_execute (y por lo tanto los managers) leen todos
+        del mismo estado de la base; las escrituras siguen yendo a la conexión principal.
+        Los bloques anidados reutilizan el snapshot exterior (y su cancelación).
+        Con `cancelacion`, una lectura cortada sale como ConsultaCancelada y la transacción de
+        lectura se cierra en el acto, liberando su marca en el WAL.
+        """
+        if getattr(_local, "snapshot", None) is not None:
+            yield _local.snapshot
+            return
+        connection = getattr(_local, "read_only", None)
+        clave = (cls.db_file, cls._buscar_historico())
+        if connection is None or getattr(_local, "read_only_clave", None) != clave:
+            if connection is not None:
+                connection.close()
+            connection = _local.read_only = cls.read_only_connection()
+            _local.read_only_clave = clave
+        connection.execute("BEGIN")
+        # En WAL el snapshot se fija con la primera lectura, no con BEGIN.
+        connection.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        _local.snapshot = connection
+        _local.cursores = []
+        if cancelacion is not None:
+            cancelacion._vincular(connection)
+        try:
+            yield connection
+        except OperationalError as e:
+            if cancelacion is not None and cancelacion.cancelada:
+                raise cancelacion.error() from e
+            raise
+        finally:
+            _local.snapshot = None
+            # Un iter_execute abandonado (error o cancelación a mitad de recorrido) deja su statement
+            # abierto, y con él la lectura: se cierran acá, en el hilo dueño, antes del COMMIT.
+            for cursor in _local.cursores:
+                cursor.close()
+            _local.cursores = None
+            if cancelacion is not None:
+                cancelacion._desvincular(connection)
+            if connection.in_transaction:
+                connection.execute("COMMIT")
+
+    @classmethod
+    @contextmanager
+    def lote(cls) -> Iterator[Connection]:
+        """
+        Transacción de escritura agrupada en la conexión de escritura del hilo (group commit, ver
+        dao.escritor): dentro del bloque save_execute no confirma cada statement y commit/rollback
+        no hacen nada; el lote se confirma una sola vez al salir, o se deshace si hay excepción.
+        """
+        connection = cls.get_connection()
+        connection.execute("BEGIN IMMEDIATE")
+        _local.en_lote = True
+        try:
+            yield connection
+        except BaseException:
+            _local.en_lote = False
+            connection.rollback()
+            raise
+        _local.en_lote = False
+        connection.commit()
 
     @classmethod
     def close_connection(cls) -> None:
@@ -24,31 +269,75 @@ class Database:
 
     @classmethod
     def commit(cls) -> None:
-        cls.get_connection().commit()
+        if not getattr(_local, "en_lote", False):
+            cls.get_connection().commit()
 
     @classmethod
     def rollback(cls) -> None:
-        cls.get_connection().rollback()
+        if not getattr(_local, "en_lote", False):
+            cls.get_connection().rollback()
 
     @classmethod
     def get_execute(cls, query: str, params: tuple = (), single: bool = False) -> list | tuple | None:
-        cursor = cls.get_connection().cursor()
+        inicio = perf_counter() if instrumentacion.activa else 0.0
+        connection = cls._read_connection()
+        cursor = connection.cursor()
         cursor.execute(query, params)
         result = cursor.fetchone() if single else cursor.fetchall()
         cursor.close()
+        if instrumentacion.activa:
+            filas = (result is not None) if single else len(result)
+            instrumentacion.registrar(connection, query, params, perf_counter() - inicio, int(filas))
         return result
 
+    @classmethod
+    def iter_execute(cls, query: str, params: tuple = (), batch_size: int = 1000,
+                     connection: Connection | None = None) -> Iterator[list[tuple]]:
+        """
+        Recorre el resultado en lotes de `batch_size` filas sin materializarlo entero.
+        El cursor avanza sobre el statement de SQLite, así que la memoria queda acotada al lote.
+        """
+        connection = connection or cls._read_connection()
+        cursor = connection.cursor()
+        hilo = threading.get_ident()
+        if connection is getattr(_local, "snapshot", None):
+            _local.cursores.append(cursor)
+        # Solo se mide el tiempo dentro de SQLite, no el que tarda el consumidor entre lotes.
+        medido, filas = 0.0, 0
+        try:
+            inicio = perf_counter()
+            cursor.execute(query, params)
+            while True:
+                lote = cursor.fetchmany(batch_size)
+                medido += perf_counter() - inicio
+                if not lote:
+                    break
+                filas += len(lote)
+                yield lote
+                inicio = perf_counter()
+        finally:
+            # El GC puede finalizar un generador abandonado desde otro hilo, donde el cursor no se
+            # puede tocar; en ese caso ya lo cerró el snapshot que lo abrió.
+            if threading.get_ident() == hilo:
+                cursor.close()
+            if instrumentacion.activa:
+                instrumentacion.registrar(connection, query, params, medido, filas)
+
     @classmethod
     def save_execute(cls, query: str, params: tuple = ()) -> int:
-        cursor = cls.get_connection().cursor()
+        inicio = perf_counter() if instrumentacion.activa else 0.0
+        connection = cls.get_connection()
+        cursor = connection.cursor()
         cursor.execute(query, params)
         cls.commit()
+        rowcount = cursor.rowcount
+        if instrumentacion.activa:
+            instrumentacion.registrar(connection, query, params, perf_counter() - inicio, max(rowcount, 0))
         sql = query.lstrip().upper()
         if sql.startswith("INSERT"):
             last_id = cursor.lastrowid
             cursor.close()
             return last_id
         else:
-            rowcount = cursor.rowcount
             cursor.close()
             return rowcount
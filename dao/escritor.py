@@ -0,0 +1,229 @@
+# escritor.py
+"""
+Escritor único con group commit, para picos de ingresos y altas (p.ej. un evento con muchas víctimas).
+
+Cada `ingresar`/`dar_alta` directo abre su transacción y espera su propio fsync. EscritorAgrupado
+es un Executor de un solo hilo, con su propia conexión de escritura. Toma todas las operaciones
+que haya en la cola (hasta `max_lote`) y las aplica en una sola transacción (Database.lote).
+Cada operación corre en un SAVEPOINT con las validaciones de siempre de los managers. Si una
+falla, se deshace solo esa y su Future recibe la excepción; el resto del lote sigue. El COMMIT
+es uno por lote. Los Futures se resuelven después del COMMIT, así que un resultado entregado
+ya es durable. Con poca carga los lotes son de una operación y no se agrega espera; con mucha,
+la cola se llena mientras se confirma el lote anterior y los lotes crecen solos.
+
+Uso:
+    escritor = EscritorAgrupado()
+    futuro = escritor.ingresar(cama_id=1, paciente_id=2, medico_id=3, fecha_ingreso=ahora)
+    movimiento = futuro.result()          # o ValueError("La cama seleccionada está ocupada.")
+    escritor.shutdown()
+
+Comparación directo vs agrupado (modifica la base: usar una copia):
+    python -m dao.escritor --db copia.db --operaciones 2000 --clientes 32
+"""
+from __future__ import annotations
+
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from dao.conn import Database
+from dao.managers import CamaManager, MovimientoManager
+
+LOTE_MAX = 500
+_CERRAR = object()
+
+
+class EscritorAgrupado(Executor):
+    """Executor de un hilo que confirma las operaciones encoladas en transacciones agrupadas."""
+
+    def __init__(self, max_lote: int = LOTE_MAX):
+        Database()  # el singleton tiene que existir antes de abrir la conexión del hilo
+        self.max_lote = max_lote
+        self.lotes = 0
+        self.operaciones = 0
+        self._cola: queue.SimpleQueue = queue.SimpleQueue()
+        self._cerrado = False
+        self._lock = threading.Lock()
+        self._hilo = threading.Thread(target=self._correr, name="dao-escritor", daemon=True)
+        self._hilo.start()
+
+    # ---------- Executor ----------
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._cerrado:
+                raise RuntimeError("El escritor está cerrado.")
+            futuro: Future = Future()
+            self._cola.put((futuro, fn, args, kwargs))
+        return futuro
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """Deja de aceptar operaciones; las ya encoladas se aplican (o se cancelan con `cancel_futures`)."""
+        with self._lock:
+            if not self._cerrado:
+                self._cerrado = True
+                self._cola.put(_CERRAR)
+        if cancel_futures:
+            pendientes = []
+            while True:
+                try:
+                    item = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _CERRAR:
+                    pendientes.append(item)
+                else:
+                    item[0].cancel()
+            for item in pendientes:
+                self._cola.put(item)
+        if wait:
+            self._hilo.join()
+
+    # ---------- atajos ----------
+    def ingresar(self, **kwargs) -> Future:
+        return self.submit(MovimientoManager.ingresar, **kwargs)
+
+    def dar_alta(self, movimiento_id: int, fecha_egreso: datetime) -> Future:
+        return self.submit(MovimientoManager.dar_alta, movimiento_id, fecha_egreso)
+
+    @property
+    def promedio_lote(self) -> float:
+        return self.operaciones / self.lotes if self.lotes else 0.0
+
+    # ---------- hilo escritor ----------
+    def _tomar_lote(self) -> tuple[list[tuple], bool]:
+        """Bloquea hasta la primera operación y suma las que ya estén encoladas. (lote, seguir)."""
+        primero = self._cola.get()
+        if primero is _CERRAR:
+            return [], False
+        lote = [primero]
+        while len(lote) < self.max_lote:
+            try:
+                item = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if item is _CERRAR:
+                return lote, False
+            lote.append(item)
+        return lote, True
+
+    def _correr(self) -> None:
+        Database.abrir_escritor_del_hilo()
+        try:
+            seguir = True
+            while seguir:
+                lote, seguir = self._tomar_lote()
+                if lote:
+                    self._aplicar(lote)
+        finally:
+            Database.cerrar_escritor_del_hilo()
+
+    def _aplicar(self, lote: list[tuple]) -> None:
+        resultados: list[tuple[Future, bool, Any]] = []
+        try:
+            with Database.lote() as conexion:
+                for futuro, fn, args, kwargs in lote:
+                    if not futuro.set_running_or_notify_cancel():
+                        continue
+                    conexion.execute("SAVEPOINT operacion")
+                    try:
+                        valor = fn(*args, **kwargs)
+                    except Exception as e:
+                        if not conexion.in_transaction:
+                            # SQLite abortó la transacción entera (no solo el statement): lo aplicado
+                            # en este lote se perdió, así que fallan también las operaciones anteriores.
+                            resultados = [(f, False, e) for f, _ok, _v in resultados]
+                            conexion.execute("BEGIN IMMEDIATE")
+                        else:
+                            conexion.execute("ROLLBACK TO operacion")
+                            conexion.execute("RELEASE operacion")
+                        resultados.append((futuro, False, e))
+                    else:
+                        conexion.execute("RELEASE operacion")
+                        resultados.append((futuro, True, valor))
+        except Exception as e:  # falló el COMMIT: nada del lote quedó escrito
+            resultados = [(f, False, e) for f, _ok, _v in resultados]
+        self.lotes += 1
+        self.operaciones += len(resultados)
+        for futuro, ok, valor in resultados:
+            if ok:
+                futuro.set_result(valor)
+            else:
+                futuro.set_exception(valor)
+
+
+# -------------------- comparación --------------------
+def _parejas(cantidad: int) -> list[tuple[int, int]]:
+    """(cama libre, paciente sin internación abierta) distintas, para operar sin conflictos."""
+    camas = [c.id for c in CamaManager.camas_libres()]
+    q = """
+        SELECT id FROM pacientes
+        WHERE id NOT IN (SELECT paciente_id FROM movimientos WHERE fecha_egreso IS NULL)
+        ORDER BY id LIMIT ?
+    """
+    pacientes = [f[0] for f in Database.get_execute(q, (len(camas),))]
+    return list(zip(camas, pacientes))[:cantidad]
+
+
+def _ciclo(ingresar: Callable, dar_alta: Callable, cama: int, paciente: int, inicio: datetime) -> None:
+    mov = ingresar(cama_id=cama, paciente_id=paciente, medico_id=1, fecha_ingreso=inicio)
+    dar_alta(mov.id, inicio + timedelta(hours=1))
+
+
+def comparar(operaciones: int, clientes: int) -> dict[str, float]:
+    """Operaciones/s de ingresar+dar_alta directos (secuenciales) y agrupados (`clientes` concurrentes)."""
+    parejas = _parejas(clientes)
+    if not parejas:
+        raise ValueError("No hay camas libres con pacientes disponibles.")
+    ciclos = max(1, operaciones // 2)
+    base = datetime.now().replace(microsecond=0) + timedelta(days=3650)  # lejos de la historia real
+
+    inicio = time.perf_counter()
+    for i in range(ciclos):
+        cama, paciente = parejas[i % len(parejas)]
+        _ciclo(MovimientoManager.ingresar, MovimientoManager.dar_alta, cama, paciente, base + timedelta(hours=2 * i))
+    directo = 2 * ciclos / (time.perf_counter() - inicio)
+
+    escritor = EscritorAgrupado()
+    base += timedelta(hours=2 * ciclos)
+
+    def cliente(k: int) -> None:
+        cama, paciente = parejas[k]
+        for i in range(k, ciclos, len(parejas)):
+            _ciclo(lambda **kw: escritor.ingresar(**kw).result(),
+                   lambda *a: escritor.dar_alta(*a).result(), cama, paciente, base + timedelta(hours=2 * i))
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=cliente, args=(k,)) for k in range(len(parejas))]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    agrupado = 2 * ciclos / (time.perf_counter() - inicio)
+    escritor.shutdown()
+    return {"directo_ops_s": directo, "agrupado_ops_s": agrupado, "clientes": len(parejas),
+            "promedio_lote": escritor.promedio_lote}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compara escrituras directas contra el escritor agrupado.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite (se modifica: usar una copia)")
+    parser.add_argument("--operaciones", type=int, default=2000, help="ingresos + altas por modo")
+    parser.add_argument("--clientes", type=int, default=32, help="hilos que encolan en paralelo")
+    args = parser.parse_args(argv)
+
+    Database.open(args.db)
+    try:
+        r = comparar(args.operaciones, args.clientes)
+    finally:
+        Database.close_connection()
+    print(f"Directo:  {r['directo_ops_s']:>9,.0f} ops/s")
+    print(f"Agrupado: {r['agrupado_ops_s']:>9,.0f} ops/s  ({r['clientes']} clientes, "
+          f"{r['promedio_lote']:.1f} operaciones por commit)")
+
+
+if __name__ == "__main__":
+    main()
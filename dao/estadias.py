@@ -0,0 +1,327 @@
+# estadias.py
+"""
+Analítica de duración de estadías (días entre fecha_ingreso y fecha_egreso) por médico,
+tipo de habitación y mes de alta.
+
+- Promedio, mínimo, máximo y cantidad salen de un GROUP BY en SQLite (`resumen_sql`).
+- Los percentiles y el histograma salen de una única pasada en streaming (`analizar`): la
+  duración, el tipo y el mes se calculan en SQL y cada fila alimenta un SketchCuantiles por
+  grupo. El sketch usa cubetas logarítmicas con error relativo acotado (`alfa`), así la memoria
+  depende de la cantidad de grupos y del rango de duraciones, no de la cantidad de estadías.
+  Los sketches se pueden fusionar (p.ej. meses -> año, o resultados de procesos separados).
+
+Incluye las estadías archivadas (dao.historico) cuando el rango lo requiere.
+
+Uso por consola:
+    python -m dao.estadias --por tipo
+    python -m dao.estadias --por medico --desde 2024-01-01 --hasta 2024-12-31
+"""
+from __future__ import annotations
+
+import argparse
+import math
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Sequence
+
+from dao import columnar
+from dao.conn import Database
+from dao.managers import MedicoManager, MovimientoManager
+
+DIMENSIONES = ("medico", "tipo", "mes")
+ALFA = 0.01  # error relativo de los percentiles
+LIMITES_HISTOGRAMA = (1, 2, 3, 5, 7, 14, 30, 60, math.inf)  # días
+CUBETA_CERO = -(2 ** 62)  # en cubetas_de: valor <= 0, va a `ceros`
+
+
+@dataclass
+class SketchCuantiles:
+    """Cuantiles aproximados con error relativo `alfa` en cubetas logarítmicas (estilo DDSketch)."""
+    alfa: float = ALFA
+    cubetas: dict[int, int] = field(default_factory=dict)
+    ceros: int = 0
+    n: int = 0
+    # Suma exacta como sumas parciales sin solapamiento (Shewchuk): el resultado no depende del
+    # orden de agregar/fusionar, así un cálculo repartido en partes (dao.paralelo) da lo mismo.
+    parciales: list[float] = field(default_factory=list)
+    minimo: float = math.inf
+    maximo: float = -math.inf
+
+    def __post_init__(self):
+        self._gamma = (1 + self.alfa) / (1 - self.alfa)
+        self._log_gamma = math.log(self._gamma)
+
+    def _sumar(self, x: float) -> None:
+        i = 0
+        for y in self.parciales:
+            if abs(x) < abs(y):
+                x, y = y, x
+            alto = x + y
+            bajo = y - (alto - x)
+            if bajo:
+                self.parciales[i] = bajo
+                i += 1
+            x = alto
+        self.parciales[i:] = [x]
+
+    @property
+    def suma(self) -> float:
+        return math.fsum(self.parciales)
+
+    def agregar(self, valor: float) -> None:
+        self.n += 1
+        self._sumar(valor)
+        if valor < self.minimo:
+            self.minimo = valor
+        if valor > self.maximo:
+            self.maximo = valor
+        if valor <= 0:
+            self.ceros += 1
+            return
+        i = math.ceil(math.log(valor) / self._log_gamma)
+        self.cubetas[i] = self.cubetas.get(i, 0) + 1
+
+    def cubetas_de(self, valores: Sequence[float]) -> Sequence[int]:
+        """Cubeta de cada valor (CUBETA_CERO para los <= 0), para agregar_columna."""
+        if columnar.np is not None and isinstance(valores, columnar.np.ndarray):
+            np = columnar.np
+            with np.errstate(divide="ignore", invalid="ignore"):
+                exactos = np.log(valores) / self._log_gamma
+            indices = np.where(valores > 0, np.ceil(exactos), CUBETA_CERO).astype("int64")
+            # np.log puede diferir de math.log en un ulp: justo sobre un borde de cubeta el ceil
+            # cambiaría, así que esos valores se recalculan como en `agregar` y los dos caminos coinciden.
+            for k in np.flatnonzero((valores > 0) & (np.abs(exactos - np.rint(exactos)) < 1e-9)).tolist():
+                indices[k] = math.ceil(math.log(valores[k]) / self._log_gamma)
+            return indices
+        log, ceil, log_gamma = math.log, math.ceil, self._log_gamma
+        return array("q", [ceil(log(v) / log_gamma) if v > 0 else CUBETA_CERO for v in valores])
+
+    def agregar_columna(self, valores: Sequence[float], cubetas: Sequence[int] | None = None) -> None:
+        """
+        Agrega todos los `valores` (array o array de NumPy, ver dao.columnar) de una vez. `cubetas`
+        (de cubetas_de) evita recalcularlas cuando los mismos valores entran a varios sketches.
+        """
+        if not len(valores):
+            return
+        self.n += len(valores)
+        self._sumar(math.fsum(valores))
+        self.minimo = min(self.minimo, float(min(valores)))
+        self.maximo = max(self.maximo, float(max(valores)))
+        conteos = columnar.contar(self.cubetas_de(valores) if cubetas is None else cubetas)
+        self.ceros += conteos.pop(CUBETA_CERO, 0)
+        for i, c in conteos.items():
+            self.cubetas[i] = self.cubetas.get(i, 0) + c
+
+    def fusionar(self, otro: SketchCuantiles) -> None:
+        if otro.alfa != self.alfa:
+            raise ValueError("Solo se pueden fusionar sketches con el mismo alfa.")
+        for i, c in otro.cubetas.items():
+            self.cubetas[i] = self.cubetas.get(i, 0) + c
+        self.ceros += otro.ceros
+        self.n += otro.n
+        for parcial in otro.parciales:
+            self._sumar(parcial)
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+
+    def _valor(self, i: int) -> float:
+        return 2 * self._gamma ** i / (self._gamma + 1)
+
+    @property
+    def promedio(self) -> float:
+        return self.suma / self.n if self.n else 0.0
+
+    def cuantil(self, q: float) -> float:
+        if not self.n:
+            return 0.0
+        rango = q * (self.n - 1)
+        acumulado = self.ceros
+        if rango < acumulado:
+            return 0.0
+        for i in sorted(self.cubetas):
+            acumulado += self.cubetas[i]
+            if rango < acumulado:
+                return min(max(self._valor(i), self.minimo), self.maximo)
+        return self.maximo
+
+    def histograma(self, limites: tuple[float, ...] = LIMITES_HISTOGRAMA) -> list[int]:
+        """Cantidad de estadías con duración <= cada límite (y > el anterior)."""
+        conteos = [0] * len(limites)
+        conteos[0] = self.ceros
+        for i, c in self.cubetas.items():
+            valor = self._valor(i)
+            k = next((j for j, lim in enumerate(limites) if valor <= lim), len(limites) - 1)
+            conteos[k] += c
+        return conteos
+
+
+@dataclass
+class FilaEstadia:
+    clave: int | str
+    etiqueta: str
+    altas: int
+    promedio: float
+    p50: float
+    p90: float
+    p99: float
+    maximo: float
+
+
+def etiquetas_histograma(limites: tuple[float, ...] = LIMITES_HISTOGRAMA) -> list[str]:
+    return [f"<= {lim:g} d" if lim != math.inf else f"> {limites[-2]:g} d" for lim in limites]
+
+
+# -------------------- SQL --------------------
+def _estadias_cerradas(columnas: str, f_ini: datetime | None, f_fin: datetime | None) -> tuple[str, tuple]:
+    """(`columnas`, dias) de las estadías cerradas, por fecha de alta dentro del rango; alias m, c y h."""
+    if f_ini is not None and f_fin is not None:
+        rango = MovimientoManager._rango_dias(f_ini, f_fin)
+        q, p = MovimientoManager._union_historico("fecha_egreso >= ? AND fecha_egreso < ?", rango, desde=rango[0])
+    else:
+        q, p = MovimientoManager._union_historico("fecha_egreso IS NOT NULL", ())
+    q = f"""
+        SELECT {columnas}, julianday(m.fecha_egreso) - julianday(m.fecha_ingreso) AS dias
+        FROM ({q}) m
+        JOIN camas c ON c.id = m.cama_id
+        JOIN habitaciones h ON h.id = c.habitacion_id
+    """
+    return q, p
+
+
+def _consulta_estadias(f_ini: datetime | None = None, f_fin: datetime | None = None) -> tuple[str, tuple]:
+    """(medico_id, tipo, mes, dias) de las estadías cerradas, por fecha de alta dentro del rango."""
+    return _estadias_cerradas("m.medico_id, h.tipo, substr(m.fecha_egreso, 1, 7) AS mes", f_ini, f_fin)
+
+
+def _consulta_resumen(dimension: str, f_ini: datetime | None = None, f_fin: datetime | None = None) -> tuple[str, tuple]:
+    if dimension not in DIMENSIONES:
+        raise ValueError(f"Dimensión inválida: {dimension}. Opciones: {', '.join(DIMENSIONES)}")
+    columna = {"medico": "medico_id", "tipo": "tipo", "mes": "mes"}[dimension]
+    q, p = _consulta_estadias(f_ini, f_fin)
+    q = f"""
+        SELECT {columna} AS clave, COUNT(*) AS altas, AVG(dias) AS promedio, MIN(dias) AS minimo, MAX(dias) AS maximo
+        FROM ({q})
+        GROUP BY {columna}
+        ORDER BY {columna}
+    """
+    return q, p
+
+
+def resumen_sql(dimension: str, f_ini: datetime | None = None, f_fin: datetime | None = None) -> list[tuple]:
+    """(clave, altas, promedio, mínimo, máximo) exactos por grupo, calculados en SQLite."""
+    return Database.get_execute(*_consulta_resumen(dimension, f_ini, f_fin))
+
+
+# -------------------- streaming --------------------
+def analizar(f_ini: datetime | None = None, f_fin: datetime | None = None,
+             alfa: float = ALFA) -> dict[str, dict[int | str, SketchCuantiles]]:
+    """
+    Una pasada sobre las estadías cerradas: {dimension: {clave: sketch}} más
+    {"total": {"": sketch}} con todas juntas.
+    """
+    resultado: dict[str, dict] = {d: {} for d in DIMENSIONES}
+    total = SketchCuantiles(alfa)
+    por_medico, por_tipo, por_mes = resultado["medico"], resultado["tipo"], resultado["mes"]
+    for lote in Database.iter_execute(*_consulta_estadias(f_ini, f_fin), batch_size=5000):
+        for medico_id, tipo, mes, dias in lote:
+            for grupos, clave in ((por_medico, medico_id), (por_tipo, tipo), (por_mes, mes)):
+                sketch = grupos.get(clave)
+                if sketch is None:
+                    sketch = grupos[clave] = SketchCuantiles(alfa)
+                sketch.agregar(dias)
+            total.agregar(dias)
+    resultado["total"] = {"": total}
+    return resultado
+
+
+def _consulta_estadias_columnas(f_ini: datetime | None = None, f_fin: datetime | None = None) -> tuple[str, tuple]:
+    """
+    Como _consulta_estadias, con cama_id en lugar del tipo, el mes como entero AAAAMM y el médico
+    NULL como columnar.SIN_ID (cama_id nunca es NULL: el JOIN con camas descarta esas filas).
+    """
+    columnas = (f"COALESCE(m.medico_id, {columnar.SIN_ID}) AS medico_id, m.cama_id, "
+                "CAST(substr(m.fecha_egreso, 1, 4) || substr(m.fecha_egreso, 6, 2) AS INTEGER) AS mes")
+    return _estadias_cerradas(columnas, f_ini, f_fin)
+
+
+def analizar_columnas(f_ini: datetime | None = None, f_fin: datetime | None = None, alfa: float = ALFA,
+                      usar_numpy: bool | None = None) -> dict[str, dict[int | str, SketchCuantiles]]:
+    """
+    Lo mismo que `analizar`, en modo columnar: las duraciones se leen en un array, se agrupan por
+    médico, tipo y mes, y cada grupo entra a su sketch de una vez (agregar_columna). Las cubetas
+    se calculan una sola vez por valor.
+    """
+    cols = columnar.leer(*_consulta_estadias_columnas(f_ini, f_fin),
+                         {"medico_id": "q", "cama_id": "q", "mes": "q", "dias": "d"}, usar_numpy)
+    dias = cols["dias"]
+    total = SketchCuantiles(alfa)
+    cubetas = total.cubetas_de(dias)
+
+    def sketches(claves: Sequence) -> dict:
+        grupos = {}
+        for clave, (valores, indices) in columnar.agrupar(claves, dias, cubetas).items():
+            sketch = grupos[clave] = SketchCuantiles(alfa)
+            sketch.agregar_columna(valores, indices)
+        return grupos
+
+    # El tipo como código entero por fila (posición en `tipos`), para agrupar igual que las demás.
+    tipo_de_cama = dict(Database.get_execute("SELECT c.id, h.tipo FROM camas c JOIN habitaciones h ON h.id = c.habitacion_id"))
+    tipos = sorted(set(tipo_de_cama.values()))
+    codigo_de_cama = {cama_id: tipos.index(tipo) for cama_id, tipo in tipo_de_cama.items()}
+    codigos = array("q", map(codigo_de_cama.__getitem__, cols["cama_id"]))
+    if columnar.np is not None and isinstance(dias, columnar.np.ndarray):
+        codigos = columnar.np.frombuffer(codigos, dtype="int64")
+    total.agregar_columna(dias, cubetas)
+    return {
+        "medico": {None if medico == columnar.SIN_ID else medico: s
+                   for medico, s in sketches(cols["medico_id"]).items()},
+        "tipo": {tipos[codigo]: s for codigo, s in sketches(codigos).items()},
+        "mes": {f"{mes // 100:04d}-{mes % 100:02d}": s for mes, s in sketches(cols["mes"]).items()},
+        "total": {"": total},
+    }
+
+
+def filas(sketches: dict[int | str, SketchCuantiles], dimension: str) -> list[FilaEstadia]:
+    """Aplana los sketches de una dimensión en filas para tablas y consola."""
+    nombres: dict[int, str] = {}
+    if dimension == "medico":
+        nombres = {m.id: m.nombre for m in MedicoManager.get_list()}
+    out = []
+    for clave in sorted(sketches, key=lambda c: (c is None, c)):
+        s = sketches[clave]
+        etiqueta = nombres.get(clave, str(clave)) if dimension == "medico" else str(clave or "Total")
+        out.append(FilaEstadia(clave, etiqueta, s.n, s.promedio, s.cuantil(0.5), s.cuantil(0.9),
+                               s.cuantil(0.99), s.maximo))
+    return out
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Duración de estadías: promedio y percentiles.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite")
+    parser.add_argument("--por", choices=DIMENSIONES, default="tipo", help="agrupamiento")
+    parser.add_argument("--desde", type=datetime.fromisoformat, help="altas desde YYYY-MM-DD")
+    parser.add_argument("--hasta", type=datetime.fromisoformat, help="altas hasta YYYY-MM-DD (inclusive)")
+    parser.add_argument("--alfa", type=float, default=ALFA, help="error relativo de los percentiles")
+    args = parser.parse_args(argv)
+    if (args.desde is None) != (args.hasta is None):
+        parser.error("--desde y --hasta van juntos")
+
+    Database.open(args.db)
+    try:
+        with Database.snapshot():
+            sketches = analizar(args.desde, args.hasta, args.alfa)
+            tabla = filas(sketches[args.por], args.por) + filas(sketches["total"], "total")
+    finally:
+        Database.close_connection()
+    print(f"{'grupo':<28} {'altas':>8} {'prom':>7} {'p50':>7} {'p90':>7} {'p99':>7} {'max':>7}  (días)")
+    for f in tabla:
+        print(f"{f.etiqueta[:28]:<28} {f.altas:>8} {f.promedio:>7.2f} {f.p50:>7.2f} {f.p90:>7.2f} "
+              f"{f.p99:>7.2f} {f.maximo:>7.2f}")
+    total = sketches["total"][""]
+    print("Histograma:", "  ".join(
+        f"{etiqueta}: {c}" for etiqueta, c in zip(etiquetas_histograma(), total.histograma())))
+
+
+if __name__ == "__main__":
+    main()
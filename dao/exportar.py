@@ -0,0 +1,233 @@
+# exportar.py
+"""
+Exportación de informes y tablas a CSV o NDJSON (opcionalmente gzip).
+
+Las filas se leen del cursor de SQLite por lotes y se escriben directo al archivo,
+así que la memoria no depende del tamaño del resultado. El formateo de fechas se
+hace en el propio SQL (strftime) en lugar de fila por fila en Python.
+
+Uso por consola:
+    python -m dao.exportar informe ingresados_entre --desde 2024-01-01 --hasta 2024-12-31 -o ingresos.csv.gz
+    python -m dao.exportar tabla movimientos -o movimientos.ndjson
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import json
+from datetime import datetime
+from sqlite3 import Connection
+from typing import Callable, Iterable, TextIO
+
+from dao.conn import Database
+from dao import censo, rollups
+from dao.managers import (
+    BaseManager,
+    PacienteManager,
+    MedicoManager,
+    HabitacionManager,
+    CamaManager,
+    MovimientoManager,
+    SQLBuilder,
+)
+
+FORMATOS = ("csv", "ndjson")
+FORMATOS_FECHA = ("iso", "ui")
+UI_DATETIME_SQL = "%d/%m/%Y %H:%M"
+
+# nombre -> función que arma (query, params) a partir de los argumentos del informe
+INFORMES: dict[str, Callable[..., tuple[str, tuple]]] = {
+    "camas_ocupadas": MovimientoManager._consulta_detalle_camas_ocupadas,
+    "internaciones_abiertas": MovimientoManager._consulta_internaciones_abiertas,
+    "ingresados_por_medico": MovimientoManager._consulta_ingresados_por_medico,
+    "ingresados_entre": MovimientoManager._consulta_ingresados_entre,
+    "altas_entre": MovimientoManager._consulta_altas_entre,
+    "multiples_ingresos": MovimientoManager._consulta_pacientes_con_multiples_ingresos,
+    "medicos_ordenados": MedicoManager._consulta_listar_ordenado,
+    "readmisiones": MovimientoManager._consulta_readmisiones,
+    "resumen_por_tipo": rollups._consulta_resumen_por_tipo,
+    "resumen_por_medico": rollups._consulta_resumen_por_medico,
+    "censo_diario": rollups._consulta_censo_diario,
+    "ocupacion_por_habitacion": censo._consulta_ocupacion_por_habitacion,
+}
+INFORMES_ENTRE_FECHAS = {"ingresados_entre", "altas_entre", "resumen_por_tipo", "resumen_por_medico", "censo_diario",
+                         "ocupacion_por_habitacion"}
+
+TABLAS: dict[str, type[BaseManager]] = {
+    m.table_name: m
+    for m in (PacienteManager, MedicoManager, HabitacionManager, CamaManager, MovimientoManager)
+}
+
+
+# -------------------- helpers --------------------
+def _es_columna_fecha(nombre: str) -> bool:
+    return nombre.startswith("fecha")
+
+
+def _columnas(conexion: Connection, query: str, params: tuple) -> list[str]:
+    cursor = conexion.execute(f"SELECT * FROM ({query}) LIMIT 0", params)
+    columnas = [d[0] for d in cursor.description]
+    cursor.close()
+    return columnas
+
+
+def _envolver_fechas(query: str, columnas: list[str], formato_fecha: str) -> tuple[str, tuple]:
+    """Reescribe la consulta para formatear las columnas fecha* dentro de SQLite."""
+    if formato_fecha == "iso" or not any(_es_columna_fecha(c) for c in columnas):
+        return query, ()
+    select = []
+    extra: list[str] = []
+    for c in columnas:
+        if _es_columna_fecha(c):
+            select.append(f'strftime(?, "{c}") AS "{c}"')
+            extra.append(UI_DATETIME_SQL)
+        else:
+            select.append(f'"{c}"')
+    return f"SELECT {', '.join(select)} FROM ({query})", tuple(extra)
+
+
+def _abrir_destino(destino: str, comprimir: bool) -> TextIO:
+    if comprimir:
+        return gzip.open(destino, "wt", encoding="utf-8", newline="")
+    return open(destino, "w", encoding="utf-8", newline="")
+
+
+def _escribir_csv(salida: TextIO, columnas: list[str], lotes: Iterable[list[tuple]]) -> int:
+    writer = csv.writer(salida)
+    writer.writerow(columnas)
+    total = 0
+    for lote in lotes:
+        writer.writerows(lote)
+        total += len(lote)
+    return total
+
+
+def _escribir_ndjson(salida: TextIO, columnas: list[str], lotes: Iterable[list[tuple]]) -> int:
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    total = 0
+    for lote in lotes:
+        salida.write("".join(dumps(dict(zip(columnas, fila))) + "\n" for fila in lote))
+        total += len(lote)
+    return total
+
+
+def formato_desde_archivo(destino: str) -> tuple[str, bool]:
+    """Infiere (formato, comprimir) a partir de la extensión: .csv, .ndjson/.jsonl y .gz."""
+    nombre = destino.lower()
+    comprimir = nombre.endswith(".gz")
+    if comprimir:
+        nombre = nombre[:-3]
+    formato = "ndjson" if nombre.endswith((".ndjson", ".jsonl", ".json")) else "csv"
+    return formato, comprimir
+
+
+# -------------------- API --------------------
+def exportar_consulta(
+    query: str,
+    params: tuple,
+    destino: str,
+    formato: str = "csv",
+    comprimir: bool = False,
+    formato_fecha: str = "iso",
+    conexion: Connection | None = None,
+    batch_size: int = 5000,
+) -> int:
+    """
+    Ejecuta la consulta y vuelca el resultado en `destino`. Devuelve la cantidad de filas.
+    Si no se pasa `conexion`, abre una propia de solo lectura (apta para correr en un hilo de fondo).
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}. Opciones: {', '.join(FORMATOS)}")
+    if formato_fecha not in FORMATOS_FECHA:
+        raise ValueError(f"Formato de fecha inválido: {formato_fecha}.")
+
+    propia = conexion is None
+    conexion = conexion or Database.read_only_connection()
+    try:
+        if propia:
+            conexion.execute("BEGIN")  # una sola instantánea para toda la exportación
+        columnas = _columnas(conexion, query, params)
+        query_final, params_fecha = _envolver_fechas(query, columnas, formato_fecha)
+        lotes = Database.iter_execute(query_final, params_fecha + tuple(params), batch_size, connection=conexion)
+        escribir = _escribir_csv if formato == "csv" else _escribir_ndjson
+        with _abrir_destino(destino, comprimir) as salida:
+            return escribir(salida, columnas, lotes)
+    finally:
+        if propia:
+            conexion.close()
+
+
+def exportar_informe(nombre: str, destino: str, *args, **opciones) -> int:
+    """Exporta uno de los INFORMES; `args` son los mismos parámetros que recibe el manager."""
+    if nombre not in INFORMES:
+        raise ValueError(f"Informe inexistente: {nombre}.")
+    query, params = INFORMES[nombre](*args)
+    return exportar_consulta(query, params, destino, **opciones)
+
+
+def exportar_tabla(tabla: str, destino: str, **opciones) -> int:
+    """Exporta una tabla completa de las que administran los managers."""
+    manager = TABLAS.get(tabla)
+    if manager is None:
+        raise ValueError(f"Tabla inexistente: {tabla}.")
+    query = SQLBuilder.build_select_query(manager.table_name, manager.keys) + " ORDER BY id"
+    return exportar_consulta(query, (), destino, **opciones)
+
+
+# -------------------- CLI --------------------
+def _parse_fecha(s: str) -> datetime:
+    return datetime.fromisoformat(s)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Exporta informes o tablas a CSV/NDJSON.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite")
+    sub = parser.add_subparsers(dest="tipo", required=True)
+
+    p_inf = sub.add_parser("informe")
+    p_inf.add_argument("nombre", choices=sorted(INFORMES))
+    p_inf.add_argument("--medico", type=int, help="id de médico (ingresados_por_medico)")
+    p_inf.add_argument("--desde", type=_parse_fecha, help="YYYY-MM-DD (informes entre fechas)")
+    p_inf.add_argument("--hasta", type=_parse_fecha, help="YYYY-MM-DD (informes entre fechas)")
+    p_inf.add_argument("--criterio", default="id", help="orden (medicos_ordenados)")
+    p_inf.add_argument("--dias", type=int, default=30, help="ventana de reingreso (readmisiones)")
+
+    p_tab = sub.add_parser("tabla")
+    p_tab.add_argument("nombre", choices=sorted(TABLAS))
+
+    for p in (p_inf, p_tab):
+        p.add_argument("-o", "--salida", required=True, help="archivo destino (.csv, .ndjson, opcional .gz)")
+        p.add_argument("--fechas", choices=FORMATOS_FECHA, default="iso", help="formato de columnas fecha")
+
+    args = parser.parse_args(argv)
+    Database.open(args.db)
+    try:
+        formato, comprimir = formato_desde_archivo(args.salida)
+        opciones = {"formato": formato, "comprimir": comprimir, "formato_fecha": args.fechas}
+
+        if args.tipo == "tabla":
+            total = exportar_tabla(args.nombre, args.salida, **opciones)
+        else:
+            if args.nombre == "ingresados_por_medico":
+                if args.medico is None:
+                    parser.error("--medico es obligatorio para ingresados_por_medico")
+                params = (args.medico,)
+            elif args.nombre in INFORMES_ENTRE_FECHAS:
+                if args.desde is None or args.hasta is None:
+                    parser.error("--desde y --hasta son obligatorios")
+                params = (args.desde, args.hasta)
+            elif args.nombre == "medicos_ordenados":
+                params = (args.criterio,)
+            elif args.nombre == "readmisiones":
+                params = (args.dias,)
+            else:
+                params = ()
+            total = exportar_informe(args.nombre, args.salida, *params, **opciones)
+    finally:
+        Database.close_connection()
+    print(f"{total} filas exportadas a {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# generador.py
+"""
+Generador de datos sintéticos para probar la aplicación a escala.
+
+Crea habitaciones por TipoHabitacion (con tantas camas como su capacidad), médicos con
+matrícula única, pacientes y años de movimientos sin superposición por cama ni por paciente.
+Las estadías siguen una distribución log-normal por tipo de habitación y las camas rotan con
+un tiempo de recambio exponencial. Las estadías que siguen en curso al final del período
+quedan abiertas (fecha_egreso NULL), como en producción.
+
+Con la misma semilla y la misma fecha `hasta` el resultado es idéntico; `hasta` tiene un default
+fijo (HASTA), no la fecha actual, así que alcanza con la semilla.
+
+Uso por consola:
+    python -m dao.generador datos.db --estadias 1000000 --anios 5 --seed 7
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import math
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from dao.conn import Database
+from dao import intervalos, rollups
+from dao.importar import indices_diferibles
+from dao.managers import (
+    PacienteManager,
+    MedicoManager,
+    HabitacionManager,
+    CamaManager,
+    MovimientoManager,
+)
+from dao.objetos import tipos_habitacion as TH
+
+# tipo -> (proporción de camas, mediana de estadía en días)
+PERFILES: dict[str, tuple[float, float]] = {
+    TH.SALA_COMUN.tipo: (0.40, 4.0),
+    TH.UCI.tipo: (0.08, 6.0),
+    TH.PEDIATRIA.tipo: (0.12, 3.0),
+    TH.OBSTETRICIA.tipo: (0.10, 2.5),
+    TH.NEONATOLOGIA.tipo: (0.07, 8.0),
+    TH.CIRUGIA.tipo: (0.10, 3.0),
+    TH.REHABILITACION.tipo: (0.08, 14.0),
+    TH.PALIATIVOS.tipo: (0.05, 10.0),
+}
+SIGMA_ESTADIA = 0.75          # dispersión log-normal de la estadía
+RECAMBIO_MEDIO_DIAS = 0.5     # tiempo medio entre alta e ingreso siguiente en una cama
+ESTADIAS_POR_PACIENTE = 3     # reingresos promedio
+LOTE = 100_000
+HASTA = datetime(2025, 1, 1)  # fin del período por defecto: fijo, para que la base sea reproducible
+
+NOMBRES = ("Ana", "Juan", "María", "Carlos", "Lucía", "Jorge", "Sofía", "Diego", "Valeria", "Martín",
+           "Paula", "Pedro", "Laura", "Miguel", "Carla", "Andrés", "Julia", "Tomás", "Elena", "Raúl")
+APELLIDOS = ("González", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez",
+             "García", "Sánchez", "Romero", "Sosa", "Álvarez", "Torres", "Ruiz", "Ramírez")
+OBRAS_SOCIALES = ("OSDE", "PAMI", "IOMA", "Swiss Medical", "Galeno", "OSECAC", "Particular")
+ESPECIALIDADES = ("Clínica Médica", "Cardiología", "Pediatría", "Obstetricia", "Neonatología",
+                  "Cirugía General", "Traumatología", "Terapia Intensiva", "Kinesiología", "Oncología")
+
+
+@dataclass
+class ResumenGeneracion:
+    habitaciones: int = 0
+    camas: int = 0
+    medicos: int = 0
+    pacientes: int = 0
+    estadias: int = 0
+    abiertas: int = 0
+    segundos: float = 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.habitaciones} habitaciones, {self.camas} camas, {self.medicos} médicos, "
+                f"{self.pacientes} pacientes, {self.estadias} estadías ({self.abiertas} abiertas) "
+                f"en {self.segundos:.1f}s")
+
+
+def tipos_habitacion() -> list[TH.TipoHabitacion]:
+    return [v for v in vars(TH).values() if isinstance(v, TH.TipoHabitacion)]
+
+
+def _media_lognormal(mediana: float) -> float:
+    return mediana * math.exp(SIGMA_ESTADIA ** 2 / 2)
+
+
+def _camas_necesarias(estadias: int, anios: float) -> int:
+    # Cada cama rota 1 / (estadía media + recambio) veces por día según su tipo.
+    rotacion = sum(prop / (_media_lognormal(med) + RECAMBIO_MEDIO_DIAS) for prop, med in PERFILES.values())
+    return max(len(PERFILES), math.ceil(estadias / (anios * 365 * rotacion)))
+
+
+def _nombre(rng: random.Random) -> str:
+    return f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}"
+
+
+def _insertar(conexion, tabla: str, columnas: tuple[str, ...], filas) -> None:
+    query = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' for _ in columnas)})"
+    conexion.executemany(query, filas)
+
+
+def generar(db_file: str, estadias: int, anios: float = 3, seed: int = 42,
+            hasta: datetime | None = None) -> ResumenGeneracion:
+    """
+    Llena `db_file` (que debe estar vacío) con un hospital sintético de ~`estadias` estadías.
+    La cantidad de camas se dimensiona para esa escala y se simula el período completo,
+    así que el total real difiere del pedido en unos pocos puntos porcentuales.
+    """
+    inicio_reloj = time.perf_counter()
+    rng = random.Random(seed)
+    hasta = (hasta or HASTA).replace(second=0, microsecond=0)
+    desde = hasta - timedelta(days=anios * 365)
+    resumen = ResumenGeneracion()
+
+    Database.open(db_file)
+    for manager in (PacienteManager, MedicoManager, HabitacionManager, CamaManager, MovimientoManager):
+        manager.create_table()
+    conexion = Database.get_connection()
+    if conexion.execute("SELECT COUNT(*) FROM movimientos").fetchone()[0]:
+        raise ValueError(f"{db_file} ya tiene movimientos; usá un archivo nuevo.")
+    # Archivo nuevo: se prioriza velocidad de carga sobre durabilidad.
+    conexion.execute("PRAGMA synchronous = OFF")
+    conexion.execute("PRAGMA journal_mode = MEMORY")
+
+    # ---------- habitaciones y camas ----------
+    total_camas = _camas_necesarias(estadias, anios)
+    perfiles = {t.tipo: t for t in tipos_habitacion()}
+    habitaciones = []
+    numero = 100
+    for tipo, (proporcion, _mediana) in PERFILES.items():
+        capacidad = perfiles[tipo].capacidad
+        for _ in range(max(1, round(total_camas * proporcion / capacidad))):
+            numero += 1
+            habitaciones.append((numero, tipo, capacidad))
+    with conexion:
+        _insertar(conexion, "habitaciones", HabitacionManager.keys[1:], habitaciones)
+    camas_tipo: list[str] = []  # índice = cama_id - 1
+    with conexion:
+        filas_camas = []
+        for hab_id, _numero, tipo, capacidad in conexion.execute("SELECT id, numero, tipo, capacidad FROM habitaciones ORDER BY id"):
+            for _ in range(capacidad):
+                filas_camas.append((hab_id,))
+                camas_tipo.append(tipo)
+        _insertar(conexion, "camas", CamaManager.keys[1:], filas_camas)
+    resumen.habitaciones = len(habitaciones)
+    resumen.camas = len(camas_tipo)
+
+    # ---------- médicos y pacientes ----------
+    cant_medicos = max(10, resumen.camas // 4)
+    with conexion:
+        _insertar(conexion, "medicos", MedicoManager.keys[1:], (
+            (f"{_nombre(rng)}", 10000 + i, ESPECIALIDADES[i % len(ESPECIALIDADES)])
+            for i in range(cant_medicos)
+        ))
+    cant_pacientes = max(2 * resumen.camas, estadias // ESTADIAS_POR_PACIENTE)
+    with conexion:
+        _insertar(conexion, "pacientes", PacienteManager.keys[1:], (
+            (_nombre(rng), rng.choice(OBRAS_SOCIALES), f"{rng.randrange(10**9):09d}",
+             f"Calle {rng.randrange(1, 500)} {rng.randrange(1, 5000)}", f"11-{rng.randrange(10**8):08d}")
+            for _ in range(cant_pacientes)
+        ))
+    resumen.medicos = cant_medicos
+    resumen.pacientes = cant_pacientes
+
+    # ---------- movimientos ----------
+    diferidos = indices_diferibles(conexion, "movimientos")
+    for indice, _sql in diferidos:
+        conexion.execute(f"DROP INDEX {indice}")
+    with rollups.suspendido(conexion), intervalos.suspendido(conexion):
+        _simular_estadias(conexion, rng, desde, hasta, camas_tipo, cant_pacientes, cant_medicos, resumen)
+
+    for _indice, sql in diferidos:
+        conexion.execute(sql)
+    conexion.execute("ANALYZE")
+    conexion.commit()
+    conexion.execute("PRAGMA synchronous = FULL")
+    resumen.segundos = time.perf_counter() - inicio_reloj
+    return resumen
+
+
+def _simular_estadias(conexion, rng: random.Random, desde: datetime, hasta: datetime, camas_tipo: list[str],
+                      cant_pacientes: int, cant_medicos: int, resumen: ResumenGeneracion) -> None:
+    # Barrido temporal: heap de camas por próximo ingreso, así las estadías salen ordenadas por
+    # fecha_ingreso y en memoria solo viven las camas y los pacientes internados.
+    mu_tipo = {tipo: math.log(mediana) for tipo, (_p, mediana) in PERFILES.items()}
+    horizonte = (hasta - desde).total_seconds() / 86400
+    proximos = [(rng.uniform(0, RECAMBIO_MEDIO_DIAS + _media_lognormal(PERFILES[t][1])), cama_id)
+                for cama_id, t in enumerate(camas_tipo, start=1)]
+    heapq.heapify(proximos)
+    libres = list(range(1, cant_pacientes + 1))
+    internados: list[tuple[float, int]] = []  # (egreso, paciente_id)
+    lognormvariate, expovariate, randrange = rng.lognormvariate, rng.expovariate, rng.randrange
+    lote: list[tuple] = []
+
+    def iso(dias: float) -> str:
+        return (desde + timedelta(minutes=int(dias * 1440))).isoformat()
+
+    while proximos:
+        t, cama_id = heapq.heappop(proximos)
+        if t > horizonte:
+            continue
+        while internados and internados[0][0] <= t:
+            libres.append(heapq.heappop(internados)[1])
+        i = randrange(len(libres))
+        libres[i], libres[-1] = libres[-1], libres[i]
+        paciente_id = libres.pop()
+
+        egreso = t + lognormvariate(mu_tipo[camas_tipo[cama_id - 1]], SIGMA_ESTADIA)
+        if egreso > horizonte:
+            egreso_iso = None
+            resumen.abiertas += 1
+        else:
+            egreso_iso = iso(egreso)
+            heapq.heappush(internados, (egreso, paciente_id))
+            heapq.heappush(proximos, (egreso + expovariate(1 / RECAMBIO_MEDIO_DIAS), cama_id))
+        lote.append((cama_id, paciente_id, 1 + randrange(cant_medicos), iso(t), egreso_iso))
+        resumen.estadias += 1
+        if len(lote) >= LOTE:
+            with conexion:
+                _insertar(conexion, "movimientos", MovimientoManager.keys[1:], lote)
+            lote.clear()
+    if lote:
+        with conexion:
+            _insertar(conexion, "movimientos", MovimientoManager.keys[1:], lote)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Genera una base sintética del nosocomio.")
+    parser.add_argument("db", help="archivo SQLite destino")
+    parser.add_argument("--estadias", type=int, default=100_000, help="cantidad aproximada de movimientos")
+    parser.add_argument("--anios", type=float, default=3, help="años de historia")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--hasta", type=datetime.fromisoformat, help=f"fin del período (default: {HASTA.date()})")
+    parser.add_argument("--sobrescribir", action="store_true", help="borra el archivo si existe")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db):
+        if not args.sobrescribir:
+            parser.error(f"{args.db} ya existe (usá --sobrescribir)")
+        os.remove(args.db)
+    print(generar(args.db, args.estadias, args.anios, args.seed, args.hasta))
+
+
+if __name__ == "__main__":
+    main()
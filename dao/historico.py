@@ -0,0 +1,136 @@
+# historico.py
+"""
+Archivado de estadías cerradas en una base SQLite aparte, adjunta con ATTACH.
+
+Las estadías con fecha_egreso anterior al corte se mueven de `movimientos` a
+`historico.movimientos` (por defecto nosocomio_historico.db, ver Database.historico_file).
+Así la tabla viva queda chica y caliente en el cache de páginas. La marca de agua (`corte`)
+se guarda en `historico.archivo_meta`: todo lo cerrado antes del corte está en el histórico y
+todo lo demás en la base viva. Los informes de MovimientoManager que miran historia suman
+ambas tablas con UNION ALL, y en los rangos de fechas solo leen el histórico si el rango
+empieza antes del corte.
+
+El corte solo avanza. Como los ids vienen de AUTOINCREMENT, no se reutilizan los archivados.
+Con la base principal en WAL, una transacción sobre dos archivos es atómica en cada uno pero
+no en conjunto: si el proceso muere entre el INSERT y el DELETE de un lote, volver a correr
+el archivado lo completa (el INSERT ignora ids ya copiados).
+
+Uso por consola:
+    python -m dao.historico --dias 365
+    python -m dao.historico --antes 2024-01-01 --db nosocomio.db
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlite3 import Connection
+
+from dao.conn import Database
+from dao import intervalos, rollups
+from dao.managers import MovimientoManager
+
+LOTE = 20_000
+HORIZONTE_DIAS = 365
+
+_INDICES = (
+    "CREATE INDEX IF NOT EXISTS historico.idx_hist_ingreso ON movimientos(fecha_ingreso)",
+    "CREATE INDEX IF NOT EXISTS historico.idx_hist_egreso ON movimientos(fecha_egreso)",
+    "CREATE INDEX IF NOT EXISTS historico.idx_hist_paciente ON movimientos(paciente_id, fecha_ingreso)",
+    "CREATE INDEX IF NOT EXISTS historico.idx_hist_medico ON movimientos(medico_id, fecha_ingreso)",
+)
+
+
+@dataclass
+class ResultadoArchivado:
+    corte: str
+    movidas: int = 0
+    segundos: float = 0.0
+
+    def __str__(self) -> str:
+        return f"{self.movidas} estadías archivadas (cerradas antes de {self.corte}) en {self.segundos:.1f}s"
+
+
+def _preparar(conexion: Connection) -> None:
+    """Adjunta el histórico (creándolo si hace falta) y asegura su esquema."""
+    Database.historico_adjunto = Database.adjuntar_historico(conexion, crear=True)
+    columnas = ", ".join(
+        f"{k} {'INTEGER PRIMARY KEY' if k == 'id' else t}"
+        for k, t in zip(MovimientoManager.keys, MovimientoManager.key_types)
+    )
+    with conexion:
+        conexion.execute(f"CREATE TABLE IF NOT EXISTS historico.movimientos ({columnas})")
+        conexion.execute("CREATE TABLE IF NOT EXISTS historico.archivo_meta (clave TEXT PRIMARY KEY, valor TEXT)")
+        for query in _INDICES:
+            conexion.execute(query)
+    intervalos.crear(conexion, "historico")
+
+
+def corte_actual(conexion: Connection | None = None) -> str | None:
+    """Marca de agua vigente, o None si nunca se archivó."""
+    conexion = conexion or Database.get_connection()
+    if not Database.refrescar_historico():
+        return None
+    fila = conexion.execute(MovimientoManager.CORTE_HISTORICO_SQL).fetchone()
+    return fila[0] if fila else None
+
+
+def archivar(antes_de: datetime, lote: int = LOTE) -> ResultadoArchivado:
+    """Mueve al histórico las estadías cerradas antes de `antes_de` sobre la conexión principal."""
+    inicio = time.perf_counter()
+    conexion = Database.get_connection()
+    _preparar(conexion)
+    corte = max(antes_de.isoformat(), corte_actual(conexion) or "")
+    resultado = ResultadoArchivado(corte)
+
+    # Primero el corte: mientras se mueven los lotes, los informes ya consultan el histórico
+    # para todo rango que empiece antes del nuevo corte, así ninguna fila queda invisible.
+    with conexion:
+        conexion.execute(
+            "INSERT INTO historico.archivo_meta (clave, valor) VALUES ('corte', ?) "
+            "ON CONFLICT(clave) DO UPDATE SET valor = excluded.valor",
+            (corte,),
+        )
+    columnas = ", ".join(MovimientoManager.keys)
+    seleccion = "SELECT id FROM main.movimientos WHERE fecha_egreso < ? ORDER BY fecha_egreso LIMIT ?"
+    while True:
+        with conexion:
+            ids = [f[0] for f in conexion.execute(seleccion, (corte, lote))]
+            if not ids:
+                break
+            marcas = ", ".join("?" for _ in ids)
+            conexion.execute(
+                f"INSERT OR IGNORE INTO historico.movimientos ({columnas}) "
+                f"SELECT {columnas} FROM main.movimientos WHERE id IN ({marcas})", ids)
+            with rollups.conservando(conexion):
+                conexion.execute(f"DELETE FROM main.movimientos WHERE id IN ({marcas})", ids)
+        resultado.movidas += len(ids)
+    if resultado.movidas:
+        conexion.execute("ANALYZE main.movimientos")
+        conexion.execute("ANALYZE historico.movimientos")
+        conexion.commit()
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Archiva estadías cerradas en la base histórica.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite de la base viva")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--antes", type=datetime.fromisoformat, help="archiva lo cerrado antes de esta fecha")
+    grupo.add_argument("--dias", type=int, default=HORIZONTE_DIAS, help="archiva lo cerrado hace más de N días")
+    parser.add_argument("--lote", type=int, default=LOTE, help="estadías por transacción")
+    args = parser.parse_args(argv)
+
+    antes = args.antes or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=args.dias)
+    Database.open(args.db)
+    try:
+        print(archivar(antes, args.lote))
+        print(f"Histórico: {Database.historico_file()}")
+    finally:
+        Database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
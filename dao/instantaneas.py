@@ -0,0 +1,190 @@
+# instantaneas.py
+"""
+Instantáneas de informes precalculadas por período, para el recambio de guardia: a primera hora
+todas las estaciones abren Informes a la vez y pedirían los mismos informes de ayer y de la
+última semana.
+
+Un proceso programado (sin interfaz) calcula un conjunto configurable de informes para cada
+período y los guarda en la tabla `instantaneas_informes`, una fila por (informe, desde, hasta)
+con las columnas y filas del resultado en JSON comprimido con zlib. InformesFrame usa la
+instantánea cuando se pide exactamente ese período, muestra cuándo se calculó, y consulta en vivo
+en cualquier otro caso.
+
+Una instantánea es la foto del momento en que se calculó: las correcciones posteriores sobre el
+período (un alta cargada tarde) aparecen recién al volver a calcularla.
+
+Uso por consola (p.ej. desde cron, todas las noches después de las 00:00):
+    python -m dao.instantaneas --db nosocomio.db
+    python -m dao.instantaneas --informe ingresados_entre --informe altas_entre --periodo ayer --hoy 2024-12-31
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from sqlite3 import Connection
+from typing import Callable
+
+from dao import censo
+from dao.conn import Database
+from dao.managers import MovimientoManager
+
+TABLA = "instantaneas_informes"
+CONSERVAR_DIAS = 60
+
+# nombre -> (query, params) del período [desde, hasta] (días inclusive)
+INFORMES: dict[str, Callable[[datetime, datetime], tuple[str, tuple]]] = {
+    "ingresados_entre": MovimientoManager._consulta_ingresados_entre,
+    "altas_entre": MovimientoManager._consulta_altas_entre,
+    "ocupacion_por_habitacion": censo._consulta_ocupacion_por_habitacion,
+    # Sin período propio: la lista al momento del cálculo.
+    "multiples_ingresos": lambda desde, hasta: MovimientoManager._consulta_pacientes_con_multiples_ingresos(),
+}
+# Informes que no dependen del período: se guardan una sola vez, bajo el primer período calculado.
+SIN_PERIODO = {"multiples_ingresos"}
+
+# nombre -> (desde, hasta) a partir de la fecha del cálculo
+PERIODOS: dict[str, Callable[[date], tuple[date, date]]] = {
+    "ayer": lambda hoy: (hoy - timedelta(days=1), hoy - timedelta(days=1)),
+    "semana": lambda hoy: (hoy - timedelta(days=7), hoy - timedelta(days=1)),
+}
+
+
+@dataclass
+class Instantanea:
+    informe: str
+    desde: date
+    hasta: date
+    calculado: datetime
+    columnas: list[str]
+    filas: list[tuple]
+
+
+def crear(conexion: Connection | None = None) -> None:
+    conexion = conexion or Database.get_connection()
+    with conexion:
+        conexion.execute(f"""
+            CREATE TABLE IF NOT EXISTS {TABLA} (
+                informe TEXT NOT NULL,
+                desde TEXT NOT NULL,
+                hasta TEXT NOT NULL,
+                calculado TEXT NOT NULL,
+                datos BLOB NOT NULL,
+                PRIMARY KEY (informe, desde, hasta)
+            ) WITHOUT ROWID""")
+
+
+def _existe_tabla() -> bool:
+    return Database.get_execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLA,), single=True) is not None
+
+
+def _comprimir(columnas: list[str], filas: list[tuple]) -> bytes:
+    return zlib.compress(json.dumps({"columnas": columnas, "filas": filas}, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def _ejecutar(query: str, params: tuple) -> tuple[list[str], list[tuple]]:
+    cursor = Database._read_connection().execute(query, params)
+    try:
+        return [d[0] for d in cursor.description], cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+# -------------------- cálculo --------------------
+def calcular(informes: list[str] | None = None, periodos: list[str] | None = None, hoy: date | None = None,
+             conservar_dias: int = CONSERVAR_DIAS) -> list[tuple[str, date, date, int]]:
+    """
+    Calcula `informes` x `periodos` (default: todos) relativos a `hoy`, leyendo de un solo snapshot,
+    y los guarda en una transacción. Borra las instantáneas con fin anterior a `conservar_dias`.
+    Devuelve (informe, desde, hasta, filas) de cada una.
+    """
+    informes = informes or list(INFORMES)
+    periodos = periodos or list(PERIODOS)
+    for nombre in informes:
+        if nombre not in INFORMES:
+            raise ValueError(f"Informe inválido: {nombre}. Opciones: {', '.join(INFORMES)}")
+    for nombre in periodos:
+        if nombre not in PERIODOS:
+            raise ValueError(f"Período inválido: {nombre}. Opciones: {', '.join(PERIODOS)}")
+    hoy = hoy or date.today()
+    crear()
+
+    calculado = datetime.now().replace(microsecond=0).isoformat()
+    filas_nuevas, resumen = [], []
+    with Database.snapshot():
+        for periodo in periodos:
+            desde, hasta = PERIODOS[periodo](hoy)
+            for nombre in informes:
+                if nombre in SIN_PERIODO and any(r[0] == nombre for r in resumen):
+                    continue
+                q, p = INFORMES[nombre](datetime.combine(desde, datetime.min.time()),
+                                        datetime.combine(hasta, datetime.min.time()))
+                columnas, filas = _ejecutar(q, p)
+                filas_nuevas.append((nombre, desde.isoformat(), hasta.isoformat(), calculado, _comprimir(columnas, filas)))
+                resumen.append((nombre, desde, hasta, len(filas)))
+    with Database.lote() as conexion:
+        conexion.executemany(
+            f"INSERT OR REPLACE INTO {TABLA} (informe, desde, hasta, calculado, datos) VALUES (?, ?, ?, ?, ?)",
+            filas_nuevas)
+        conexion.execute(f"DELETE FROM {TABLA} WHERE hasta < ?", ((hoy - timedelta(days=conservar_dias)).isoformat(),))
+    return resumen
+
+
+# -------------------- lectura --------------------
+def _instantanea(fila: tuple) -> Instantanea:
+    informe, desde, hasta, calculado, datos = fila
+    contenido = json.loads(zlib.decompress(datos))
+    return Instantanea(informe, date.fromisoformat(desde), date.fromisoformat(hasta),
+                       datetime.fromisoformat(calculado), contenido["columnas"],
+                       [tuple(f) for f in contenido["filas"]])
+
+
+def leer(informe: str, desde: date | datetime, hasta: date | datetime) -> Instantanea | None:
+    """La instantánea de `informe` para exactamente [desde, hasta] (días), o None."""
+    if not _existe_tabla():
+        return None
+    if isinstance(desde, datetime):
+        desde = desde.date()
+    if isinstance(hasta, datetime):
+        hasta = hasta.date()
+    fila = Database.get_execute(
+        f"SELECT informe, desde, hasta, calculado, datos FROM {TABLA} WHERE informe = ? AND desde = ? AND hasta = ?",
+        (informe, desde.isoformat(), hasta.isoformat()), single=True)
+    return _instantanea(fila) if fila else None
+
+
+def ultima(informe: str) -> Instantanea | None:
+    """La instantánea de `informe` calculada más recientemente (cualquier período), o None."""
+    if not _existe_tabla():
+        return None
+    fila = Database.get_execute(
+        f"SELECT informe, desde, hasta, calculado, datos FROM {TABLA} WHERE informe = ? "
+        "ORDER BY calculado DESC, hasta DESC LIMIT 1", (informe,), single=True)
+    return _instantanea(fila) if fila else None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Precalcula instantáneas de informes por período.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite")
+    parser.add_argument("--informe", action="append", choices=sorted(INFORMES), help="repetible (default: todos)")
+    parser.add_argument("--periodo", action="append", choices=sorted(PERIODOS), help="repetible (default: todos)")
+    parser.add_argument("--hoy", type=date.fromisoformat, help="fecha de referencia YYYY-MM-DD (default: hoy)")
+    parser.add_argument("--conservar-dias", type=int, default=CONSERVAR_DIAS, help="borra instantáneas más viejas")
+    args = parser.parse_args(argv)
+
+    Database.open(args.db)
+    try:
+        inicio = time.perf_counter()
+        resumen = calcular(args.informe, args.periodo, args.hoy, args.conservar_dias)
+    finally:
+        Database.close_connection()
+    for nombre, desde, hasta, filas in resumen:
+        print(f"{nombre:<26} {desde} .. {hasta}  {filas:>7} filas")
+    print(f"{len(resumen)} instantáneas en {time.perf_counter() - inicio:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# instrumentacion.py
+"""
+Instrumentación de consultas para dao.conn.Database.
+
+Por cada statement registra duración, filas y el punto de llamada (método del manager y
+primer frame fuera de dao/, típicamente el frame de Tk que disparó la consulta), agregando por
+SQL normalizado. Las consultas que superan el umbral se escriben en un log NDJSON, con su
+EXPLAIN QUERY PLAN si está habilitado. Al salir del proceso se puede volcar un resumen.
+
+El costo con la instrumentación activa es un perf_counter, un lookup en cache de la
+normalización y un recorrido corto de frames por statement.
+
+Configuración por variables de entorno (leídas al importar):
+    NOSOCOMIO_SQL_STATS=1          activa la instrumentación
+    NOSOCOMIO_SQL_LENTAS_MS=50     umbral de consulta lenta en milisegundos
+    NOSOCOMIO_SQL_LOG=lentas.log   archivo NDJSON de consultas lentas
+    NOSOCOMIO_SQL_EXPLAIN=1        guarda EXPLAIN QUERY PLAN de las consultas lentas
+    NOSOCOMIO_SQL_RESUMEN=ruta     destino del resumen al salir ("-" = stderr)
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from sqlite3 import Connection
+
+_DIR_DAO = os.path.dirname(os.path.abspath(__file__))
+_ARCHIVO_CONN = os.path.join(_DIR_DAO, "conn.py")
+_MAX_ORIGENES = 8
+
+_RE_ESPACIOS = re.compile(r"\s+")
+_RE_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTA_IN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=1024)
+def normalizar_sql(query: str) -> str:
+    """Colapsa espacios y reemplaza literales para agrupar statements equivalentes."""
+    sql = _RE_ESPACIOS.sub(" ", query).strip()
+    sql = _RE_TEXTO.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    return _RE_LISTA_IN.sub("(...)", sql)
+
+
+@dataclass
+class EstadisticaConsulta:
+    sql: str
+    llamadas: int = 0
+    total: float = 0.0
+    maximo: float = 0.0
+    filas: int = 0
+    lentas: int = 0
+    origenes: Counter = field(default_factory=Counter)
+
+    @property
+    def promedio(self) -> float:
+        return self.total / self.llamadas if self.llamadas else 0.0
+
+
+def _origen() -> str:
+    """'metodo <- archivo:linea funcion': método que emitió el SQL y primer frame fuera de dao/."""
+    frame = sys._getframe(2)
+    metodo = ""
+    while frame is not None:
+        archivo = frame.f_code.co_filename
+        if archivo != _ARCHIVO_CONN:
+            if not metodo:
+                metodo = frame.f_code.co_name
+            if not archivo.startswith(_DIR_DAO):
+                return f"{metodo} <- {os.path.basename(archivo)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return metodo or "?"
+
+
+class Instrumentacion:
+    def __init__(self):
+        self.activa: bool = False
+        self.umbral_lento: float = 0.05
+        self.log_lentas: str | None = None
+        self.explain: bool = False
+        self.estadisticas: dict[str, EstadisticaConsulta] = {}
+        self._planes: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._hilo = threading.local()  # segundos de SQL acumulados por hilo (ver segundos_del_hilo)
+
+    def configurar(self, activa: bool = True, umbral_ms: float | None = None, log_lentas: str | None = None,
+                   explain: bool | None = None, resumen_al_salir: str | None = None) -> None:
+        self.activa = activa
+        if umbral_ms is not None:
+            self.umbral_lento = umbral_ms / 1000
+        if log_lentas is not None:
+            self.log_lentas = log_lentas
+        if explain is not None:
+            self.explain = explain
+        if resumen_al_salir:
+            atexit.register(self.volcar_resumen, resumen_al_salir)
+
+    def configurar_desde_entorno(self) -> None:
+        if os.environ.get("NOSOCOMIO_SQL_STATS", "0") in ("", "0"):
+            return
+        self.configurar(
+            umbral_ms=float(os.environ.get("NOSOCOMIO_SQL_LENTAS_MS", "50")),
+            log_lentas=os.environ.get("NOSOCOMIO_SQL_LOG"),
+            explain=os.environ.get("NOSOCOMIO_SQL_EXPLAIN", "0") not in ("", "0"),
+            resumen_al_salir=os.environ.get("NOSOCOMIO_SQL_RESUMEN", "-"),
+        )
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self.estadisticas.clear()
+            self._planes.clear()
+
+    # ---------- registro ----------
+    def registrar(self, conexion: Connection, query: str, params: tuple, segundos: float, filas: int) -> None:
+        self._hilo.segundos = getattr(self._hilo, "segundos", 0.0) + segundos
+        sql = normalizar_sql(query)
+        origen = _origen()
+        lenta = segundos >= self.umbral_lento
+        with self._lock:
+            est = self.estadisticas.get(sql)
+            if est is None:
+                est = self.estadisticas[sql] = EstadisticaConsulta(sql)
+            est.llamadas += 1
+            est.total += segundos
+            est.filas += filas
+            if segundos > est.maximo:
+                est.maximo = segundos
+            if origen in est.origenes or len(est.origenes) < _MAX_ORIGENES:
+                est.origenes[origen] += 1
+            if lenta:
+                est.lentas += 1
+        if lenta and self.log_lentas:
+            self._log_lenta(conexion, sql, query, params, segundos, filas, origen)
+
+    def segundos_del_hilo(self) -> float:
+        """SQL medido en este hilo desde que arrancó; la diferencia entre dos lecturas es el SQL del tramo."""
+        return getattr(self._hilo, "segundos", 0.0)
+
+    def _plan(self, conexion: Connection, sql: str, query: str, params: tuple) -> str | None:
+        if sql not in self._planes:
+            if not query.lstrip().upper().startswith(("SELECT", "WITH")):
+                return None
+            try:
+                filas = conexion.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+                self._planes[sql] = " | ".join(f[-1] for f in filas)
+            except Exception as e:
+                self._planes[sql] = f"(sin plan: {e})"
+        return self._planes[sql]
+
+    def _log_lenta(self, conexion: Connection, sql: str, query: str, params: tuple,
+                   segundos: float, filas: int, origen: str) -> None:
+        registro = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ms": round(segundos * 1000, 3),
+            "filas": filas,
+            "sql": sql,
+            "params": [str(p)[:40] for p in params][:10],
+            "origen": origen,
+        }
+        if self.explain:
+            registro["plan"] = self._plan(conexion, sql, query, params)
+        with self._lock, open(self.log_lentas, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    # ---------- reportes ----------
+    def resumen(self, limite: int = 20) -> str:
+        with self._lock:
+            estadisticas = sorted(self.estadisticas.values(), key=lambda e: e.total, reverse=True)
+        lineas = [f"{'llamadas':>9} {'total ms':>10} {'prom ms':>9} {'max ms':>9} {'filas':>9} {'lentas':>6}  sql"]
+        for e in estadisticas[:limite]:
+            lineas.append(
+                f"{e.llamadas:>9} {e.total * 1000:>10.1f} {e.promedio * 1000:>9.3f} {e.maximo * 1000:>9.3f} "
+                f"{e.filas:>9} {e.lentas:>6}  {e.sql[:120]}"
+            )
+            for origen, n in e.origenes.most_common(3):
+                lineas.append(f"{'':>48}  {n:>6} x {origen}")
+        return "\n".join(lineas)
+
+    def volcar_resumen(self, destino: str = "-") -> None:
+        if not self.estadisticas:
+            return
+        texto = "=== Resumen de consultas SQL ===\n" + self.resumen() + "\n"
+        if destino == "-":
+            sys.stderr.write(texto)
+        else:
+            with open(destino, "w", encoding="utf-8") as f:
+                f.write(texto)
+
+
+instrumentacion = Instrumentacion()
+instrumentacion.configurar_desde_entorno()
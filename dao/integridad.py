@@ -0,0 +1,169 @@
+# integridad.py
+"""
+Escaneo de integridad de toda la base, para cargas masivas o arreglos a mano que saltean las
+validaciones de MovimientoManager (`ingresar`, `dar_alta`).
+
+Reglas:
+- solapamiento_cama / solapamiento_paciente: dos estadías de la misma cama (o del mismo
+  paciente) que se pisan en el tiempo, incluidas dos abiertas a la vez. Barrido ordenado: una
+  sola consulta ORDER BY clave, fecha_ingreso y, por grupo, el egreso más tardío visto hasta el
+  momento; si la estadía siguiente ingresa antes, se solapan. O(n log n) por el orden y memoria
+  constante.
+- fechas: fecha_ingreso vacía o fecha_egreso anterior a fecha_ingreso.
+- huerfanos: movimientos con cama, paciente o médico inexistentes y camas sin habitación.
+- capacidad: habitaciones con más camas que su `capacidad`.
+
+Los hallazgos se generan de a uno (`escanear`) y la consola los escribe como NDJSON a medida que
+aparecen. Incluye las estadías archivadas (dao.historico) si el histórico está adjunto.
+
+Uso por consola (sale con código 1 si hay hallazgos):
+    python -m dao.integridad
+    python -m dao.integridad --regla solapamiento_cama --regla fechas -o hallazgos.ndjson
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from dao.conn import Database
+from dao.intervalos import SIN_EGRESO
+from dao.managers import MovimientoManager
+
+LOTE = 5000
+
+
+@dataclass
+class Hallazgo:
+    regla: str
+    tabla: str
+    id: int
+    detalle: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {"regla": self.regla, "tabla": self.tabla, "id": self.id, **self.detalle}
+
+
+def _movimientos(where: str = "1") -> tuple[str, tuple]:
+    return MovimientoManager._union_historico(where, ())
+
+
+def _solapamientos(regla: str, clave: str) -> Iterator[Hallazgo]:
+    q, p = _movimientos("fecha_ingreso IS NOT NULL")
+    q = f"SELECT id, {clave}, fecha_ingreso, fecha_egreso FROM ({q}) ORDER BY {clave}, fecha_ingreso, id"
+    grupo = object()
+    ultimo_id, ultimo_egreso = None, ""
+    for lote in Database.iter_execute(q, p, batch_size=LOTE):
+        for id_, valor, ingreso, egreso in lote:
+            if valor != grupo:
+                grupo, ultimo_id, ultimo_egreso = valor, None, ""
+            elif ingreso < ultimo_egreso:
+                yield Hallazgo(regla, "movimientos", id_, {
+                    clave: valor, "fecha_ingreso": ingreso, "fecha_egreso": egreso,
+                    "solapa_con": ultimo_id, "egreso_anterior": None if ultimo_egreso == SIN_EGRESO else ultimo_egreso,
+                })
+            # Se conserva la estadía que termina más tarde: es la que puede pisar a las siguientes.
+            fin = egreso or SIN_EGRESO
+            if fin > ultimo_egreso:
+                ultimo_id, ultimo_egreso = id_, fin
+
+
+def solapamientos_cama() -> Iterator[Hallazgo]:
+    return _solapamientos("solapamiento_cama", "cama_id")
+
+
+def solapamientos_paciente() -> Iterator[Hallazgo]:
+    return _solapamientos("solapamiento_paciente", "paciente_id")
+
+
+def fechas() -> Iterator[Hallazgo]:
+    q, p = _movimientos("fecha_ingreso IS NULL OR fecha_egreso < fecha_ingreso")
+    for lote in Database.iter_execute(f"SELECT id, fecha_ingreso, fecha_egreso FROM ({q}) ORDER BY id", p):
+        for id_, ingreso, egreso in lote:
+            yield Hallazgo("fechas", "movimientos", id_, {"fecha_ingreso": ingreso, "fecha_egreso": egreso})
+
+
+def huerfanos() -> Iterator[Hallazgo]:
+    q, p = _movimientos()
+    for columna, tabla in (("cama_id", "camas"), ("paciente_id", "pacientes"), ("medico_id", "medicos")):
+        consulta = f"""
+            SELECT m.id, m.{columna} FROM ({q}) m
+            WHERE m.{columna} IS NULL OR NOT EXISTS (SELECT 1 FROM {tabla} t WHERE t.id = m.{columna})
+            ORDER BY m.id
+        """
+        for lote in Database.iter_execute(consulta, p, batch_size=LOTE):
+            for id_, valor in lote:
+                yield Hallazgo("huerfanos", "movimientos", id_, {columna: valor, "falta_en": tabla})
+    consulta = """
+        SELECT c.id, c.habitacion_id FROM camas c
+        WHERE c.habitacion_id IS NULL OR NOT EXISTS (SELECT 1 FROM habitaciones h WHERE h.id = c.habitacion_id)
+        ORDER BY c.id
+    """
+    for lote in Database.iter_execute(consulta):
+        for id_, valor in lote:
+            yield Hallazgo("huerfanos", "camas", id_, {"habitacion_id": valor, "falta_en": "habitaciones"})
+
+
+def capacidad() -> Iterator[Hallazgo]:
+    q = """
+        SELECT h.id, h.numero, h.capacidad, COUNT(*) AS camas
+        FROM habitaciones h JOIN camas c ON c.habitacion_id = h.id
+        GROUP BY h.id
+        HAVING COUNT(*) > COALESCE(h.capacidad, 0)
+        ORDER BY h.id
+    """
+    for lote in Database.iter_execute(q):
+        for id_, numero, cap, camas in lote:
+            yield Hallazgo("capacidad", "habitaciones", id_, {"numero": numero, "capacidad": cap, "camas": camas})
+
+
+REGLAS: dict[str, Callable[[], Iterator[Hallazgo]]] = {
+    "solapamiento_cama": solapamientos_cama,
+    "solapamiento_paciente": solapamientos_paciente,
+    "fechas": fechas,
+    "huerfanos": huerfanos,
+    "capacidad": capacidad,
+}
+
+
+def escanear(reglas: list[str] | None = None) -> Iterator[Hallazgo]:
+    """Hallazgos de las `reglas` indicadas (todas por defecto), en streaming."""
+    for nombre in reglas or REGLAS:
+        if nombre not in REGLAS:
+            raise ValueError(f"Regla inválida: {nombre}. Opciones: {', '.join(REGLAS)}")
+        yield from REGLAS[nombre]()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Escanea la base en busca de datos que violan las reglas de negocio.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite")
+    parser.add_argument("--regla", action="append", choices=sorted(REGLAS), help="solo esta regla (repetible)")
+    parser.add_argument("-o", "--salida", help="archivo NDJSON destino (default: stdout)")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    conteo: Counter = Counter()
+    salida = open(args.salida, "w", encoding="utf-8") if args.salida else sys.stdout
+    Database.open(args.db)
+    try:
+        with Database.snapshot():
+            for hallazgo in escanear(args.regla):
+                salida.write(dumps(hallazgo.to_dict()) + "\n")
+                conteo[hallazgo.regla] += 1
+    finally:
+        Database.close_connection()
+        if salida is not sys.stdout:
+            salida.close()
+    resumen = ", ".join(f"{regla}: {n}" for regla, n in sorted(conteo.items())) or "sin hallazgos"
+    print(f"Integridad ({time.perf_counter() - inicio:.1f}s): {resumen}", file=sys.stderr)
+    if conteo:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# intervalos.py
+"""
+Índice de intervalos sobre las estadías: tabla R*Tree `movimientos_rtree` (rtree_i32) con
+tres dimensiones, tiempo en minutos desde 1970 (ingreso, egreso), cama y paciente.
+
+Los triggers la mantienen al insertar, actualizar y borrar movimientos. Las estadías abiertas
+llevan egreso = FIN_ABIERTA. Las coordenadas truncan a minutos y el R*Tree trata los intervalos
+como cerrados, así que funciona como filtro: las consultas de MovimientoManager
+(`ocupante_en`, `estadias_solapadas`) vuelven a comprobar las fechas exactas contra movimientos.
+
+El histórico (dao.historico) tiene su propio `historico.movimientos_rtree` con los mismos
+triggers, así que las estadías archivadas quedan indexadas al moverlas.
+
+Uso por consola (reconstruye el índice desde las tablas):
+    python -m dao.intervalos --db nosocomio.db
+"""
+from __future__ import annotations
+
+import argparse
+import calendar
+import time
+from contextlib import contextmanager
+from sqlite3 import Connection
+from datetime import datetime
+from typing import Iterator
+
+from dao.conn import Database
+
+# Fin de una estadía abierta (sin egreso), el mismo instante en cada representación: texto ISO
+# (mayor que cualquier fecha real), segundos desde 1970 (dao.columnar) y minutos del R*Tree,
+# acotados al máximo de rtree_i32.
+SIN_EGRESO = "9999-12-31T23:59:59"
+SIN_EGRESO_SEGUNDOS = calendar.timegm(datetime.fromisoformat(SIN_EGRESO).timetuple())
+FIN_ABIERTA = min(SIN_EGRESO_SEGUNDOS // 60, 2_147_483_647)
+TRIGGERS = ("trg_rtree_insert", "trg_rtree_update", "trg_rtree_delete")
+
+
+def minutos_sql(expr: str) -> str:
+    """Expresión SQL: minutos desde 1970 de una fecha ISO (la misma truncación en índice y consultas)."""
+    return f"(CAST(strftime('%s', {expr}) AS INTEGER) / 60)"
+
+
+def _valores(fila: str) -> str:
+    ingreso = minutos_sql(f"{fila}.fecha_ingreso")
+    egreso = f"COALESCE({minutos_sql(f'{fila}.fecha_egreso')}, {FIN_ABIERTA})"
+    # max(): un egreso anterior al ingreso (dato inválido) no rompe el R*Tree.
+    return (f"{fila}.id, {ingreso}, max({ingreso}, {egreso}), "
+            f"{fila}.cama_id, {fila}.cama_id, {fila}.paciente_id, {fila}.paciente_id")
+
+
+def _ddl(esquema: str) -> list[str]:
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {esquema}.movimientos_rtree USING rtree_i32(
+            id, ingreso, egreso, cama_desde, cama_hasta, paciente_desde, paciente_hasta)""",
+        f"""CREATE TRIGGER IF NOT EXISTS {esquema}.trg_rtree_insert AFTER INSERT ON movimientos
+        BEGIN
+            INSERT INTO movimientos_rtree VALUES ({_valores("NEW")});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {esquema}.trg_rtree_update
+        AFTER UPDATE OF id, cama_id, paciente_id, fecha_ingreso, fecha_egreso ON movimientos
+        BEGIN
+            DELETE FROM movimientos_rtree WHERE id = OLD.id;
+            INSERT INTO movimientos_rtree VALUES ({_valores("NEW")});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {esquema}.trg_rtree_delete AFTER DELETE ON movimientos
+        BEGIN
+            DELETE FROM movimientos_rtree WHERE id = OLD.id;
+        END""",
+    ]
+
+
+def crear(conexion: Connection, esquema: str = "main") -> None:
+    """Crea el R*Tree y sus triggers en `esquema`. Si el índice es nuevo, lo llena."""
+    nuevo = conexion.execute(
+        f"SELECT COUNT(*) FROM {esquema}.sqlite_master WHERE name = 'movimientos_rtree'"
+    ).fetchone()[0] == 0
+    with conexion:
+        for query in _ddl(esquema):
+            conexion.execute(query)
+    if nuevo and conexion.execute(f"SELECT 1 FROM {esquema}.movimientos LIMIT 1").fetchone():
+        reconstruir(conexion, esquema)
+
+
+def reconstruir(conexion: Connection, esquema: str = "main") -> int:
+    # Vaciar un R*Tree grande con DELETE cuesta tanto como llenarlo: se vuelve a crear la tabla,
+    # en la misma transacción, y se carga en orden de ingreso (nodos vecinos, menos reinserciones).
+    with conexion:
+        if not conexion.in_transaction:
+            conexion.execute("BEGIN")
+        conexion.execute(f"DROP TABLE IF EXISTS {esquema}.movimientos_rtree")
+        conexion.execute(_ddl(esquema)[0])
+        conexion.execute(
+            f"INSERT INTO {esquema}.movimientos_rtree SELECT {_valores('m')} FROM {esquema}.movimientos m "
+            f"ORDER BY m.fecha_ingreso")
+    return conexion.execute(f"SELECT COUNT(*) FROM {esquema}.movimientos_rtree").fetchone()[0]
+
+
+def suspender(conexion: Connection) -> None:
+    """Quita los triggers antes de una carga masiva. Siempre debe seguir un `reanudar`."""
+    with conexion:
+        for nombre in TRIGGERS:
+            conexion.execute(f"DROP TRIGGER IF EXISTS main.{nombre}")
+
+
+def reanudar(conexion: Connection) -> None:
+    crear(conexion)
+    reconstruir(conexion)
+
+
+@contextmanager
+def suspendido(conexion: Connection) -> Iterator[None]:
+    """Para cargas masivas: sin triggers durante el bloque, reconstrucción completa al salir."""
+    suspender(conexion)
+    try:
+        yield
+    finally:
+        reanudar(conexion)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Reconstruye el índice de intervalos de estadías.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    Database.open(args.db)
+    try:
+        conexion = Database.get_connection()
+        esquemas = ["main"] + (["historico"] if Database.historico_adjunto else [])
+        for esquema in esquemas:
+            crear(conexion, esquema)
+            print(f"{esquema}: {reconstruir(conexion, esquema)} estadías indexadas")
+    finally:
+        Database.close_connection()
+    print(f"Listo en {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
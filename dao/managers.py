@@ -1,7 +1,10 @@
 # managers.py
-from typing import TypeVar, Generic, Type, Optional, Iterable
-from datetime import datetime
+from contextlib import contextmanager
+from sqlite3 import IntegrityError
+from typing import TypeVar, Generic, Type, Optional, Iterable, Iterator
+from datetime import datetime, timedelta
 from dao.conn import Database
+from dao import versiones
 from dao.objetos import Paciente, Medico, Habitacion, Movimiento, Cama, BaseModel
 
 ModelType = TypeVar('ModelType', bound=BaseModel)
@@ -35,8 +38,13 @@ class SQLBuilder:
         return f"SELECT COUNT(*) FROM {table_name}"
 
     @staticmethod
-    def create_table_query(table_name: str, keys: tuple[str, ...], types: tuple[str, ...]) -> str:
-        columns = ", ".join(f"{key} {type_}" for key, type_ in zip(keys, types))
+    def create_table_query(table_name: str, keys: tuple[str, ...], types: tuple[str, ...],
+                           foreign_keys: dict[str, str] | None = None) -> str:
+        foreign_keys = foreign_keys or {}
+        columns = ", ".join(
+            f"{key} {type_}" + (f" REFERENCES {foreign_keys[key]}(id)" if key in foreign_keys else "")
+            for key, type_ in zip(keys, types)
+        )
         return f"CREATE TABLE IF NOT EXISTS {table_name} ({columns})"
 
 
@@ -46,6 +54,14 @@ class BaseManager(Generic[ModelType]):
     keys: tuple[str, ...]
     key_types: tuple[str, ...]
     table_name: str
+    # columna -> tabla referenciada (FOREIGN KEY ... REFERENCES tabla(id))
+    foreign_keys: dict[str, str] = {}
+    # Fragmento del mensaje de SQLite -> mensaje para el usuario (ver _restricciones).
+    errores_integridad: dict[str, str] = {}
+    # Columnas de historico.movimientos que apuntan a esta tabla: el histórico es otra base y sus
+    # referencias no las cubren las foreign keys, así que delete las revisa antes de borrar.
+    referencias_historico: tuple[str, ...] = ()
+    TIENE_REGISTROS = "No se puede eliminar: tiene registros asociados."
 
     # ---------- helpers ----------
     @classmethod
@@ -68,12 +84,30 @@ class BaseManager(Generic[ModelType]):
     def create_object(cls, data: dict) -> ModelType:
         return cls.model(**data)
 
+    @classmethod
+    @contextmanager
+    def _restricciones(cls, mensajes: dict[str, str] | None = None) -> Iterator[None]:
+        """
+        Las reglas viven en el esquema (índices únicos, foreign keys, triggers): la escritura se
+        intenta directamente y el IntegrityError se traduce a ValueError con el mensaje de negocio.
+        """
+        try:
+            yield
+        except IntegrityError as e:
+            cls.conn.rollback()
+            detalle = str(e)
+            for fragmento, mensaje in {**cls.errores_integridad, **(mensajes or {})}.items():
+                if fragmento in detalle:
+                    raise ValueError(mensaje) from e
+            raise
+
     # ---------- CRUD ----------
     @classmethod
     def create(cls, data: dict) -> ModelType:
         query = SQLBuilder.build_insert_query(cls.table_name, cls.keys)
         valores = cls._normalizar_para_guardar(data)
-        nuevo_id = cls.conn.save_execute(query, valores)
+        with cls._restricciones():
+            nuevo_id = cls.conn.save_execute(query, valores)
         return cls.get_one(nuevo_id)
 
     @classmethod
@@ -108,18 +142,78 @@ class BaseManager(Generic[ModelType]):
             if isinstance(valor, datetime):
                 valor = valor.isoformat()
             valores.append(valor)
-        cls.conn.save_execute(query, tuple(valores) + (id,))
+        with cls._restricciones():
+            cls.conn.save_execute(query, tuple(valores) + (id,))
         return cls.get_one(id)
 
     @classmethod
     def delete(cls, id: int) -> None:
+        if cls._referenciado_en_historico(id):
+            raise ValueError(cls.TIENE_REGISTROS)
         query = SQLBuilder.build_delete_query(cls.table_name)
-        cls.conn.save_execute(query, (id,))
+        with cls._restricciones({"FOREIGN KEY": cls.TIENE_REGISTROS}):
+            cls.conn.save_execute(query, (id,))
+
+    @classmethod
+    def _referenciado_en_historico(cls, id: int) -> bool:
+        if not cls.referencias_historico or not cls.conn.refrescar_historico():
+            return False
+        condicion = " OR ".join(f"{columna} = ?" for columna in cls.referencias_historico)
+        q = f"SELECT 1 FROM historico.movimientos WHERE {condicion} LIMIT 1"
+        return cls.conn.get_execute(q, (id,) * len(cls.referencias_historico), single=True) is not None
+
+    @classmethod
+    def _create_table_query(cls, table_name: str | None = None) -> str:
+        return SQLBuilder.create_table_query(table_name or cls.table_name, cls.keys, cls.key_types, cls.foreign_keys)
+
+    @classmethod
+    def _falta_migrar(cls) -> bool:
+        """La tabla existe pero fue creada antes de declarar sus foreign keys."""
+        conexion = cls.conn.get_connection()
+        if not cls.foreign_keys or conexion.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (cls.table_name,)).fetchone() is None:
+            return False
+        return not conexion.execute(f"PRAGMA foreign_key_list({cls.table_name})").fetchall()
+
+    @classmethod
+    def _migrar(cls) -> None:
+        """
+        Reconstruye la tabla con sus foreign keys (SQLite no las agrega con ALTER TABLE): crear la
+        nueva, copiar, borrar la vieja y renombrar, con foreign_keys apagado. Índices y triggers se
+        van con la tabla vieja; los recrea create_table. Filas huérfanas que ya existieran no se
+        rechazan acá: las informa `python -m dao.integridad`.
+        """
+        conexion = cls.conn.get_connection()
+        conexion.commit()
+        nueva = f"{cls.table_name}_nueva"
+        columnas = ", ".join(cls.keys)
+        secuencia = conexion.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (cls.table_name,)).fetchone()
+        conexion.execute("PRAGMA foreign_keys = OFF")
+        # Sin esto, RENAME valida los triggers de otras tablas que nombran a la tabla borrada.
+        conexion.execute("PRAGMA legacy_alter_table = ON")
+        try:
+            conexion.execute("BEGIN")
+            with conexion:
+                conexion.execute(f"DROP TABLE IF EXISTS {nueva}")
+                conexion.execute(cls._create_table_query(nueva))
+                conexion.execute(f"INSERT INTO {nueva} ({columnas}) SELECT {columnas} FROM {cls.table_name}")
+                conexion.execute(f"DROP TABLE {cls.table_name}")
+                conexion.execute(f"ALTER TABLE {nueva} RENAME TO {cls.table_name}")
+                if secuencia:
+                    # AUTOINCREMENT: los ids ya usados (p.ej. archivados en el histórico) no se reutilizan.
+                    conexion.execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?",
+                                     (secuencia[0], cls.table_name))
+        finally:
+            conexion.execute("PRAGMA legacy_alter_table = OFF")
+            conexion.execute("PRAGMA foreign_keys = ON")
 
     @classmethod
     def create_table(cls) -> None:
-        query = SQLBuilder.create_table_query(cls.table_name, cls.keys, cls.key_types)
-        cls.conn.save_execute(query)
+        cls.conn.activar_wal()
+        if cls._falta_migrar():
+            cls._migrar()
+        cls.conn.save_execute(cls._create_table_query())
+        versiones.crear(cls.conn.get_connection(), cls.table_name)
 
 
 # ----------------- Managers concretos -----------------
@@ -129,40 +223,29 @@ class PacienteManager(BaseManager[Paciente]):
     keys = ("id", "nombre", "obra_social", "numero_afiliado", "domicilio", "telefono")
     key_types = ("INTEGER PRIMARY KEY AUTOINCREMENT", "TEXT", "TEXT", "TEXT", "TEXT", "TEXT")
     table_name = "pacientes"
+    referencias_historico = ("paciente_id",)
 
 class MedicoManager(BaseManager[Medico]):
     model = Medico
     keys = ("id", "nombre", "matricula", "especialidad")
     key_types = ("INTEGER PRIMARY KEY AUTOINCREMENT", "TEXT", "INTEGER", "TEXT")
     table_name = "medicos"
+    referencias_historico = ("medico_id",)
+    errores_integridad = {"medicos.matricula": "La matrícula ya existe."}  # idx_medicos_matricula
 
-    @classmethod
-    def _existe_matricula(cls, matricula: int, excluir_id: int | None = None) -> bool:
-        if excluir_id is None:
-            q, p = "SELECT 1 FROM medicos WHERE matricula = ? LIMIT 1", (matricula,)
-        else:
-            q, p = "SELECT 1 FROM medicos WHERE matricula = ? AND id <> ? LIMIT 1", (matricula, excluir_id)
-        return cls.conn.get_execute(q, p, single=True) is not None
+    CRITERIOS = ("id", "nombre", "especialidad")
 
     @classmethod
-    def listar_ordenado(cls, criterio: str) -> list[Medico]:
-        if criterio not in {"id", "nombre", "especialidad"}:
+    def _consulta_listar_ordenado(cls, criterio: str) -> tuple[str, tuple]:
+        if criterio not in cls.CRITERIOS:
             criterio = "id"
-        query = f"SELECT {', '.join(cls.keys)} FROM {cls.table_name} ORDER BY {criterio} ASC"
-        filas = cls.conn.get_execute(query)
-        return [cls._crear_desde_fila(f) for f in filas]
-
-    @classmethod
-    def create(cls, data: dict):
-        if cls._existe_matricula(int(data["matricula"])):
-            raise ValueError("La matrícula ya existe.")
-        return super().create(data)
+        return f"SELECT {', '.join(cls.keys)} FROM {cls.table_name} ORDER BY {criterio} ASC", ()
 
     @classmethod
-    def update(cls, id: int, data: dict):
-        if "matricula" in data and cls._existe_matricula(int(data["matricula"]), excluir_id=id):
-            raise ValueError("La matrícula ya existe.")
-        return super().update(id, data)
+    def listar_ordenado(cls, criterio: str) -> list[Medico]:
+        query, params = cls._consulta_listar_ordenado(criterio)
+        filas = cls.conn.get_execute(query, params)
+        return [cls._crear_desde_fila(f) for f in filas]
 
     @classmethod
     def create_table(cls) -> None:
@@ -175,11 +258,86 @@ class HabitacionManager(BaseManager[Habitacion]):
     key_types = ("INTEGER PRIMARY KEY AUTOINCREMENT", "INTEGER", "TEXT", "INTEGER")
     table_name = "habitaciones"
 
+    # Los agregados por tipo (dao.rollups) cuentan cada estadía con el tipo de la habitación de
+    # su cama: cambiarlo con internaciones registradas reescribiría días ya cerrados.
+    CAMBIO_DE_TIPO = "No se puede cambiar el tipo de una habitación con internaciones registradas."
+    errores_integridad = {CAMBIO_DE_TIPO: CAMBIO_DE_TIPO}
+    triggers = (
+        f"""CREATE TRIGGER IF NOT EXISTS trg_habitaciones_tipo BEFORE UPDATE OF tipo ON habitaciones
+        WHEN NEW.tipo IS NOT OLD.tipo
+          AND EXISTS (SELECT 1 FROM camas c JOIN movimientos m ON m.cama_id = c.id WHERE c.habitacion_id = OLD.id)
+        BEGIN SELECT RAISE(ABORT, '{CAMBIO_DE_TIPO}'); END""",
+    )
+
+    @classmethod
+    def create_table(cls) -> None:
+        super().create_table()
+        for query in cls.triggers:
+            cls.conn.save_execute(query)
+
+    @classmethod
+    def update(cls, id: int, data: dict) -> Optional[Habitacion]:
+        # El trigger ve las estadías vivas; las archivadas están en otra base.
+        if cls.conn.refrescar_historico() and "tipo" in data:
+            q = """
+                SELECT 1 FROM habitaciones h
+                WHERE h.id = ? AND h.tipo IS NOT ? AND EXISTS (
+                    SELECT 1 FROM historico.movimientos m
+                    WHERE m.cama_id IN (SELECT c.id FROM camas c WHERE c.habitacion_id = h.id))
+            """
+            if cls.conn.get_execute(q, (id, data["tipo"]), single=True) is not None:
+                raise ValueError(cls.CAMBIO_DE_TIPO)
+        return super().update(id, data)
+
 class CamaManager(BaseManager[Cama]):
     model = Cama
     keys = ("id", "habitacion_id")
     key_types = ("INTEGER PRIMARY KEY AUTOINCREMENT", "INTEGER")
     table_name = "camas"
+    foreign_keys = {"habitacion_id": "habitaciones"}
+    referencias_historico = ("cama_id",)
+
+    CAPACIDAD_COMPLETA = "La habitación ya alcanzó su capacidad de camas."
+    CAMA_OCUPADA = "No se puede eliminar una cama ocupada."
+    CAMBIO_DE_TIPO = "No se puede mover a una habitación de otro tipo una cama con internaciones registradas."
+    errores_integridad = {
+        CAPACIDAD_COMPLETA: CAPACIDAD_COMPLETA,
+        CAMA_OCUPADA: CAMA_OCUPADA,
+        CAMBIO_DE_TIPO: CAMBIO_DE_TIPO,
+        "FOREIGN KEY": "Habitación inexistente.",
+    }
+    _CAPACIDAD_EXCEDIDA = """
+        (SELECT COUNT(*) FROM camas WHERE habitacion_id = NEW.habitacion_id)
+        >= (SELECT capacidad FROM habitaciones WHERE id = NEW.habitacion_id)"""
+    # Mismo motivo que HabitacionManager.CAMBIO_DE_TIPO: el tipo de una estadía es el de su cama.
+    # Una habitación inexistente no cuenta como cambio de tipo: ese error lo da la foreign key.
+    _CAMBIA_DE_TIPO = """
+        EXISTS (SELECT 1 FROM habitaciones WHERE id = NEW.habitacion_id)
+        AND (SELECT tipo FROM habitaciones WHERE id = NEW.habitacion_id)
+        IS NOT (SELECT tipo FROM habitaciones WHERE id = OLD.habitacion_id)"""
+    triggers = (
+        f"""CREATE TRIGGER IF NOT EXISTS trg_camas_capacidad BEFORE INSERT ON camas
+        WHEN {_CAPACIDAD_EXCEDIDA}
+        BEGIN SELECT RAISE(ABORT, '{CAPACIDAD_COMPLETA}'); END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_camas_capacidad_update BEFORE UPDATE OF habitacion_id ON camas
+        WHEN NEW.habitacion_id IS NOT OLD.habitacion_id AND {_CAPACIDAD_EXCEDIDA}
+        BEGIN SELECT RAISE(ABORT, '{CAPACIDAD_COMPLETA}'); END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_camas_ocupada BEFORE DELETE ON camas
+        WHEN EXISTS (SELECT 1 FROM movimientos WHERE cama_id = OLD.id AND fecha_egreso IS NULL)
+        BEGIN SELECT RAISE(ABORT, '{CAMA_OCUPADA}'); END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_camas_tipo BEFORE UPDATE OF habitacion_id ON camas
+        WHEN {_CAMBIA_DE_TIPO} AND EXISTS (SELECT 1 FROM movimientos WHERE cama_id = OLD.id)
+        BEGIN SELECT RAISE(ABORT, '{CAMBIO_DE_TIPO}'); END""",
+    )
+
+    @classmethod
+    def create_table(cls) -> None:
+        super().create_table()
+        cls.conn.save_execute("CREATE INDEX IF NOT EXISTS idx_camas_habitacion ON camas(habitacion_id)")
+        # Las bases creadas antes tienen un trg_camas_tipo que no descartaba habitaciones inexistentes.
+        cls.conn.save_execute("DROP TRIGGER IF EXISTS trg_camas_tipo")
+        for query in cls.triggers:
+            cls.conn.save_execute(query)
 
     @classmethod
     def esta_ocupada(cls, cama_id: int) -> bool:
@@ -202,56 +360,89 @@ class CamaManager(BaseManager[Cama]):
     def contar_en_habitacion(cls, habitacion_id: int) -> int:
         return len(cls.filter(habitacion_id=habitacion_id))
 
-    @classmethod
-    def create(cls, data: dict) -> Cama:
-        habitacion_id = int(data["habitacion_id"])
-        habitacion = HabitacionManager.get_one(habitacion_id)
-        if habitacion is None:
-            raise ValueError("Habitación inexistente.")
-        actuales = cls.contar_en_habitacion(habitacion_id)
-        if actuales >= habitacion.capacidad:
-            raise ValueError("La habitación ya alcanzó su capacidad de camas.")
-        return super().create(data)
-
+    # Habitación existente, capacidad y cama libre al borrar: foreign key y triggers (ver arriba).
     @classmethod
     def update(cls, id: int, data: dict) -> Cama:
-        # si cambian la habitación, validar capacidad
-        if "habitacion_id" in data:
-            nueva_hab = int(data["habitacion_id"])
-            actual = cls.get_one(id)
-            if actual is None:
-                raise ValueError("Cama inexistente.")
-            if nueva_hab != actual.habitacion_id:
-                habitacion = HabitacionManager.get_one(nueva_hab)
-                if habitacion is None:
-                    raise ValueError("Habitación inexistente.")
-                actuales = cls.contar_en_habitacion(nueva_hab)
-                if actuales >= habitacion.capacidad:
-                    raise ValueError("La habitación ya alcanzó su capacidad de camas.")
-        return super().update(id, data)
+        # El trigger ve las estadías vivas; las archivadas están en otra base.
+        if cls._referenciado_en_historico(id):
+            q = """
+                SELECT 1 FROM camas c JOIN habitaciones h ON h.id = c.habitacion_id
+                WHERE c.id = ? AND EXISTS (SELECT 1 FROM habitaciones WHERE id = ?)
+                  AND h.tipo IS NOT (SELECT tipo FROM habitaciones WHERE id = ?)
+            """
+            destino = data.get("habitacion_id")
+            if cls.conn.get_execute(q, (id, destino, destino), single=True) is not None:
+                raise ValueError(cls.CAMBIO_DE_TIPO)
+        cama = super().update(id, data)
+        if cama is None:
+            raise ValueError("Cama inexistente.")
+        return cama
+
+    CON_INTERNACIONES = "No se puede eliminar una cama con internaciones registradas."
 
     @classmethod
     def delete(cls, id: int) -> None:
-        if cls.esta_ocupada(id):
-            raise ValueError("No se puede eliminar una cama ocupada.")
-        return super().delete(id)
+        if cls._referenciado_en_historico(id):
+            raise ValueError(cls.CON_INTERNACIONES)
+        query = SQLBuilder.build_delete_query(cls.table_name)
+        with cls._restricciones({"FOREIGN KEY": cls.CON_INTERNACIONES}):
+            cls.conn.save_execute(query, (id,))
 
 class MovimientoManager(BaseManager[Movimiento]):
     model = Movimiento
     keys = ("id", "cama_id", "paciente_id", "medico_id", "fecha_ingreso", "fecha_egreso")
     key_types = ("INTEGER PRIMARY KEY AUTOINCREMENT", "INTEGER", "INTEGER", "INTEGER", "TEXT", "TEXT")
     table_name = "movimientos"
+    foreign_keys = {"cama_id": "camas", "paciente_id": "pacientes", "medico_id": "medicos"}
+    errores_integridad = {
+        "movimientos.cama_id": "La cama seleccionada está ocupada.",               # idx_movimientos_cama_abierta
+        "movimientos.paciente_id": "El paciente ya tiene una internación abierta.",  # idx_movimientos_paciente_abierta
+        "FOREIGN KEY": "Cama, paciente o médico inexistente.",
+    }
 
     # --- override para parsear fechas al leer ---
     @classmethod
     def _crear_desde_fila(cls, fila):
-        datos = dict(zip(cls.keys, fila))
+        # Posicional, en el orden de `keys`: es el camino de todos los listados de Informes y el
+        # dict intermedio costaba más que los dos fromisoformat.
+        id_, cama_id, paciente_id, medico_id, fi, fe = fila
         # parseo ISO -> datetime / None
-        fi = datos.get("fecha_ingreso")
-        fe = datos.get("fecha_egreso")
-        datos["fecha_ingreso"] = datetime.fromisoformat(fi) if isinstance(fi, str) else fi
-        datos["fecha_egreso"] = datetime.fromisoformat(fe) if isinstance(fe, str) and fe else None
-        return cls.create_object(datos)
+        return cls.model(id_, cama_id, paciente_id, medico_id,
+                         datetime.fromisoformat(fi) if isinstance(fi, str) else fi,
+                         datetime.fromisoformat(fe) if isinstance(fe, str) and fe else None)
+
+    # Índices para las consultas de reglas de negocio e Informes (ver dao.planes).
+    # Los parciales sobre fecha_egreso IS NULL solo contienen las internaciones abiertas; los dos
+    # únicos hacen cumplir "una internación abierta por cama y por paciente".
+    indices = (
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_movimientos_cama_abierta ON movimientos(cama_id) WHERE fecha_egreso IS NULL",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_movimientos_paciente_abierta ON movimientos(paciente_id) WHERE fecha_egreso IS NULL",
+        "CREATE INDEX IF NOT EXISTS idx_movimientos_abiertas ON movimientos(fecha_ingreso) WHERE fecha_egreso IS NULL",
+        # Índices sobre cada foreign key: SQLite los usa al insertar o borrar en la tabla padre.
+        "CREATE INDEX IF NOT EXISTS idx_movimientos_cama ON movimientos(cama_id, fecha_ingreso)",
+        "CREATE INDEX IF NOT EXISTS idx_movimientos_paciente ON movimientos(paciente_id, fecha_ingreso)",
+        "CREATE INDEX IF NOT EXISTS idx_movimientos_medico ON movimientos(medico_id, fecha_ingreso)",
+        "CREATE INDEX IF NOT EXISTS idx_movimientos_ingreso ON movimientos(fecha_ingreso)",
+        "CREATE INDEX IF NOT EXISTS idx_movimientos_egreso ON movimientos(fecha_egreso) WHERE fecha_egreso IS NOT NULL",
+    )
+
+    @classmethod
+    def create_table(cls) -> None:
+        super().create_table()
+        try:
+            for query in cls.indices:
+                cls.conn.save_execute(query)
+        except IntegrityError as e:
+            raise ValueError("Hay camas o pacientes con más de una internación abierta; "
+                             "revisar con python -m dao.integridad.") from e
+        from dao import intervalos, rollups  # import local: dao.rollups importa este módulo
+        rollups.crear(cls.conn.get_connection())
+        intervalos.crear(cls.conn.get_connection())
+
+    @staticmethod
+    def _rango_dias(f_ini: datetime, f_fin: datetime) -> tuple[str, str]:
+        """[inicio del día f_ini, inicio del día siguiente a f_fin) en ISO, comparable contra las columnas TEXT."""
+        return f_ini.date().isoformat(), (f_fin.date() + timedelta(days=1)).isoformat()
 
     # ---------- reglas de negocio ----------
     @classmethod
@@ -262,11 +453,8 @@ class MovimientoManager(BaseManager[Movimiento]):
 
     @classmethod
     def ingresar(cls, *, cama_id: int, paciente_id: int, medico_id: int, fecha_ingreso: datetime) -> Movimiento:
-        # Validaciones requeridas por el enunciado
-        if CamaManager.esta_ocupada(cama_id):
-            raise ValueError("La cama seleccionada está ocupada.")
-        if cls.tiene_internacion_abierta(paciente_id):
-            raise ValueError("El paciente ya tiene una internación abierta.")
+        # Validaciones requeridas por el enunciado: cama libre y paciente sin internación abierta
+        # son índices únicos parciales, así que alcanza con un INSERT (ver errores_integridad).
         data = {
             "id": 0,
             "cama_id": cama_id,
@@ -279,76 +467,126 @@ class MovimientoManager(BaseManager[Movimiento]):
 
     @classmethod
     def dar_alta(cls, movimiento_id: int, fecha_egreso: datetime) -> Movimiento:
-        mov = cls.get_one(movimiento_id)
-        if mov is None:
-            raise ValueError("Movimiento inexistente.")
-        if mov.fecha_egreso is not None:
-            raise ValueError("El movimiento ya tiene alta registrada.")
-        if fecha_egreso < mov.fecha_ingreso:
+        alta = fecha_egreso.isoformat()
+        q = "UPDATE movimientos SET fecha_egreso = ? WHERE id = ? AND fecha_egreso IS NULL AND fecha_ingreso <= ?"
+        if cls.conn.save_execute(q, (alta, movimiento_id, alta)) == 0:
+            # Solo si no actualizó nada se lee la fila, para informar qué condición falló.
+            mov = cls.get_one(movimiento_id)
+            if mov is None:
+                raise ValueError("Movimiento inexistente.")
+            if mov.fecha_egreso is not None:
+                raise ValueError("El movimiento ya tiene alta registrada.")
             raise ValueError("La fecha de alta no puede ser anterior al ingreso.")
-        return cls.update(movimiento_id, {
-            "id": movimiento_id,
-            "cama_id": mov.cama_id,
-            "paciente_id": mov.paciente_id,
-            "medico_id": mov.medico_id,
-            "fecha_ingreso": mov.fecha_ingreso,
-            "fecha_egreso": fecha_egreso
-        })
+        return cls.get_one(movimiento_id)
 
     # ---------- consultas para Informes ----------
+    # Cada informe expone su (query, params) para que listados y exportaciones usen el mismo SQL.
+    # Las estadías cerradas antes de la marca de agua viven en el histórico (dao.historico):
+    # los informes sobre historia las suman con UNION ALL; los de internaciones abiertas no.
+    CORTE_HISTORICO_SQL = "SELECT valor FROM historico.archivo_meta WHERE clave = 'corte'"
+
     @classmethod
-    def internaciones_abiertas(cls) -> list[Movimiento]:
+    def _union_historico(cls, where: str, params: tuple, desde: str | None = None) -> tuple[str, tuple]:
+        """
+        SELECT de `keys` sobre movimientos con `where`, más el mismo SELECT sobre el histórico si
+        está adjunto. Con `desde` (inicio de un rango de fechas) la rama del histórico es un término
+        constante que SQLite evalúa una vez: si el rango empieza después del corte, no la recorre.
+        """
+        columnas = ", ".join(cls.keys)
+        q = f"SELECT {columnas} FROM {cls.table_name} WHERE {where}"
+        if not cls.conn.refrescar_historico():
+            return q, params
+        q += f" UNION ALL SELECT {columnas} FROM historico.{cls.table_name} WHERE {where}"
+        if desde is None:
+            return q, params + params
+        return q + f" AND ? < ({cls.CORTE_HISTORICO_SQL})", params + params + (desde,)
+
+    @classmethod
+    def _consulta_internaciones_abiertas(cls) -> tuple[str, tuple]:
         q = f"SELECT {', '.join(cls.keys)} FROM {cls.table_name} WHERE fecha_egreso IS NULL ORDER BY fecha_ingreso"
-        filas = cls.conn.get_execute(q)
-        return [cls._crear_desde_fila(f) for f in filas]
+        return q, ()
 
     @classmethod
-    def ingresados_por_medico(cls, medico_id: int) -> list[Movimiento]:
-        q = f"SELECT {', '.join(cls.keys)} FROM {cls.table_name} WHERE medico_id = ? ORDER BY fecha_ingreso"
-        filas = cls.conn.get_execute(q, (medico_id,))
-        return [cls._crear_desde_fila(f) for f in filas]
+    def _consulta_ingresados_por_medico(cls, medico_id: int) -> tuple[str, tuple]:
+        q, p = cls._union_historico("medico_id = ?", (medico_id,))
+        return q + " ORDER BY fecha_ingreso", p
 
     @classmethod
-    def ingresados_entre(cls, f_ini: datetime, f_fin: datetime) -> list[Movimiento]:
-        q = f"""
-            SELECT {', '.join(cls.keys)} FROM {cls.table_name}
-            WHERE date(fecha_ingreso) BETWEEN date(?) AND date(?)
-            ORDER BY fecha_ingreso
-        """
-        filas = cls.conn.get_execute(q, (f_ini.date().isoformat(), f_fin.date().isoformat()))
-        return [cls._crear_desde_fila(f) for f in filas]
+    def _consulta_ingresados_entre(cls, f_ini: datetime, f_fin: datetime) -> tuple[str, tuple]:
+        rango = cls._rango_dias(f_ini, f_fin)
+        q, p = cls._union_historico("fecha_ingreso >= ? AND fecha_ingreso < ?", rango, desde=rango[0])
+        return q + " ORDER BY fecha_ingreso", p
 
     @classmethod
-    def altas_entre(cls, f_ini: datetime, f_fin: datetime) -> list[Movimiento]:
+    def _consulta_altas_entre(cls, f_ini: datetime, f_fin: datetime) -> tuple[str, tuple]:
+        rango = cls._rango_dias(f_ini, f_fin)
+        q, p = cls._union_historico("fecha_egreso >= ? AND fecha_egreso < ?", rango, desde=rango[0])
+        return q + " ORDER BY fecha_egreso", p
+
+    # Modo columnar (ver dao.columnar): fechas como segundos desde 1970, calculados en SQLite.
+    COLUMNAS = {"id": "q", "cama_id": "q", "paciente_id": "q", "medico_id": "q", "ingreso": "q", "egreso": "q"}
+
+    @classmethod
+    def _consulta_columnas(cls, where: str = "1", params: tuple = (), desde: str | None = None,
+                           orden: str = "fecha_ingreso") -> tuple[str, tuple]:
+        return cls._columnas_de(*cls._union_historico(where, params, desde), orden)
+
+    @classmethod
+    def _columnas_de(cls, q: str, p: tuple, orden: str = "fecha_ingreso") -> tuple[str, tuple]:
+        """Las columnas de COLUMNAS sobre `q`, un SELECT de `keys`."""
+        from dao.columnar import SIN_ID, segundos_sql
+        from dao.intervalos import SIN_EGRESO_SEGUNDOS
         q = f"""
-            SELECT {', '.join(cls.keys)} FROM {cls.table_name}
-            WHERE fecha_egreso IS NOT NULL
-            AND date(fecha_egreso) BETWEEN date(?) AND date(?)
-            ORDER BY fecha_egreso
+            SELECT id, COALESCE(cama_id, {SIN_ID}) AS cama_id, COALESCE(paciente_id, {SIN_ID}) AS paciente_id,
+                   COALESCE(medico_id, {SIN_ID}) AS medico_id, {segundos_sql("fecha_ingreso")} AS ingreso,
+                   COALESCE({segundos_sql("fecha_egreso")}, {SIN_EGRESO_SEGUNDOS}) AS egreso
+            FROM ({q}) ORDER BY {orden}
         """
-        filas = cls.conn.get_execute(q, (f_ini.date().isoformat(), f_fin.date().isoformat()))
-        return [cls._crear_desde_fila(f) for f in filas]
+        return q, p
 
     @classmethod
-    def pacientes_con_multiples_ingresos(cls) -> list[tuple[int, int]]:
-        # Devuelve lista de (paciente_id, cantidad)
-        q = """
+    def columnas(cls, f_ini: datetime | None = None, f_fin: datetime | None = None, por: str = "ingreso",
+                 usar_numpy: bool | None = None) -> dict:
+        """
+        Estadías en modo columnar: {id, cama_id, paciente_id, medico_id, ingreso, egreso} como
+        array('q') (o arrays de NumPy), en lugar de una lista de Movimiento. Con rango, filtra por
+        fecha de `por` ("ingreso", "egreso" o "solapa": en curso en algún momento del rango).
+        """
+        from dao import columnar
+        if f_ini is None or f_fin is None:
+            q, p = cls._consulta_columnas()
+        else:
+            rango = cls._rango_dias(f_ini, f_fin)
+            filtros = {
+                "ingreso": "fecha_ingreso >= ? AND fecha_ingreso < ?",
+                "egreso": "fecha_egreso >= ? AND fecha_egreso < ?",
+            }
+            if por == "solapa":
+                # Como estadias_solapadas: el R*Tree acota las candidatas a las del rango.
+                desde, hasta = (datetime.fromisoformat(d) for d in rango)
+                q, p = cls._columnas_de(*cls._intervalos(desde, hasta))
+            elif por in filtros:
+                q, p = cls._consulta_columnas(filtros[por], rango, desde=rango[0], orden=f"fecha_{por}")
+            else:
+                raise ValueError(f"Filtro inválido: {por}. Opciones: ingreso, egreso, solapa")
+        return columnar.leer(q, p, cls.COLUMNAS, usar_numpy)
+
+    @classmethod
+    def _consulta_pacientes_con_multiples_ingresos(cls) -> tuple[str, tuple]:
+        origen = "movimientos"
+        if cls.conn.refrescar_historico():
+            origen = "(SELECT paciente_id FROM movimientos UNION ALL SELECT paciente_id FROM historico.movimientos)"
+        q = f"""
             SELECT paciente_id, COUNT(*) AS total
-            FROM movimientos
+            FROM {origen}
             GROUP BY paciente_id
             HAVING COUNT(*) > 1
-            ORDER BY total DESC
+            ORDER BY total DESC, paciente_id
         """
-        return cls.conn.get_execute(q)
+        return q, ()
 
     @classmethod
-    def total_internados_hoy(cls) -> int:
-        q = "SELECT COUNT(*) FROM movimientos WHERE fecha_egreso IS NULL"
-        count = cls.conn.get_execute(q, single=True)
-        return count[0] if count else 0
-
-    @classmethod
-    def detalle_camas_ocupadas(cls) -> list[dict]:
+    def _consulta_detalle_camas_ocupadas(cls) -> tuple[str, tuple]:
         q = """
             SELECT m.id,
                 p.nombre     AS paciente,
@@ -364,7 +602,168 @@ class MovimientoManager(BaseManager[Movimiento]):
             WHERE m.fecha_egreso IS NULL
             ORDER BY h.numero, c.id, m.fecha_ingreso
         """
-        filas = cls.conn.get_execute(q)
+        return q, ()
+
+    @classmethod
+    def _consulta_readmisiones(cls, dias: int, despues_de: tuple | None = None,
+                               limite: int | None = None) -> tuple[str, tuple]:
+        """
+        Ingresos dentro de `dias` días del alta anterior del mismo paciente. LAG sobre
+        (paciente_id, fecha_ingreso) recorre el índice idx_movimientos_paciente en orden, sin ordenar.
+        Paginado por clave: `despues_de` es la `clave_pagina` de la última fila de la página previa.
+        """
+        origen, params = cls.table_name, ()
+        if cls.conn.refrescar_historico():
+            origen, params = cls._union_historico("1", ())
+            origen = f"({origen})"
+        filtro_origen, filtro_pagina, extra = "", "", ()
+        if despues_de is not None:
+            # Particiones completas desde el paciente de corte; la fila exacta se filtra afuera.
+            filtro_origen = "WHERE paciente_id >= ?"
+            filtro_pagina = "AND (paciente_id, fecha_ingreso, id) > (?, ?, ?)"
+            extra = (despues_de[0],)
+        q = f"""
+            SELECT id, paciente_id, cama_id, medico_id, fecha_ingreso,
+                   anterior_id, egreso_anterior,
+                   julianday(fecha_ingreso) - julianday(egreso_anterior) AS dias_desde_alta
+            FROM (
+                SELECT id, paciente_id, cama_id, medico_id, fecha_ingreso,
+                       LAG(id) OVER w AS anterior_id,
+                       LAG(fecha_egreso) OVER w AS egreso_anterior
+                FROM {origen}
+                {filtro_origen}
+                WINDOW w AS (PARTITION BY paciente_id ORDER BY fecha_ingreso, id)
+            )
+            WHERE egreso_anterior IS NOT NULL
+              AND julianday(fecha_ingreso) - julianday(egreso_anterior) <= ?
+              {filtro_pagina}
+            ORDER BY paciente_id, fecha_ingreso, id
+        """
+        # ORDER BY externo explícito: el orden de salida de la ventana es un detalle del plan, y la
+        # paginación por clave y el LIMIT lo necesitan garantizado. Con LIMIT es un sort top-N.
+        params = params + extra + (dias,) + (tuple(despues_de) if despues_de is not None else ())
+        if limite is not None:
+            q += " LIMIT ?"
+            params += (limite,)
+        return q, params
+
+    @classmethod
+    def _intervalos(cls, desde: datetime, hasta: datetime, cama_id: int | None = None,
+                    paciente_id: int | None = None) -> tuple[str, tuple]:
+        """
+        Estadías que se solapan con [desde, hasta), buscadas en el R*Tree (dao.intervalos) y
+        confirmadas con las fechas exactas. Con histórico adjunto suma su R*Tree si `desde` es
+        anterior al corte.
+        """
+        from dao.intervalos import minutos_sql
+        d, h = desde.isoformat(), hasta.isoformat()
+        filtros, params = [f"r.ingreso <= {minutos_sql('?')}", f"r.egreso >= {minutos_sql('?')}"], [h, d]
+        for columna, valor in (("cama", cama_id), ("paciente", paciente_id)):
+            if valor is not None:
+                filtros.append(f"r.{columna}_desde <= ? AND r.{columna}_hasta >= ?")
+                params += [valor, valor]
+        filtros.append("m.fecha_ingreso < ? AND (m.fecha_egreso IS NULL OR m.fecha_egreso > ?)")
+        params += [h, d]
+        columnas = ", ".join(f"m.{k}" for k in cls.keys)
+
+        # CROSS JOIN fija el orden: primero el R*Tree, después movimientos por clave primaria.
+        # Con JOIN el planificador prefiere recorrer idx_movimientos_ingreso (fecha_ingreso < ?).
+        def rama(esquema: str) -> str:
+            return (f"SELECT {columnas} FROM {esquema}.movimientos_rtree r "
+                    f"CROSS JOIN {esquema}.{cls.table_name} m ON m.id = r.id WHERE {' AND '.join(filtros)}")
+
+        q, p = rama("main"), tuple(params)
+        if cls.conn.refrescar_historico():
+            q += f" UNION ALL {rama('historico')} AND ? < ({cls.CORTE_HISTORICO_SQL})"
+            p += p + (d,)
+        return q, p
+
+    @classmethod
+    def _consulta_intervalos(cls, desde: datetime, hasta: datetime, cama_id: int | None = None,
+                             paciente_id: int | None = None) -> tuple[str, tuple]:
+        q, p = cls._intervalos(desde, hasta, cama_id, paciente_id)
+        return q + " ORDER BY fecha_ingreso", p
+
+    @classmethod
+    def ocupante_en(cls, cama_id: int, instante: datetime) -> Movimiento | None:
+        """Estadía que ocupaba `cama_id` en `instante` (ingreso <= instante < egreso), o None."""
+        q, p = cls._consulta_intervalos(instante, instante + timedelta(microseconds=1), cama_id=cama_id)
+        filas = cls.conn.get_execute(q, p)
+        return cls._crear_desde_fila(filas[-1]) if filas else None
+
+    @classmethod
+    def estadias_solapadas(cls, desde: datetime, hasta: datetime, cama_id: int | None = None,
+                           paciente_id: int | None = None) -> list[Movimiento]:
+        """Estadías en curso en algún momento de [desde, hasta), opcionalmente de una cama o un paciente."""
+        if hasta < desde:
+            raise ValueError("La fecha hasta no puede ser anterior a desde.")
+        q, p = cls._consulta_intervalos(desde, hasta, cama_id, paciente_id)
+        return [cls._crear_desde_fila(f) for f in cls.conn.get_execute(q, p)]
+
+    @classmethod
+    def internaciones_abiertas(cls) -> list[Movimiento]:
+        q, p = cls._consulta_internaciones_abiertas()
+        filas = cls.conn.get_execute(q, p)
+        return [cls._crear_desde_fila(f) for f in filas]
+
+    @classmethod
+    def ingresados_por_medico(cls, medico_id: int) -> list[Movimiento]:
+        q, p = cls._consulta_ingresados_por_medico(medico_id)
+        filas = cls.conn.get_execute(q, p)
+        return [cls._crear_desde_fila(f) for f in filas]
+
+    @classmethod
+    def ingresados_entre(cls, f_ini: datetime, f_fin: datetime) -> list[Movimiento]:
+        q, p = cls._consulta_ingresados_entre(f_ini, f_fin)
+        filas = cls.conn.get_execute(q, p)
+        return [cls._crear_desde_fila(f) for f in filas]
+
+    @classmethod
+    def altas_entre(cls, f_ini: datetime, f_fin: datetime) -> list[Movimiento]:
+        q, p = cls._consulta_altas_entre(f_ini, f_fin)
+        filas = cls.conn.get_execute(q, p)
+        return [cls._crear_desde_fila(f) for f in filas]
+
+    @classmethod
+    def pacientes_con_multiples_ingresos(cls) -> list[tuple[int, int]]:
+        # Devuelve lista de (paciente_id, cantidad)
+        q, p = cls._consulta_pacientes_con_multiples_ingresos()
+        return cls.conn.get_execute(q, p)
+
+    @classmethod
+    def readmisiones(cls, dias: int, limite: int = 200, despues_de: tuple | None = None) -> list[dict]:
+        """
+        Una página de reingresos dentro de `dias` días del alta previa. Para la página siguiente
+        pasar `despues_de=filas[-1]["clave_pagina"]`; una página con menos de `limite` filas es la última.
+        """
+        if dias < 0:
+            raise ValueError("La cantidad de días no puede ser negativa.")
+        q, p = cls._consulta_readmisiones(dias, despues_de, limite)
+        out = []
+        for mid, pid, cid, medid, fin, ant_id, egr_ant, dias_alta in cls.conn.get_execute(q, p):
+            out.append({
+                "movimiento_id": mid,
+                "paciente_id": pid,
+                "cama_id": cid,
+                "medico_id": medid,
+                "fecha_ingreso": datetime.fromisoformat(fin),
+                "anterior_id": ant_id,
+                "egreso_anterior": datetime.fromisoformat(egr_ant),
+                "dias_desde_alta": dias_alta,
+                "clave_pagina": (pid, fin, mid),
+            })
+        return out
+
+    @classmethod
+    def total_internados_hoy(cls) -> int:
+        q = "SELECT COUNT(*) FROM movimientos WHERE fecha_egreso IS NULL"
+        count = cls.conn.get_execute(q, single=True)
+        return count[0] if count else 0
+
+    @classmethod
+    def detalle_camas_ocupadas(cls) -> list[dict]:
+        q, p = cls._consulta_detalle_camas_ocupadas()
+        filas = cls.conn.get_execute(q, p)
         out = []
         for mid, pac, med, hab, cid, fin in filas:
             # fin (TEXT ISO) -> datetime
@@ -382,4 +781,4 @@ class MovimientoManager(BaseManager[Movimiento]):
                 "cama_id": cid,
                 "fecha_ingreso": fi_dt,
             })
-        return out
\ No newline at end of file
+        return out
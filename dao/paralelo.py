@@ -0,0 +1,229 @@
+# paralelo.py
+"""
+Informes históricos pesados repartidos en procesos: el rango de fechas se corta en partes de
+días enteros, cada parte corre en un proceso del pool con su propia conexión de solo lectura
+(Database.snapshot) y los agregados parciales se combinan en el proceso principal.
+
+Cada informe declara cómo combinar sus partes, y la combinación da lo mismo que la corrida serial:
+- censo: cada parte arranca con la ocupación justo antes de su inicio y procesa los eventos de
+  ese instante, igual que el barrido serial al cruzar el borde (una alta justo en el borde cuenta
+  en el pico del primer intervalo de la parte). Las filas se concatenan en orden, con todos los
+  tipos vistos en alguna parte (censo.completar_tipos).
+- estadias: los sketches de cada (dimensión, clave) se fusionan (SketchCuantiles.fusionar: los
+  cubetas se suman y la suma es exacta, independiente del orden).
+- ingresos_por_medico: conteos por médico, se suman.
+
+Las partes leen snapshots distintos: con escrituras concurrentes, una alta que cae entre dos
+partes puede verse en una y no en otra. Para historia cerrada (el caso de estos informes) no
+importa; si hace falta una foto única, correr con procesos=1.
+
+Los procesos se crean con "spawn": no heredan las conexiones SQLite abiertas del proceso padre
+(SQLite no admite usar una conexión de ambos lados de un fork).
+
+Uso por consola:
+    python -m dao.paralelo censo --desde 2019-01-01 --hasta 2024-12-31 --procesos 8
+    python -m dao.paralelo estadias --desde 2019-01-01 --hasta 2024-12-31 --comparar
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from dao import censo, estadias
+from dao.conn import Database
+from dao.managers import MovimientoManager
+
+DIAS_MINIMOS_POR_PARTE = 31  # por debajo de esto el arranque de los procesos pesa más que la consulta
+
+
+def dividir(f_ini: datetime, f_fin: datetime, partes: int) -> list[tuple[datetime, datetime]]:
+    """Corta [f_ini, f_fin] (días inclusive) en hasta `partes` rangos contiguos de días inclusive."""
+    dias = (f_fin.date() - f_ini.date()).days + 1
+    if dias <= 0:
+        raise ValueError("La fecha de fin es anterior a la de inicio.")
+    partes = max(1, min(partes, dias))
+    inicio = datetime.combine(f_ini.date(), datetime.min.time())
+    cortes = [inicio + timedelta(days=dias * i // partes) for i in range(partes + 1)]
+    return [(desde, hasta - timedelta(days=1)) for desde, hasta in zip(cortes, cortes[1:])]
+
+
+# -------------------- informes --------------------
+def _ingresos_por_medico(f_ini: datetime, f_fin: datetime) -> Counter:
+    """Ingresos por médico con fecha_ingreso dentro del rango (días inclusive)."""
+    rango = MovimientoManager._rango_dias(f_ini, f_fin)
+    q, p = MovimientoManager._union_historico("fecha_ingreso >= ? AND fecha_ingreso < ?", rango, desde=rango[0])
+    return Counter(dict(Database.get_execute(f"SELECT medico_id, COUNT(*) FROM ({q}) GROUP BY medico_id", p)))
+
+
+def _unir_censo(partes: list[list[censo.FilaCenso]]) -> list[censo.FilaCenso]:
+    filas = [fila for parte in partes for fila in parte]
+    return censo.completar_tipos(filas, {f.tipo for f in filas if f.tipo != censo.TOTAL})
+
+
+def _unir_estadias(partes: list[dict]) -> dict[str, dict[int | str, estadias.SketchCuantiles]]:
+    resultado = partes[0]
+    for parte in partes[1:]:
+        for dimension, sketches in parte.items():
+            grupos = resultado[dimension]
+            for clave, sketch in sketches.items():
+                if clave in grupos:
+                    grupos[clave].fusionar(sketch)
+                else:
+                    grupos[clave] = sketch
+    return resultado
+
+
+def _unir_conteos(partes: list[Counter]) -> Counter:
+    total: Counter = Counter()
+    for parte in partes:
+        total.update(parte)
+    return total
+
+
+@dataclass(frozen=True)
+class Informe:
+    calcular: Callable[..., Any]          # (f_ini, f_fin, **opciones) -> agregado parcial
+    unir: Callable[[list[Any]], Any]      # agregados parciales, en orden de fecha -> resultado
+
+
+INFORMES: dict[str, Informe] = {
+    "censo": Informe(censo.calcular, _unir_censo),
+    "estadias": Informe(estadias.analizar, _unir_estadias),
+    "ingresos_por_medico": Informe(_ingresos_por_medico, _unir_conteos),
+}
+
+
+# -------------------- ejecución --------------------
+def _iniciar_proceso(db_file: str) -> None:
+    Database.open(db_file)
+
+
+def _correr_parte(nombre: str, desde: datetime, hasta: datetime, opciones: dict) -> Any:
+    with Database.snapshot():
+        return INFORMES[nombre].calcular(desde, hasta, **opciones)
+
+
+def ejecutar(nombre: str, f_ini: datetime, f_fin: datetime, procesos: int | None = None,
+             partes: int | None = None, **opciones) -> Any:
+    """
+    Corre el informe `nombre` entre f_ini y f_fin (días inclusive) repartido en `partes` rangos
+    sobre `procesos` procesos (default: un proceso por núcleo, una parte por proceso).
+    Con procesos=1 corre en este proceso, en un solo snapshot y sin partir el rango.
+    """
+    if nombre not in INFORMES:
+        raise ValueError(f"Informe inválido: {nombre}. Opciones: {', '.join(INFORMES)}")
+    informe = INFORMES[nombre]
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1:
+        with Database.snapshot():
+            return informe.calcular(f_ini, f_fin, **opciones)
+    dias = (f_fin.date() - f_ini.date()).days + 1
+    partes = partes or min(procesos, max(1, dias // DIAS_MINIMOS_POR_PARTE))
+    rangos = dividir(f_ini, f_fin, partes)
+    if len(rangos) == 1:
+        return ejecutar(nombre, f_ini, f_fin, procesos=1, **opciones)
+    with ProcessPoolExecutor(min(procesos, len(rangos)), mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_iniciar_proceso, initargs=(Database.db_file,)) as pool:
+        futuros = [pool.submit(_correr_parte, nombre, desde, hasta, opciones) for desde, hasta in rangos]
+        return informe.unir([f.result() for f in futuros])
+
+
+def alinear_altas(rangos: list[tuple[datetime, datetime]]) -> int:
+    """
+    Adelanta al borde entre partes el alta de cada estadía cerrada que lo cruza, para que la
+    comparación con la corrida serial ejercite el caso del borde. Escribe en la base: usar sobre
+    una copia. Devuelve las estadías modificadas.
+    """
+    conexion = Database.get_connection()
+    modificadas = 0
+    with conexion:
+        for desde, _hasta in rangos[1:]:
+            borde = desde.isoformat()
+            cursor = conexion.execute(
+                "UPDATE movimientos SET fecha_egreso = ? WHERE fecha_ingreso < ? AND fecha_egreso > ?",
+                (borde, borde, borde))
+            modificadas += cursor.rowcount
+    return modificadas
+
+
+def comparar(nombre: str, f_ini: datetime, f_fin: datetime, procesos: int | None = None,
+             partes: int | None = None) -> int:
+    """
+    Corre `nombre` en paralelo y en serie sobre una copia de la base con altas en los bordes
+    entre partes (alinear_altas) y falla si los resultados difieren. Devuelve las altas alineadas.
+    Usa al menos dos procesos y dos partes aunque haya un solo núcleo: lo que se verifica es el corte.
+    """
+    procesos = max(2, procesos or os.cpu_count() or 1)
+    dias = (f_fin.date() - f_ini.date()).days + 1
+    rangos = dividir(f_ini, f_fin, max(2, partes or min(procesos, dias // DIAS_MINIMOS_POR_PARTE)))
+    original, historico = Database.db_file, Database.historico_file()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            Database.close_connection()
+            Database.db_file = os.path.join(tmp, os.path.basename(original))
+            shutil.copyfile(original, Database.db_file)
+            if os.path.exists(historico):
+                shutil.copyfile(historico, Database.historico_file())
+            Database.open(Database.db_file)
+            try:
+                alineadas = alinear_altas(rangos)
+                paralelo = ejecutar(nombre, f_ini, f_fin, procesos, len(rangos))
+                serial = ejecutar(nombre, f_ini, f_fin, procesos=1)
+            finally:
+                Database.close_connection()
+    finally:
+        Database.open(original)
+    if _comparable(nombre, serial) != _comparable(nombre, paralelo):
+        raise SystemExit("Los resultados en paralelo no coinciden con la corrida en serie.")
+    return alineadas
+
+
+def _comparable(nombre: str, resultado: Any) -> Any:
+    """Forma del resultado que se puede comparar con ==."""
+    if nombre == "estadias":
+        return {d: {c: (s.n, s.suma, s.minimo, s.maximo, s.ceros, s.cubetas) for c, s in g.items()}
+                for d, g in resultado.items()}
+    return resultado
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Informes históricos repartidos en procesos.")
+    parser.add_argument("informe", choices=sorted(INFORMES))
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite")
+    parser.add_argument("--desde", type=datetime.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--hasta", type=datetime.fromisoformat, required=True, help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--procesos", type=int, default=None, help="default: núcleos disponibles")
+    parser.add_argument("--partes", type=int, default=None, help="rangos en que se corta el período")
+    parser.add_argument("--comparar", action="store_true",
+                        help="correr también en serie y verificar igualdad, en la base y en una copia con altas en los bordes")
+    args = parser.parse_args(argv)
+
+    Database.open(args.db)
+    try:
+        inicio = time.perf_counter()
+        resultado = ejecutar(args.informe, args.desde, args.hasta, args.procesos, args.partes)
+        paralelo = time.perf_counter() - inicio
+        print(f"Paralelo: {paralelo:.2f} s")
+        if args.comparar:
+            inicio = time.perf_counter()
+            serial = ejecutar(args.informe, args.desde, args.hasta, procesos=1)
+            print(f"Serie:    {time.perf_counter() - inicio:.2f} s")
+            if _comparable(args.informe, serial) != _comparable(args.informe, resultado):
+                raise SystemExit("Los resultados en paralelo no coinciden con la corrida en serie.")
+            alineadas = comparar(args.informe, args.desde, args.hasta, args.procesos, args.partes)
+            print(f"Resultados idénticos (también con {alineadas} altas movidas a los bordes entre partes, en una copia).")
+    finally:
+        Database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
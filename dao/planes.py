@@ -0,0 +1,230 @@
+# planes.py
+"""
+Control de regresiones de planes de consulta.
+
+Ejecuta cada camino de los managers (las consultas de SQLBuilder y las escritas a mano en
+CamaManager y MovimientoManager) contra una base poblada, captura los statements que llegan a
+SQLite con set_trace_callback y corre EXPLAIN QUERY PLAN sobre cada uno. Falla si una consulta
+que toca una tabla grande la recorre entera (SCAN sin índice, o sobre un índice no parcial) o
+arma un B-tree temporal para ordenar, salvo que esté en PERMITIDAS con su justificación.
+
+Uso por consola (sale con código 1 si hay violaciones):
+    python -m dao.planes
+    python -m dao.planes --db nosocomio.db -v
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from datetime import timedelta
+from sqlite3 import Connection
+from typing import Callable
+
+from dao.conn import Database
+from dao import generador
+from dao.managers import (
+    BaseManager,
+    PacienteManager,
+    MedicoManager,
+    HabitacionManager,
+    CamaManager,
+    MovimientoManager,
+)
+
+TABLAS_GRANDES = {"movimientos", "pacientes"}
+
+# "Manager.metodo" (o "Manager.metodo[variante]" para una sola forma de llamarlo) -> motivo por el
+# que se acepta un recorrido completo u ordenamiento temporal.
+PERMITIDAS: dict[str, str] = {
+    "PacienteManager.get_list": "listado completo para ABM y combos",
+    "MovimientoManager.get_list": "listado completo, no se usa en la UI",
+    "MovimientoManager.pacientes_con_multiples_ingresos":
+        "agrega toda la historia por paciente; recorre el índice (paciente_id, fecha_ingreso) y ordena el resultado agregado",
+    "MovimientoManager.detalle_camas_ocupadas": "ordena solo las internaciones abiertas (como mucho una por cama)",
+    "MovimientoManager.readmisiones":
+        "LAG por paciente sobre toda la historia; recorre idx_movimientos_paciente en orden y la página es un sort top-N",
+    "MovimientoManager.ocupante_en": "ordena solo las candidatas que devuelve el R*Tree para esa cama e instante",
+    "MovimientoManager.estadias_solapadas": "ordena solo las estadías que el R*Tree encuentra en curso dentro del rango",
+    "MovimientoManager.columnas[sin rango]":
+        "toda la historia en modo columnar para analítica; el recorrido es el pedido",
+    "MovimientoManager.columnas[solapa]": "como estadias_solapadas: ordena solo las candidatas del R*Tree",
+}
+
+_RE_TABLA = re.compile(r"^(SCAN|SEARCH) (\w+)")
+_RE_INDICE = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_RE_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_PALABRAS = {"WHERE", "JOIN", "ON", "GROUP", "ORDER", "LEFT", "INNER", "CROSS", "LIMIT", "UNION", "SET", "USING"}
+_SENTENCIAS = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+@dataclass
+class Statement:
+    origen: str
+    sql: str
+    plan: list[str] = field(default_factory=list)
+    problemas: list[str] = field(default_factory=list)
+
+
+class _Captura:
+    """Junta los statements que ejecuta la conexión, etiquetados con el método que los originó."""
+    def __init__(self, conexion: Connection):
+        self.conexion = conexion
+        self.origen = ""
+        self.statements: dict[tuple[str, str], Statement] = {}
+
+    def __call__(self, sql: str) -> None:
+        if sql.lstrip().upper().startswith(_SENTENCIAS):
+            clave = (self.origen, " ".join(sql.split()))
+            self.statements.setdefault(clave, Statement(*clave))
+
+    def ejecutar(self, origen: str, fn: Callable, *args) -> None:
+        self.origen = origen
+        self.conexion.set_trace_callback(self)
+        try:
+            fn(*args)
+        except ValueError:
+            pass  # una validación de negocio que corta el flujo igual deja capturadas sus consultas
+        finally:
+            self.conexion.set_trace_callback(None)
+
+
+def _indices_parciales(conexion: Connection) -> set[str]:
+    q = "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    return {n for n, sql in conexion.execute(q) if " WHERE " in sql.upper()}
+
+
+def _tablas_por_alias(sql: str) -> dict[str, str]:
+    """El plan nombra las tablas por su alias (p.ej. 'SEARCH m'): alias -> tabla, sin el esquema."""
+    alias = {}
+    for tabla, nombre in _RE_ALIAS.findall(sql):
+        alias[tabla] = tabla
+        if nombre and nombre.upper() not in _PALABRAS:
+            alias[nombre] = tabla
+    return alias
+
+
+def analizar(conexion: Connection, st: Statement, parciales: set[str]) -> None:
+    st.plan = [fila[-1] for fila in conexion.execute(f"EXPLAIN QUERY PLAN {st.sql}")]
+    alias = _tablas_por_alias(st.sql)
+    toca_grande = False
+    for detalle in st.plan:
+        m = _RE_TABLA.match(detalle)
+        if not m or alias.get(m.group(2), m.group(2)) not in TABLAS_GRANDES:
+            continue
+        toca_grande = True
+        indice = _RE_INDICE.search(detalle)
+        if m.group(1) == "SCAN" and (indice is None or indice.group(1) not in parciales):
+            st.problemas.append(detalle)
+    if toca_grande:
+        st.problemas.extend(d for d in st.plan if d.startswith("USE TEMP B-TREE"))
+
+
+def recolectar(conexion: Connection) -> list[Statement]:
+    """Recorre todos los caminos de los managers y devuelve los statements capturados."""
+    captura = _Captura(conexion)
+    una = lambda tabla: conexion.execute(f"SELECT id FROM {tabla} ORDER BY id LIMIT 1").fetchone()[0]
+    medico_id = una("medicos")
+    abierta = conexion.execute("SELECT id, cama_id, paciente_id FROM movimientos WHERE fecha_egreso IS NULL LIMIT 1").fetchone()
+    ultimo = MovimientoManager.get_one(una("movimientos"))
+    desde, hasta = ultimo.fecha_ingreso, ultimo.fecha_ingreso + timedelta(days=30)
+    managers: tuple[type[BaseManager], ...] = (PacienteManager, MedicoManager, HabitacionManager, CamaManager, MovimientoManager)
+
+    # CRUD de BaseManager (SQLBuilder) sobre cada tabla.
+    for m in managers:
+        nombre = m.__name__
+        existente = m.get_one(una(m.table_name))
+        datos = existente.to_dict()
+        captura.ejecutar(f"{nombre}.get_one", m.get_one, existente.id)
+        captura.ejecutar(f"{nombre}.get_list", m.get_list)
+        captura.ejecutar(f"{nombre}.filter", lambda: m.filter(id=existente.id))
+        captura.ejecutar(f"{nombre}.update", m.update, existente.id, datos)
+        captura.ejecutar(f"{nombre}.delete", m.delete, 10 ** 9)
+    captura.ejecutar("MedicoManager.create", MedicoManager.create, {"nombre": "x", "matricula": 1, "especialidad": "x"})
+    for criterio in ("id", "nombre", "especialidad"):
+        captura.ejecutar("MedicoManager.listar_ordenado", MedicoManager.listar_ordenado, criterio)
+    captura.ejecutar("CamaManager.create", CamaManager.create, {"habitacion_id": una("habitaciones")})
+    captura.ejecutar("CamaManager.esta_ocupada", CamaManager.esta_ocupada, abierta[1])
+    captura.ejecutar("CamaManager.camas_libres", CamaManager.camas_libres)
+    captura.ejecutar("CamaManager.contar_en_habitacion", CamaManager.contar_en_habitacion, una("habitaciones"))
+
+    # Reglas de negocio e Informes
+    mm = MovimientoManager
+    captura.ejecutar("MovimientoManager.tiene_internacion_abierta", mm.tiene_internacion_abierta, abierta[2])
+    captura.ejecutar("MovimientoManager.ingresar", lambda: mm.ingresar(
+        cama_id=abierta[1], paciente_id=abierta[2], medico_id=medico_id, fecha_ingreso=hasta))
+    captura.ejecutar("MovimientoManager.dar_alta", mm.dar_alta, abierta[0], hasta)
+    captura.ejecutar("MovimientoManager.internaciones_abiertas", mm.internaciones_abiertas)
+    captura.ejecutar("MovimientoManager.ingresados_por_medico", mm.ingresados_por_medico, medico_id)
+    captura.ejecutar("MovimientoManager.ingresados_entre", mm.ingresados_entre, desde, hasta)
+    captura.ejecutar("MovimientoManager.altas_entre", mm.altas_entre, desde, hasta)
+    captura.ejecutar("MovimientoManager.pacientes_con_multiples_ingresos", mm.pacientes_con_multiples_ingresos)
+    captura.ejecutar("MovimientoManager.total_internados_hoy", mm.total_internados_hoy)
+    captura.ejecutar("MovimientoManager.detalle_camas_ocupadas", mm.detalle_camas_ocupadas)
+    captura.ejecutar("MovimientoManager.readmisiones", mm.readmisiones, 30)
+    captura.ejecutar("MovimientoManager.readmisiones", mm.readmisiones, 30, 50, (abierta[2], desde.isoformat(), 0))
+
+    # Índice de intervalos (R*Tree, dao.intervalos) y modo columnar (dao.columnar)
+    captura.ejecutar("MovimientoManager.ocupante_en", mm.ocupante_en, abierta[1], hasta)
+    captura.ejecutar("MovimientoManager.estadias_solapadas", mm.estadias_solapadas, desde, hasta)
+    captura.ejecutar("MovimientoManager.estadias_solapadas", mm.estadias_solapadas, desde, hasta, abierta[1])
+    captura.ejecutar("MovimientoManager.estadias_solapadas", mm.estadias_solapadas, desde, hasta, None, abierta[2])
+    captura.ejecutar("MovimientoManager.columnas[sin rango]", mm.columnas)
+    for por in ("ingreso", "egreso"):
+        captura.ejecutar("MovimientoManager.columnas", mm.columnas, desde, hasta, por)
+    captura.ejecutar("MovimientoManager.columnas[solapa]", mm.columnas, desde, hasta, "solapa")
+    return list(captura.statements.values())
+
+
+def verificar(db_file: str, verbose: bool = False) -> list[Statement]:
+    """Devuelve los statements con problemas no permitidos. Escribe en la base: usar sobre una copia."""
+    Database.open(db_file)
+    conexion = Database.get_connection()
+    statements = recolectar(conexion)
+    parciales = _indices_parciales(conexion)
+    fallidos = []
+    for st in statements:
+        analizar(conexion, st, parciales)
+        permitido = st.origen in PERMITIDAS
+        if st.problemas and not permitido:
+            fallidos.append(st)
+        if verbose or (st.problemas and not permitido):
+            estado = "FALLA" if st.problemas and not permitido else ("permitida" if st.problemas else "ok")
+            print(f"[{estado}] {st.origen}: {st.sql[:110]}")
+            for detalle in st.plan:
+                print(f"      {detalle}")
+    return fallidos
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Verifica los planes de consulta de los managers.")
+    parser.add_argument("--db", help="base poblada a usar (se copia; default: genera una sintética)")
+    parser.add_argument("--estadias", type=int, default=20_000, help="tamaño de la base sintética")
+    parser.add_argument("-v", "--verbose", action="store_true", help="muestra todos los planes")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        copia = os.path.join(tmp, "planes.db")
+        if args.db:
+            shutil.copyfile(args.db, copia)
+            Database.open(copia)
+            for m in (PacienteManager, MedicoManager, HabitacionManager, CamaManager, MovimientoManager):
+                m.create_table()
+            Database.get_connection().execute("ANALYZE")
+        else:
+            generador.generar(copia, args.estadias, seed=1)
+        fallidos = verificar(copia, args.verbose)
+        Database.close_connection()
+
+    if fallidos:
+        print(f"{len(fallidos)} consultas recorren tablas grandes u ordenan sin índice.")
+        sys.exit(1)
+    print("Planes de consulta OK.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# rollups.py
+"""
+Agregados diarios de ingresos y altas, mantenidos por triggers sobre `movimientos`.
+
+- rollup_medico_dia(dia, medico_id, ingresos, altas)
+- rollup_tipo_dia(dia, tipo, ingresos, altas)   tipo = tipo de habitación de la cama
+
+Los triggers suman al insertar (ingresar, importaciones), restan al borrar y al actualizar
+(dar_alta o una corrección de fechas, cama o médico) restan la fila vieja y suman la nueva. El
+archivado (dao.historico) borra de la tabla viva dentro de `conservando()`: las estadías pasan
+al histórico y los agregados siguen contándolas. Una estadía sin médico no suma a
+rollup_medico_dia. El tipo es el de la habitación actual de la cama, así que los triggers de
+camas y habitaciones (ver managers) impiden cambiarlo si ya hay internaciones. El censo de fin de día por tipo es la suma acumulada de
+ingresos - altas, calculada con una función ventana sobre una serie densa de días.
+
+Las cargas masivas (generador, importador) usan `suspendido()`: quitan los triggers,
+cargan y reconstruyen todo al final, que es mucho más barato que disparar fila por fila.
+
+Uso por consola (regenera los agregados desde la historia, viva + histórico):
+    python -m dao.rollups --db nosocomio.db
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from sqlite3 import Connection
+from typing import Iterator
+
+from dao.conn import Database
+from dao.managers import MovimientoManager
+
+TABLAS = (
+    """CREATE TABLE IF NOT EXISTS rollup_medico_dia (
+        dia TEXT NOT NULL, medico_id INTEGER NOT NULL,
+        ingresos INTEGER NOT NULL DEFAULT 0, altas INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, medico_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS rollup_tipo_dia (
+        dia TEXT NOT NULL, tipo TEXT NOT NULL,
+        ingresos INTEGER NOT NULL DEFAULT 0, altas INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, tipo)
+    ) WITHOUT ROWID""",
+)
+
+_TIPO_DE_CAMA = "FROM camas c JOIN habitaciones h ON h.id = c.habitacion_id WHERE c.id = {fila}.cama_id"
+
+
+def _delta(fila: str, fecha: str, contador: str, signo: int) -> str:
+    """Statements que suman `signo` al `contador` del día de `fila.fecha` (si no es NULL)."""
+    ingresos, altas = (signo, 0) if contador == "ingresos" else (0, signo)
+    dia = f"substr({fila}.{fecha}, 1, 10)"
+    return f"""
+        INSERT INTO rollup_medico_dia (dia, medico_id, ingresos, altas)
+        SELECT {dia}, {fila}.medico_id, {ingresos}, {altas}
+        WHERE {fila}.{fecha} IS NOT NULL AND {fila}.medico_id IS NOT NULL
+        ON CONFLICT (dia, medico_id) DO UPDATE SET {contador} = {contador} + ({signo});
+        INSERT INTO rollup_tipo_dia (dia, tipo, ingresos, altas)
+        SELECT {dia}, h.tipo, {ingresos}, {altas} {_TIPO_DE_CAMA.format(fila=fila)} AND {fila}.{fecha} IS NOT NULL
+        ON CONFLICT (dia, tipo) DO UPDATE SET {contador} = {contador} + ({signo});"""
+
+
+TRIGGERS = {
+    "trg_rollup_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON movimientos
+        BEGIN {_delta("NEW", "fecha_ingreso", "ingresos", 1)} {_delta("NEW", "fecha_egreso", "altas", 1)}
+        END""",
+    "trg_rollup_update": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_update
+        AFTER UPDATE OF cama_id, medico_id, fecha_ingreso, fecha_egreso ON movimientos
+        WHEN OLD.cama_id IS NOT NEW.cama_id OR OLD.medico_id IS NOT NEW.medico_id
+          OR OLD.fecha_ingreso IS NOT NEW.fecha_ingreso OR OLD.fecha_egreso IS NOT NEW.fecha_egreso
+        BEGIN {_delta("OLD", "fecha_ingreso", "ingresos", -1)} {_delta("OLD", "fecha_egreso", "altas", -1)}
+              {_delta("NEW", "fecha_ingreso", "ingresos", 1)} {_delta("NEW", "fecha_egreso", "altas", 1)}
+        END""",
+    "trg_rollup_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_delete AFTER DELETE ON movimientos
+        BEGIN {_delta("OLD", "fecha_ingreso", "ingresos", -1)} {_delta("OLD", "fecha_egreso", "altas", -1)}
+        END""",
+}
+
+
+def _movimientos(conexion: Connection) -> str:
+    """Fuente de la reconstrucción: la tabla viva más el histórico si está adjunto a `conexion`."""
+    if any(fila[1] == "historico" for fila in conexion.execute("PRAGMA database_list")):
+        return "(SELECT * FROM main.movimientos UNION ALL SELECT * FROM historico.movimientos)"
+    return "main.movimientos"
+
+
+def crear(conexion: Connection) -> None:
+    """Crea tablas y triggers. Si las tablas son nuevas y ya hay movimientos, las llena."""
+    nuevas = conexion.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'rollup_tipo_dia'"
+    ).fetchone()[0] == 0
+    with conexion:
+        for query in TABLAS:
+            conexion.execute(query)
+        # Se recrean siempre: una base creada con una versión anterior conserva los triggers viejos.
+        for nombre, query in TRIGGERS.items():
+            conexion.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+            conexion.execute(query)
+    if nuevas and conexion.execute("SELECT 1 FROM movimientos LIMIT 1").fetchone():
+        reconstruir(conexion)
+
+
+def reconstruir(conexion: Connection) -> int:
+    """Regenera los agregados desde cero. Devuelve la cantidad de filas (día, tipo) resultantes."""
+    movimientos = _movimientos(conexion)
+    eventos = f"""
+        SELECT substr(fecha_ingreso, 1, 10) AS dia, medico_id, cama_id, 1 AS ingresos, 0 AS altas FROM {movimientos}
+        UNION ALL
+        SELECT substr(fecha_egreso, 1, 10), medico_id, cama_id, 0, 1 FROM {movimientos} WHERE fecha_egreso IS NOT NULL
+    """
+    with conexion:
+        conexion.execute("DELETE FROM rollup_medico_dia")
+        conexion.execute("DELETE FROM rollup_tipo_dia")
+        conexion.execute(f"""
+            INSERT INTO rollup_medico_dia (dia, medico_id, ingresos, altas)
+            SELECT dia, medico_id, SUM(ingresos), SUM(altas) FROM ({eventos})
+            WHERE medico_id IS NOT NULL GROUP BY dia, medico_id
+        """)
+        conexion.execute(f"""
+            INSERT INTO rollup_tipo_dia (dia, tipo, ingresos, altas)
+            SELECT e.dia, h.tipo, SUM(e.ingresos), SUM(e.altas)
+            FROM ({eventos}) e
+            JOIN camas c ON c.id = e.cama_id
+            JOIN habitaciones h ON h.id = c.habitacion_id
+            GROUP BY e.dia, h.tipo
+        """)
+    return conexion.execute("SELECT COUNT(*) FROM rollup_tipo_dia").fetchone()[0]
+
+
+def suspender(conexion: Connection) -> None:
+    """Quita los triggers antes de una carga masiva. Siempre debe seguir un `reanudar`."""
+    with conexion:
+        for nombre in TRIGGERS:
+            conexion.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+
+def reanudar(conexion: Connection) -> None:
+    crear(conexion)
+    reconstruir(conexion)
+
+
+@contextmanager
+def conservando(conexion: Connection) -> Iterator[None]:
+    """
+    Borrados que no restan de los agregados (el archivado mueve estadías al histórico). Quita el
+    trigger de DELETE dentro de la transacción ya abierta y lo repone antes del COMMIT, así
+    ninguna otra conexión llega a borrar sin él.
+    """
+    existe = conexion.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_rollup_delete'").fetchone()
+    if existe:
+        conexion.execute("DROP TRIGGER trg_rollup_delete")
+    try:
+        yield
+    finally:
+        if existe:
+            conexion.execute(TRIGGERS["trg_rollup_delete"])
+
+
+@contextmanager
+def suspendido(conexion: Connection) -> Iterator[None]:
+    """Para cargas masivas: sin triggers durante el bloque, reconstrucción completa al salir."""
+    suspender(conexion)
+    try:
+        yield
+    finally:
+        reanudar(conexion)
+
+
+# -------------------- consultas --------------------
+def _consulta_resumen_por_tipo(f_ini: datetime, f_fin: datetime) -> tuple[str, tuple]:
+    q = """
+        SELECT dia, tipo, ingresos, altas FROM rollup_tipo_dia
+        WHERE dia >= ? AND dia < ?
+        ORDER BY dia, tipo
+    """
+    return q, MovimientoManager._rango_dias(f_ini, f_fin)
+
+
+def _consulta_resumen_por_medico(f_ini: datetime, f_fin: datetime) -> tuple[str, tuple]:
+    q = """
+        SELECT r.medico_id, md.nombre AS medico, SUM(r.ingresos) AS ingresos, SUM(r.altas) AS altas
+        FROM rollup_medico_dia r
+        LEFT JOIN medicos md ON md.id = r.medico_id
+        WHERE r.dia >= ? AND r.dia < ?
+        GROUP BY r.medico_id
+        ORDER BY ingresos DESC, r.medico_id
+    """
+    return q, MovimientoManager._rango_dias(f_ini, f_fin)
+
+
+def _consulta_censo_diario(f_ini: datetime, f_fin: datetime) -> tuple[str, tuple]:
+    # Serie densa de días desde el primer movimiento (un día sin eventos arrastra el censo del
+    # anterior) y la ventana acumula ingresos - altas por tipo. Son búsquedas por clave primaria:
+    # unos pocos miles de filas aunque la historia tenga millones de estadías.
+    desde, hasta = MovimientoManager._rango_dias(f_ini, f_fin)
+    q = """
+        WITH RECURSIVE dias(dia) AS (
+            SELECT MIN(dia) FROM rollup_tipo_dia
+            UNION ALL
+            SELECT date(dia, '+1 day') FROM dias WHERE date(dia, '+1 day') < ?
+        )
+        SELECT dia, tipo, censo FROM (
+            SELECT d.dia, t.tipo,
+                   SUM(COALESCE(r.ingresos - r.altas, 0)) OVER (PARTITION BY t.tipo ORDER BY d.dia) AS censo
+            FROM dias d
+            CROSS JOIN (SELECT DISTINCT tipo FROM rollup_tipo_dia) t
+            LEFT JOIN rollup_tipo_dia r ON r.dia = d.dia AND r.tipo = t.tipo
+        )
+        WHERE dia >= ?
+        ORDER BY dia, tipo
+    """
+    return q, (hasta, desde)
+
+
+def resumen_por_tipo(f_ini: datetime, f_fin: datetime) -> list[tuple[str, str, int, int]]:
+    """(dia, tipo, ingresos, altas) de cada día del rango con movimientos."""
+    return Database.get_execute(*_consulta_resumen_por_tipo(f_ini, f_fin))
+
+
+def resumen_por_medico(f_ini: datetime, f_fin: datetime) -> list[tuple[int, str, int, int]]:
+    """(medico_id, nombre, ingresos, altas) totales del rango."""
+    return Database.get_execute(*_consulta_resumen_por_medico(f_ini, f_fin))
+
+
+def censo_diario(f_ini: datetime, f_fin: datetime) -> list[tuple[str, str, int]]:
+    """(dia, tipo, internados al final del día)."""
+    return Database.get_execute(*_consulta_censo_diario(f_ini, f_fin))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Reconstruye los agregados diarios desde la historia.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    Database.open(args.db)
+    try:
+        conexion = Database.get_connection()
+        crear(conexion)
+        filas = reconstruir(conexion)
+    finally:
+        Database.close_connection()
+    print(f"Agregados reconstruidos: {filas} filas (día, tipo) en {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
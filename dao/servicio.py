@@ -0,0 +1,422 @@
+# servicio.py
+"""
+Servicio HTTP/JSON local sobre los managers, para que varios puestos usen la misma base a
+través de un único proceso en lugar de abrir nosocomio.db cada uno (p.ej. en un recurso de red).
+
+Servidor asyncio (solo biblioteca estándar, HTTP/1.1 con keep-alive) sobre dao.asincrono: las
+lecturas van al pool de hilos lectores (cada una en su snapshot) y todas las escrituras a la
+cola del único hilo escritor. Un pedido mal formado (Content-Length inválido, campos que faltan,
+que el modelo no tiene o de un tipo que su columna no admite, parámetros de informe inválidos)
+se responde 400; las validaciones de negocio son las de los managers: un ValueError se responde
+409 con {"error": mensaje}. Cualquier otro error se responde 500.
+
+Los GET llevan ETag según dao.versiones. Con If-None-Match igual al ETag vigente se responde 304
+sin ejecutar la consulta, así un puesto que refresca seguido solo descarga lo que cambió.
+
+Rutas (prefijo /api):
+    GET    /{recurso}?despues_de=ID&limite=N   página ordenada por id: {"datos": [...], "siguiente": ID|null}
+    GET    /{recurso}/{id}
+    POST   /{recurso}                          alta (cuerpo JSON con los campos del modelo)
+    PUT    /{recurso}/{id}                     reemplazo completo
+    DELETE /{recurso}/{id}
+        recurso: pacientes, medicos, habitaciones, camas (movimientos solo GET)
+    GET    /camas/libres
+    POST   /movimientos                        ingresar: cama_id, paciente_id, medico_id, fecha_ingreso (opcional)
+    POST   /movimientos/{id}/alta              dar_alta: fecha_egreso (opcional, default ahora)
+    GET    /informes                           nombres de los informes
+    GET    /informes/{nombre}?desde=&hasta=&medico=&criterio=&dias=
+                                               {"columnas": [...], "filas": [[...], ...]}
+
+Uso por consola:
+    python -m dao.servicio --db nosocomio.db --puerto 8765
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime
+from http import HTTPStatus
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from dao.conn import Database
+from dao import exportar, versiones
+from dao.asincrono import (
+    AsyncBaseManager,
+    AsyncPacienteManager,
+    AsyncMedicoManager,
+    AsyncHabitacionManager,
+    AsyncCamaManager,
+    AsyncMovimientoManager,
+    EjecutorAsync,
+    LECTORES,
+)
+from dao.managers import (
+    PacienteManager,
+    MedicoManager,
+    HabitacionManager,
+    CamaManager,
+    MovimientoManager,
+    SQLBuilder,
+)
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+LIMITE_PAGINA = 500
+LIMITE_PAGINA_MAX = 5000
+CUERPO_MAX = 1 << 20
+
+RECURSOS: dict[str, type[AsyncBaseManager]] = {
+    a.manager.table_name: a
+    for a in (AsyncPacienteManager, AsyncMedicoManager, AsyncHabitacionManager, AsyncCamaManager, AsyncMovimientoManager)
+}
+SOLO_LECTURA = {"movimientos"}  # se modifican con ingresar / dar_alta
+TODAS = tuple(RECURSOS)  # los informes cruzan varias tablas: cualquier cambio invalida su ETag
+
+_dumps = json.JSONEncoder(
+    ensure_ascii=False, separators=(",", ":"),
+    default=lambda o: o.isoformat() if isinstance(o, datetime) else o.to_dict(),
+).encode
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+@dataclass
+class Pedido:
+    metodo: str
+    ruta: list[str]
+    query: dict[str, str]
+    headers: dict[str, str]
+    cuerpo: bytes = b""
+    keep_alive: bool = True
+
+    def json(self) -> dict:
+        try:
+            datos = json.loads(self.cuerpo or b"{}")
+        except ValueError:
+            raise ErrorHTTP(400, "El cuerpo no es JSON válido.")
+        if not isinstance(datos, dict):
+            raise ErrorHTTP(400, "El cuerpo debe ser un objeto JSON.")
+        return datos
+
+    def entero(self, nombre: str, default: int | None = None) -> int | None:
+        valor = self.query.get(nombre)
+        if valor is None:
+            return default
+        try:
+            return int(valor)
+        except ValueError:
+            raise ErrorHTTP(400, f"{nombre} debe ser entero.")
+
+    def fecha(self, nombre: str) -> datetime | None:
+        valor = self.query.get(nombre)
+        try:
+            return datetime.fromisoformat(valor) if valor else None
+        except ValueError:
+            raise ErrorHTTP(400, f"{nombre} no es una fecha ISO válida.")
+
+
+@dataclass
+class Respuesta:
+    estado: int = 200
+    datos: Any = None
+    headers: dict[str, str] = field(default_factory=dict)
+
+    def serializar(self, keep_alive: bool) -> bytes:
+        cuerpo = b"" if self.estado in (204, 304) else _dumps(self.datos).encode("utf-8")
+        headers = {
+            "Content-Length": str(len(cuerpo)),
+            "Connection": "keep-alive" if keep_alive else "close",
+            **({"Content-Type": "application/json; charset=utf-8"} if cuerpo else {}),
+            **self.headers,
+        }
+        cabecera = f"HTTP/1.1 {self.estado} {HTTPStatus(self.estado).phrase}\r\n"
+        cabecera += "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        return (cabecera + "\r\n").encode("latin-1") + cuerpo
+
+
+async def _leer_pedido(reader: asyncio.StreamReader) -> Pedido | None:
+    linea = await reader.readline()
+    if not linea.strip():
+        return None
+    try:
+        metodo, destino, version = linea.decode("latin-1").split()
+    except ValueError:
+        raise ErrorHTTP(400, "Línea de pedido inválida.")
+    headers: dict[str, str] = {}
+    while (linea := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        headers[nombre.strip().lower()] = valor.strip()
+        if len(headers) > 100:
+            raise ErrorHTTP(431, "Demasiados headers.")
+    try:
+        largo = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise ErrorHTTP(400, "Content-Length inválido.")
+    if largo < 0:
+        raise ErrorHTTP(400, "Content-Length inválido.")
+    if largo > CUERPO_MAX:
+        raise ErrorHTTP(413, "Cuerpo demasiado grande.")
+    cuerpo = await reader.readexactly(largo) if largo else b""
+    partes = urlsplit(destino)
+    conexion = headers.get("connection", "").lower()
+    return Pedido(
+        metodo=metodo.upper(),
+        ruta=[p for p in partes.path.split("/") if p],
+        query={k: v[-1] for k, v in parse_qs(partes.query).items()},
+        headers=headers,
+        cuerpo=cuerpo,
+        keep_alive=conexion != "close" and (version == "HTTP/1.1" or conexion == "keep-alive"),
+    )
+
+
+# -------------------- lecturas con ETag --------------------
+def _versionado(tablas: tuple[str, ...], si_no_coincide: str | None, funcion, *args) -> tuple[str, Any]:
+    """Corre en un hilo lector, dentro del snapshot: ETag y datos salen del mismo estado de la base."""
+    actual = versiones.etag(tablas)
+    if actual == si_no_coincide:
+        return actual, None
+    return actual, funcion(*args)
+
+
+def _pagina(manager, despues_de: int, limite: int) -> dict:
+    query = SQLBuilder.build_select_query(manager.table_name, manager.keys) + " WHERE id > ? ORDER BY id LIMIT ?"
+    datos = [manager._crear_desde_fila(f) for f in Database.get_execute(query, (despues_de, limite))]
+    return {"datos": datos, "siguiente": datos[-1].id if len(datos) == limite else None}
+
+
+def _informe(query: str, params: tuple) -> dict:
+    cursor = Database._read_connection().execute(query, params)
+    try:
+        return {"columnas": [d[0] for d in cursor.description], "filas": cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def _argumentos_informe(nombre: str, pedido: Pedido) -> tuple:
+    """Los mismos parámetros que pide `python -m dao.exportar informe`."""
+    if nombre == "ingresados_por_medico":
+        medico = pedido.entero("medico")
+        if medico is None:
+            raise ErrorHTTP(400, "medico es obligatorio para ingresados_por_medico.")
+        return (medico,)
+    if nombre in exportar.INFORMES_ENTRE_FECHAS:
+        desde, hasta = pedido.fecha("desde"), pedido.fecha("hasta")
+        if desde is None or hasta is None:
+            raise ErrorHTTP(400, "desde y hasta son obligatorios.")
+        return desde, hasta
+    if nombre == "medicos_ordenados":
+        criterio = pedido.query.get("criterio", "id")
+        if criterio not in MedicoManager.CRITERIOS:
+            raise ErrorHTTP(400, f"criterio inválido. Opciones: {', '.join(MedicoManager.CRITERIOS)}.")
+        return (criterio,)
+    if nombre == "readmisiones":
+        dias = pedido.entero("dias", 30)
+        if dias < 0:
+            raise ErrorHTTP(400, "dias no puede ser negativo.")
+        return (dias,)
+    return ()
+
+
+def _sin_desconocidos(datos: dict, campos: tuple[str, ...]) -> dict:
+    desconocidos = sorted(datos.keys() - set(campos))
+    if desconocidos:
+        raise ErrorHTTP(400, f"Campos desconocidos: {', '.join(desconocidos)}.")
+    return datos
+
+
+def _cuerpo_modelo(pedido: Pedido, manager) -> dict:
+    """
+    Cuerpo de un alta o reemplazo: todos los campos del modelo (el id es opcional) y ninguno más,
+    cada uno escalar o null y entero en las columnas INTEGER. SQLite guardaría un texto en una
+    columna INTEGER sin quejarse, y un texto ordena por encima de cualquier número.
+    """
+    datos = _sin_desconocidos(pedido.json(), manager.keys)
+    faltan = [k for k in manager.keys[1:] if k not in datos]
+    if faltan:
+        raise ErrorHTTP(400, f"Faltan campos: {', '.join(faltan)}.")
+    for nombre, tipo in zip(manager.keys[1:], manager.key_types[1:]):
+        valor = datos[nombre]
+        if valor is None:
+            continue
+        if tipo.startswith("INTEGER"):
+            if not isinstance(valor, int) or isinstance(valor, bool):
+                raise ErrorHTTP(400, f"{nombre} debe ser entero.")
+        elif not isinstance(valor, (str, int, float)):
+            raise ErrorHTTP(400, f"{nombre} debe ser un valor simple.")
+    return datos
+
+
+def _campo_entero(datos: dict, nombre: str) -> int:
+    try:
+        return int(datos[nombre])
+    except KeyError:
+        raise ErrorHTTP(400, f"Falta {nombre}.")
+    except (TypeError, ValueError):
+        raise ErrorHTTP(400, f"{nombre} debe ser entero.")
+
+
+def _campo_fecha(datos: dict, nombre: str) -> datetime:
+    """Fecha ISO del cuerpo; si no viene, ahora."""
+    if not datos.get(nombre):
+        return datetime.now()
+    try:
+        return datetime.fromisoformat(str(datos[nombre]))
+    except ValueError:
+        raise ErrorHTTP(400, f"{nombre} no es una fecha ISO válida.")
+
+
+class Servicio:
+    def __init__(self, ejecutor: EjecutorAsync):
+        self.ejecutor = ejecutor
+        for async_manager in RECURSOS.values():
+            async_manager.ejecutor = ejecutor
+
+    async def _get(self, pedido: Pedido, tablas: tuple[str, ...], funcion, *args) -> Respuesta:
+        etag, datos = await self.ejecutor.leer(_versionado, tablas, pedido.headers.get("if-none-match"), funcion, *args)
+        if etag == pedido.headers.get("if-none-match"):
+            return Respuesta(304, headers={"ETag": etag})
+        return Respuesta(200, datos, {"ETag": etag})
+
+    async def despachar(self, pedido: Pedido) -> Respuesta:
+        if not pedido.ruta or pedido.ruta[0] != "api":
+            raise ErrorHTTP(404, "Ruta inexistente.")
+        ruta, metodo = pedido.ruta[1:], pedido.metodo
+        if ruta[:1] == ["informes"]:
+            return await self._informes(pedido, ruta[1:])
+        if ruta == ["camas", "libres"] and metodo == "GET":
+            return await self._get(pedido, ("camas", "movimientos"), CamaManager.camas_libres)
+        if ruta[:1] == ["movimientos"] and metodo == "POST":
+            return await self._movimientos(pedido, ruta[1:])
+        if not ruta or ruta[0] not in RECURSOS or len(ruta) > 2:
+            raise ErrorHTTP(404, "Ruta inexistente.")
+
+        async_manager = RECURSOS[ruta[0]]
+        manager, tablas = async_manager.manager, (ruta[0],)
+        if len(ruta) == 1:
+            if metodo == "GET":
+                limite = max(1, min(pedido.entero("limite", LIMITE_PAGINA), LIMITE_PAGINA_MAX))
+                return await self._get(pedido, tablas, _pagina, manager, pedido.entero("despues_de", 0), limite)
+            if metodo == "POST" and ruta[0] not in SOLO_LECTURA:
+                creado = await async_manager.create({**_cuerpo_modelo(pedido, manager), "id": 0})
+                return Respuesta(201, creado, {"Location": f"/api/{ruta[0]}/{creado.id}"})
+            raise ErrorHTTP(405, "Método no permitido.")
+
+        try:
+            id_ = int(ruta[1])
+        except ValueError:
+            raise ErrorHTTP(404, "Id inválido.")
+        if metodo == "GET":
+            respuesta = await self._get(pedido, tablas, manager.get_one, id_)
+            if respuesta.estado == 200 and respuesta.datos is None:
+                raise ErrorHTTP(404, "No existe.")
+            return respuesta
+        if ruta[0] in SOLO_LECTURA:
+            raise ErrorHTTP(405, "Método no permitido.")
+        if metodo == "PUT":
+            actualizado = await async_manager.update(id_, {**_cuerpo_modelo(pedido, manager), "id": id_})
+            if actualizado is None:
+                raise ErrorHTTP(404, "No existe.")
+            return Respuesta(200, actualizado)
+        if metodo == "DELETE":
+            await async_manager.delete(id_)
+            return Respuesta(204)
+        raise ErrorHTTP(405, "Método no permitido.")
+
+    async def _movimientos(self, pedido: Pedido, ruta: list[str]) -> Respuesta:
+        datos = pedido.json()
+        if not ruta:
+            _sin_desconocidos(datos, ("cama_id", "paciente_id", "medico_id", "fecha_ingreso"))
+            movimiento = await AsyncMovimientoManager.ingresar(
+                cama_id=_campo_entero(datos, "cama_id"),
+                paciente_id=_campo_entero(datos, "paciente_id"),
+                medico_id=_campo_entero(datos, "medico_id"),
+                fecha_ingreso=_campo_fecha(datos, "fecha_ingreso"),
+            )
+            return Respuesta(201, movimiento, {"Location": f"/api/movimientos/{movimiento.id}"})
+        if len(ruta) == 2 and ruta[1] == "alta":
+            id_ = _campo_entero({"id": ruta[0]}, "id")
+            _sin_desconocidos(datos, ("fecha_egreso",))
+            return Respuesta(200, await AsyncMovimientoManager.dar_alta(id_, _campo_fecha(datos, "fecha_egreso")))
+        raise ErrorHTTP(404, "Ruta inexistente.")
+
+    async def _informes(self, pedido: Pedido, ruta: list[str]) -> Respuesta:
+        if pedido.metodo != "GET":
+            raise ErrorHTTP(405, "Método no permitido.")
+        if not ruta:
+            return Respuesta(200, sorted(exportar.INFORMES))
+        if len(ruta) != 1 or ruta[0] not in exportar.INFORMES:
+            raise ErrorHTTP(404, "Informe inexistente.")
+        try:
+            query, params = exportar.INFORMES[ruta[0]](*_argumentos_informe(ruta[0], pedido))
+        except ValueError as e:  # parámetros que el informe rechaza al armar la consulta
+            raise ErrorHTTP(400, str(e))
+        return await self._get(pedido, TODAS, _informe, query, params)
+
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    pedido = await _leer_pedido(reader)
+                    if pedido is None:
+                        break
+                    keep_alive = pedido.keep_alive
+                    respuesta = await self.despachar(pedido)
+                except ErrorHTTP as e:
+                    respuesta = Respuesta(e.estado, {"error": str(e)})
+                except ValueError as e:  # reglas de negocio de los managers
+                    respuesta = Respuesta(409, {"error": str(e)})
+                except Exception:  # un error no previsto no debe cortar la conexión sin respuesta
+                    traceback.print_exc()
+                    respuesta = Respuesta(500, {"error": "Error interno del servicio."})
+                writer.write(respuesta.serializar(keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+
+async def servir(host: str = HOST, puerto: int = PUERTO, lectores: int = LECTORES) -> None:
+    ejecutor = EjecutorAsync(lectores)
+    servicio = Servicio(ejecutor)
+    servidor = await asyncio.start_server(servicio.atender, host, puerto)
+    print(f"Sirviendo {Database.db_file} en http://{host}:{puerto}/api/")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        ejecutor.cerrar()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON local sobre la base del nosocomio.")
+    parser.add_argument("--db", default=Database.db_file, help="archivo SQLite")
+    parser.add_argument("--host", default=HOST, help="interfaz (default: solo localhost)")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--lectores", type=int, default=LECTORES, help="hilos de lectura")
+    args = parser.parse_args(argv)
+
+    Database.open(args.db)
+    for manager in (PacienteManager, MedicoManager, HabitacionManager, CamaManager, MovimientoManager):
+        manager.create_table()
+    try:
+        asyncio.run(servir(args.host, args.puerto, args.lectores))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        Database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
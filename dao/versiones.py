@@ -0,0 +1,48 @@
+# versiones.py
+"""
+Contador de versión por tabla, para ETags y GET condicionales (ver dao.servicio).
+
+La tabla `versiones(tabla, version)` tiene una fila por tabla de los managers; triggers AFTER
+INSERT/UPDATE/DELETE le suman 1 a la fila de su tabla en la misma transacción que el cambio.
+La fila "base" guarda un número al azar elegido al crear la tabla: si se reemplaza el archivo
+de la base, los ETags viejos no coinciden aunque los contadores vuelvan a empezar.
+
+Leer las versiones es una búsqueda por clave primaria: mucho más barato que la consulta que
+se evita cuando el cliente ya tiene los datos.
+"""
+from __future__ import annotations
+
+import random
+from sqlite3 import Connection
+
+from dao.conn import Database
+
+BASE = "base"
+
+
+def crear(conexion: Connection, tabla: str) -> None:
+    """Tabla de versiones (si falta) y los triggers que cuentan los cambios de `tabla`."""
+    with conexion:
+        conexion.execute("CREATE TABLE IF NOT EXISTS versiones (tabla TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        conexion.execute("INSERT OR IGNORE INTO versiones (tabla, version) VALUES (?, ?)",
+                         (BASE, random.randrange(1, 2**31)))
+        conexion.execute("INSERT OR IGNORE INTO versiones (tabla, version) VALUES (?, 0)", (tabla,))
+        for operacion in ("INSERT", "UPDATE", "DELETE"):
+            conexion.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_version_{tabla}_{operacion.lower()} AFTER {operacion} ON {tabla}
+                BEGIN
+                    UPDATE versiones SET version = version + 1 WHERE tabla = '{tabla}';
+                END""")
+
+
+def leer(tablas: tuple[str, ...]) -> dict[str, int]:
+    """Versión de la base y de cada una de `tablas` (0 si nunca cambió)."""
+    claves = (BASE,) + tablas
+    marcas = ", ".join("?" for _ in claves)
+    filas = dict(Database.get_execute(f"SELECT tabla, version FROM versiones WHERE tabla IN ({marcas})", claves))
+    return {t: filas.get(t, 0) for t in claves}
+
+
+def etag(tablas: tuple[str, ...]) -> str:
+    """ETag débil que cambia cuando cambia cualquiera de `tablas`."""
+    return 'W/"' + "-".join(str(v) for v in leer(tablas).values()) + '"'
@@ -12,6 +12,7 @@ from dao.managers import (
 
 from tk_src import ABMMedicosFrame, ABMPacientesFrame, IngresosFrame, ABMHabitacionesFrame, ABMCamasFrame, AltasFrame, InformesFrame
 from tk_src.ui_theme import apply_minimal_style
+from tk_src.perf import BarraRendimiento, medidor
 
 def inicializar_tablas() -> None:
     managers: list[BaseManager] = [
@@ -44,6 +45,10 @@ def main() -> None:
 
     apply_minimal_style(root)
 
+    # Barra de rendimiento para desarrollo (NOSOCOMIO_UI_PERF=1)
+    if medidor.activo:
+        BarraRendimiento(root).pack(fill="x", side="bottom")
+
     notebook = ttk.Notebook(root)
     notebook.pack(fill="both", expand=True, padx=10, pady=10)
     notebook.bind("<<NotebookTabChanged>>", _on_tab_changed)
@@ -6,6 +6,7 @@ from typing import Optional, Dict, Any
 
 from dao.managers import MovimientoManager
 from tk_src import dateformat
+from tk_src.perf import medido, medidor
 
 
 class AltasFrame(ttk.Frame):
@@ -122,27 +123,32 @@ class AltasFrame(ttk.Frame):
         self.ent_ingreso.insert(0, ingreso_val)
         self.ent_ingreso.configure(state="disabled")
 
+    @medido()
     def _cargar_abiertas(self) -> None:
-        self.tree.delete(*self.tree.get_children())
         self._selected_mov_id = None
 
-        filas = MovimientoManager.detalle_camas_ocupadas()
-        for i, d in enumerate(filas):
-            tags = ("alt",) if i % 2 else ()
-            fecha_ui = dateformat.to_ui_datetime(d.get("fecha_ingreso")) if d.get("fecha_ingreso") else "-"
-            self.tree.insert(
-                "", "end",
-                iid=str(d["movimiento_id"]),
-                values=(
-                    d.get("paciente","-"),
-                    d.get("medico","-"),
-                    d.get("habitacion_numero","-"),
-                    d.get("cama_id","-"),
-                    fecha_ui,
-                    d.get("movimiento_id","-"),
-                ),
-                tags=tags
-            )
+        with medidor.fase("modelo"):
+            filas = MovimientoManager.detalle_camas_ocupadas()
+        with medidor.fase("filas"):
+            valores = [
+                (
+                    str(d["movimiento_id"]),
+                    (
+                        d.get("paciente","-"),
+                        d.get("medico","-"),
+                        d.get("habitacion_numero","-"),
+                        d.get("cama_id","-"),
+                        dateformat.to_ui_datetime(d.get("fecha_ingreso")) if d.get("fecha_ingreso") else "-",
+                        d.get("movimiento_id","-"),
+                    ),
+                )
+                for d in filas
+            ]
+        with medidor.fase("treeview"):
+            self.tree.delete(*self.tree.get_children())
+            for i, (iid, vals) in enumerate(valores):
+                tags = ("alt",) if i % 2 else ()
+                self.tree.insert("", "end", iid=iid, values=vals, tags=tags)
 
         if not filas:
             self._clear_form()
@@ -3,6 +3,7 @@ import sqlite3
 from tkinter import ttk, messagebox
 from typing import Any, Sequence
 from tk_src.table_view import SimpleTable
+from tk_src.perf import medido, medidor
 
 class BaseABMFrame(ttk.Frame):
     """
@@ -101,8 +102,10 @@ class BaseABMFrame(ttk.Frame):
         self.btn_guardar.grid( row=0, column=9, padx=4)
         self.btn_cancelar.grid(row=0, column=10, padx=4)
 
+    @medido()
     def refrescar_lista(self):
-        self.registros = self.manager.get_list()
+        with medidor.fase("modelo"):
+            self.registros = self.manager.get_list()
         # Cargar tabla
         self.tabla.set_rows(
             self.registros,
@@ -1,16 +1,78 @@
+"""
+Formato y parseo de fechas de la UI ('dd/mm/YYYY HH:MM').
+
+Los caminos frecuentes (cada celda de cada tabla, cada filtro) no pasan por strftime/strptime:
+- Formato: el prefijo 'dd/mm/YYYY' sale de una memoización acotada por día (las estadías de un
+  informe se concentran en pocos días) y 'HH:MM' de una tabla con los 1440 minutos del día.
+- Parseo: el layout es fijo, así que se valida por posición y se corta con slices; lo que no
+  tenga exactamente ese layout cae a strptime, con el mismo resultado y los mismos errores.
+
+Benchmark (verifica que coincida con strftime/strptime y que no sea más lento):
+    python -m tk_src.dateformat --n 100000
+"""
 from __future__ import annotations
-from datetime import datetime
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Iterable
 
 UI_DATETIME_FMT = "%d/%m/%Y %H:%M"
 UI_DATE_FMT = "%d/%m/%Y"
+MAX_DIAS_MEMORIZADOS = 4096  # ~11 años de días distintos
+
+_HORAS = [f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)]
+
+
+@lru_cache(maxsize=MAX_DIAS_MEMORIZADOS)
+def _dia(anio: int, mes: int, dia: int) -> str:
+    return f"{dia:02d}/{mes:02d}/{anio:04d}"
+
 
 def to_ui_datetime(dt: datetime | None) -> str:
     """Formatea datetime a 'dd/mm/YYYY HH:MM' (o devuelve '')."""
-    return dt.strftime(UI_DATETIME_FMT) if isinstance(dt, datetime) else ""
+    if not isinstance(dt, datetime):
+        return ""
+    return f"{_dia(dt.year, dt.month, dt.day)} {_HORAS[dt.hour * 60 + dt.minute]}"
+
+
+def to_ui_date(d: date | None) -> str:
+    """Formatea date (o datetime) a 'dd/mm/YYYY' (o devuelve '')."""
+    return _dia(d.year, d.month, d.day) if isinstance(d, date) else ""
+
+
+def format_many(valores: Iterable[date | None], con_hora: bool = True) -> list[str]:
+    """to_ui_datetime (o to_ui_date con con_hora=False) de cada valor, para columnas enteras."""
+    if not con_hora:
+        return [to_ui_date(v) for v in valores]
+    dia, horas = _dia, _HORAS
+    return [f"{dia(v.year, v.month, v.day)} {horas[v.hour * 60 + v.minute]}" if isinstance(v, datetime) else ""
+            for v in valores]
+
 
 def now_ui_string() -> str:
     """Devuelve 'ahora' en formato UI."""
-    return datetime.now().replace(second=0, microsecond=0).strftime(UI_DATETIME_FMT)
+    return to_ui_datetime(datetime.now())
+
+
+def _parse_fijo(s: str, con_hora: bool) -> datetime | None:
+    """'dd/mm/YYYY[ HH:MM]' por posición; None si no tiene exactamente ese layout."""
+    if len(s) != (16 if con_hora else 10) or s[2] != "/" or s[5] != "/":
+        return None
+    digitos = s[:2] + s[3:5] + s[6:10]
+    if con_hora:
+        if s[10] != " " or s[13] != ":":
+            return None
+        digitos += s[11:13] + s[14:16]
+    if not (digitos.isascii() and digitos.isdigit()):
+        return None
+    if con_hora:
+        return datetime(int(s[6:10]), int(s[3:5]), int(s[:2]), int(s[11:13]), int(s[14:16]))
+    return datetime(int(s[6:10]), int(s[3:5]), int(s[:2]))
+
 
 def parse_ui_datetime_strict(s: str) -> datetime:
     """
@@ -18,7 +80,8 @@ def parse_ui_datetime_strict(s: str) -> datetime:
     Lanza ValueError si no coincide.
     """
     s = (s or "").strip()
-    return datetime.strptime(s, UI_DATETIME_FMT)
+    return _parse_fijo(s, True) or datetime.strptime(s, UI_DATETIME_FMT)
+
 
 def parse_ui_date_or_datetime(s: str) -> datetime:
     """
@@ -26,8 +89,72 @@ def parse_ui_date_or_datetime(s: str) -> datetime:
     Si viene solo fecha, devuelve ese día a las 00:00.
     """
     s = (s or "").strip()
+    fecha = _parse_fijo(s, len(s) > 10)
+    if fecha is not None:
+        return fecha
     try:
         return datetime.strptime(s, UI_DATETIME_FMT)
     except ValueError:
         # intenta solo fecha → 00:00
         return datetime.strptime(s, UI_DATE_FMT)
+
+
+# -------------------- benchmark --------------------
+def _medir(funcion, repeticiones: int = 3) -> tuple[float, object]:
+    mejor, resultado = float("inf"), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de formato y parseo de fechas de la UI.")
+    parser.add_argument("--n", type=int, default=100_000, help="fechas por caso")
+    parser.add_argument("--dias", type=int, default=365, help="días distintos entre los que caen las fechas")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(args.seed)
+    base = datetime(2024, 1, 1)
+    fechas = [base + timedelta(minutes=rnd.randrange(args.dias * 1440)) for _ in range(args.n)]
+    fechas[::50] = [None] * len(fechas[::50])  # altas pendientes
+    textos = [f.strftime(UI_DATETIME_FMT) for f in fechas if f is not None]
+    solo_dias = [t[:10] for t in textos]
+    _dia.cache_clear()
+
+    casos = [
+        ("to_ui_datetime",
+         lambda: [f.strftime(UI_DATETIME_FMT) if isinstance(f, datetime) else "" for f in fechas],
+         lambda: [to_ui_datetime(f) for f in fechas]),
+        ("format_many",
+         lambda: [f.strftime(UI_DATETIME_FMT) if isinstance(f, datetime) else "" for f in fechas],
+         lambda: format_many(fechas)),
+        ("parse_ui_datetime_strict",
+         lambda: [datetime.strptime(t, UI_DATETIME_FMT) for t in textos],
+         lambda: [parse_ui_datetime_strict(t) for t in textos]),
+        ("parse_ui_date_or_datetime",
+         lambda: [datetime.strptime(t, UI_DATE_FMT) for t in solo_dias],
+         lambda: [parse_ui_date_or_datetime(t) for t in solo_dias]),
+    ]
+    fallas = []
+    print(f"{'caso':<26} {'referencia ms':>14} {'rápido ms':>10} {'x':>6}")
+    for nombre, referencia, rapido in casos:
+        t_ref, r_ref = _medir(referencia)
+        t_rap, r_rap = _medir(rapido)
+        print(f"{nombre:<26} {t_ref * 1000:>14.1f} {t_rap * 1000:>10.1f} {t_ref / t_rap:>6.1f}")
+        if r_ref != r_rap:
+            fallas.append(f"{nombre}: resultados distintos")
+        elif t_rap > t_ref:
+            fallas.append(f"{nombre}: más lento que la referencia")
+    info = _dia.cache_info()
+    print(f"Memoización de días: {info.hits} aciertos, {info.misses} fallos, {info.currsize}/{info.maxsize}")
+    if fallas:
+        print("\n".join(fallas), file=sys.stderr)
+        raise SystemExit(1)
+    print("Resultados idénticos.")
+
+
+if __name__ == "__main__":
+    main()
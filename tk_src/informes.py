@@ -1,12 +1,19 @@
 from __future__ import annotations
 # informes.py
+import os
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
-from datetime import datetime
-from typing import Dict, Optional, Sequence
+from functools import wraps
+from tkinter import ttk, messagebox, filedialog
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Sequence
 
 from tk_src.table_view import SimpleTable
 from tk_src import dateformat
+from tk_src.perf import Refresco, medido, medidor
+from dao import censo, estadias, exportar, instantaneas
+from dao.cache import CacheResultados, archivo_por_defecto
+from dao.conn import Cancelacion, ConsultaCancelada, Database
 from dao.managers import (
     MovimientoManager,
     MedicoManager,
@@ -15,6 +22,15 @@ from dao.managers import (
     HabitacionManager,
 )
 
+def _en_snapshot(metodo):
+    """Corre el método dentro de Database.snapshot(): todas sus lecturas ven el mismo estado."""
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with Database.snapshot():
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+
 class InformesFrame(ttk.Frame):
     """
     Informes solicitados:
@@ -23,10 +39,37 @@ class InformesFrame(ttk.Frame):
     - Ingresados entre fechas
     - Altas entre fechas
     - Pacientes con más de un ingreso
+    - Reingresos dentro de N días del alta (paginado)
     - Total internados hoy
+    - Censo y ocupación por día u hora
+    - Ocupación por habitación
+    - Duración de estadías (promedio y percentiles) por médico, tipo o mes
     - Médicos ordenados por {id, nombre, especialidad}
     Usa Managers/Models; sin SQL directo ni imports innecesarios.
+    Cada carga lee de un snapshot de solo lectura, aislado de las altas/ingresos en curso.
+    Cada pestaña tiene "Exportar" (CSV/NDJSON, .gz opcional) que corre en un hilo aparte.
+    Las búsquedas sobre historia corren en un hilo con tiempo límite y se cortan con "Cancelar".
+    Sus resultados se cachean por versión de datos (dao.cache): repetir una búsqueda sin cambios
+    en las tablas que usa no vuelve a consultar.
+    Ingresos, altas, ocupación por habitación y múltiples ingresos se sirven de las instantáneas
+    nocturnas (dao.instantaneas) cuando hay una del período pedido, indicando cuándo se calculó.
+    Con NOSOCOMIO_UI_PERF=1 cada carga se mide por fases (tk_src.perf). El nivel en disco del
+    cache es opcional: NOSOCOMIO_CACHE_DISCO=1, solo con la base en un disco local.
     """
+    # Tiempo límite (s) de cada búsqueda en segundo plano; los que recorren toda la historia, más.
+    LIMITE_SEGUNDOS: Dict[str, float] = {"censo": 120, "estadias": 120}
+    LIMITE_POR_DEFECTO = 30
+    # Tablas de las que depende cada informe (incluidas las que dan nombres a las filas).
+    TABLAS_INFORME: Dict[str, tuple[str, ...]] = {
+        "multiples_ingresos": ("movimientos", "pacientes"),
+        "readmisiones": ("movimientos", "pacientes"),
+        "censo": ("movimientos", "camas", "habitaciones"),
+        "ocupacion_por_habitacion": ("movimientos", "camas", "habitaciones"),
+        "estadias": ("movimientos", "camas", "habitaciones", "medicos"),
+    }
+    TABLAS_POR_DEFECTO = ("movimientos", "pacientes", "medicos", "camas", "habitaciones")
+    CACHE_EN_DISCO = os.environ.get("NOSOCOMIO_CACHE_DISCO", "0") not in ("", "0")
+
     def __init__(self, master=None):
         super().__init__(master, padding=12, style="Card.TFrame")
         self.columnconfigure(0, weight=1)
@@ -37,6 +80,11 @@ class InformesFrame(ttk.Frame):
         self._hab_cache: Dict[int, tuple[int, str, int]]  = {}  # id -> (numero, tipo, capacidad)
         self._cama_hab_cache: Dict[int, int] = {}  # cama_id -> habitacion_id
 
+        # búsquedas en curso por informe y sus botones "Cancelar"
+        self._en_curso: Dict[str, Cancelacion] = {}
+        self._botones_cancelar: Dict[str, ttk.Button] = {}
+        self._cache = CacheResultados(archivo=archivo_por_defecto() if self.CACHE_EN_DISCO else None)
+
         nb = ttk.Notebook(self)
         nb.grid(row=0, column=0, sticky="nsew")
 
@@ -45,6 +93,10 @@ class InformesFrame(ttk.Frame):
         self._build_tab_ingresos_entre(nb)
         self._build_tab_altas_entre(nb)
         self._build_tab_multiples(nb)
+        self._build_tab_readmisiones(nb)
+        self._build_tab_censo(nb)
+        self._build_tab_ocupacion_habitaciones(nb)
+        self._build_tab_estadias(nb)
         self._build_tab_medicos_orden(nb)
 
     # -------------------- helpers --------------------
@@ -74,6 +126,152 @@ class InformesFrame(ttk.Frame):
             self._cama_hab_cache[cama_id] = c.habitacion_id if c else -1
         return self._cama_hab_cache[cama_id]
 
+    # -------------------- búsquedas cancelables --------------------
+    def _boton_cancelar(self, parent: ttk.Frame, informe: str) -> ttk.Button:
+        boton = ttk.Button(parent, text="Cancelar", style="Ghost.TButton", state="disabled",
+                           command=lambda: self._cancelar(informe))
+        self._botones_cancelar[informe] = boton
+        return boton
+
+    def _cancelar(self, informe: str) -> None:
+        cancelacion = self._en_curso.get(informe)
+        if cancelacion is not None:
+            cancelacion.cancelar()
+
+    def _consultar(self, informe: str, consulta: Callable[[], Any], mostrar: Callable[[Any], None],
+                   parametros: tuple = ()) -> None:
+        """
+        Corre `consulta` en un hilo, dentro de un snapshot cancelable con el tiempo límite del informe,
+        y le pasa el resultado a `mostrar` en el hilo de la UI. `consulta` no toca widgets ni modifica
+        lo que devuelve `mostrar` (el resultado queda en el cache bajo (informe, parametros)).
+        Una búsqueda nueva en la misma pestaña cancela la anterior.
+        """
+        self._cancelar(informe)
+        refresco = medidor.iniciar(f"{type(self).__name__}.{informe}")
+        tablas = self.TABLAS_INFORME.get(informe, self.TABLAS_POR_DEFECTO)
+        with medidor.en(refresco), medidor.fase("cache"):
+            acierto, valor = self._cache.buscar(informe, parametros, tablas)
+        if acierto:
+            self._en_curso.pop(informe, None)
+            self._botones_cancelar[informe].configure(state="disabled")
+            with medidor.en(refresco), medidor.fase("mostrar"):
+                mostrar(valor)
+            medidor.terminar(refresco)
+            return
+        cancelacion = Cancelacion(self.LIMITE_SEGUNDOS.get(informe, self.LIMITE_POR_DEFECTO))
+        self._en_curso[informe] = cancelacion
+        self._botones_cancelar[informe].configure(state="normal")
+        resultado: dict = {}
+
+        def tarea() -> None:
+            try:
+                with medidor.en(refresco), medidor.fase("consulta"), Database.snapshot(cancelacion):
+                    resultado["valor"] = self._cache.resolver(informe, parametros, tablas, consulta)
+            except Exception as e:
+                resultado["error"] = e
+
+        hilo = threading.Thread(target=tarea, daemon=True)
+        hilo.start()
+        self._esperar_consulta(informe, cancelacion, hilo, resultado, mostrar, refresco)
+
+    def _esperar_consulta(self, informe: str, cancelacion: Cancelacion, hilo: threading.Thread,
+                          resultado: dict, mostrar: Callable[[Any], None], refresco: Optional[Refresco] = None) -> None:
+        if hilo.is_alive():
+            self.after(50, self._esperar_consulta, informe, cancelacion, hilo, resultado, mostrar, refresco)
+            return
+        if self._en_curso.get(informe) is not cancelacion:
+            return  # la reemplazó una búsqueda más nueva
+        del self._en_curso[informe]
+        self._botones_cancelar[informe].configure(state="disabled")
+        error = resultado.get("error")
+        if isinstance(error, ConsultaCancelada) and not cancelacion.vencida:
+            return  # la canceló el usuario
+        if error is not None:
+            self._show_error(error)
+            return
+        with medidor.en(refresco), medidor.fase("mostrar"):
+            mostrar(resultado["valor"])
+        medidor.terminar(refresco)
+
+    @staticmethod
+    def _mostrar_en(tabla: SimpleTable) -> Callable[[list[tuple]], None]:
+        """`mostrar` para filas ya armadas en el hilo de la consulta: [(iid, valores)]."""
+        return lambda filas: tabla.set_rows(filas, iid_getter=lambda f: f[0], values_getter=lambda f: f[1])
+
+    # -------------------- instantáneas --------------------
+    @staticmethod
+    def _desde_instantanea(informe: str, desde: datetime, hasta: datetime, en_vivo: Callable[[], list],
+                           convertir: Callable[[tuple], Any] = lambda fila: fila) -> tuple[list, Optional[datetime]]:
+        """(filas, cuándo se calculó) de la instantánea del período, o (en_vivo(), None) si no hay."""
+        instantanea = instantaneas.leer(informe, desde, hasta)
+        if instantanea is None:
+            return en_vivo(), None
+        return [convertir(fila) for fila in instantanea.filas], instantanea.calculado
+
+    def _mostrar_con_origen(self, tabla: SimpleTable, etiqueta: ttk.Label) -> Callable[[tuple], None]:
+        """`mostrar` para (filas armadas, cuándo se calculó la instantánea o None si es en vivo)."""
+        mostrar = self._mostrar_en(tabla)
+
+        def mostrar_con_origen(resultado: tuple[list[tuple], Optional[datetime]]) -> None:
+            filas, calculado = resultado
+            mostrar(filas)
+            etiqueta.configure(text="Consulta en vivo." if calculado is None else
+                               f"Instantánea calculada el {dateformat.to_ui_datetime(calculado)}.")
+        return mostrar_con_origen
+
+    # -------------------- exportación --------------------
+    def _exportar(self, informe: str, *args) -> None:
+        """Pide destino y exporta el informe en segundo plano (conexión propia, sin bloquear la UI)."""
+        destino = filedialog.asksaveasfilename(
+            parent=self,
+            title="Exportar informe",
+            initialfile=f"{informe}.csv",
+            defaultextension=".csv",
+            filetypes=(
+                ("CSV", "*.csv"), ("CSV comprimido", "*.csv.gz"),
+                ("NDJSON", "*.ndjson"), ("NDJSON comprimido", "*.ndjson.gz"),
+            ),
+        )
+        if not destino:
+            return
+        formato, comprimir = exportar.formato_desde_archivo(destino)
+        resultado: dict = {}
+
+        def tarea() -> None:
+            try:
+                resultado["filas"] = exportar.exportar_informe(
+                    informe, destino, *args, formato=formato, comprimir=comprimir, formato_fecha="ui"
+                )
+            except Exception as e:
+                resultado["error"] = e
+
+        hilo = threading.Thread(target=tarea, daemon=True)
+        hilo.start()
+        self._esperar_exportacion(hilo, resultado, destino)
+
+    def _esperar_exportacion(self, hilo: threading.Thread, resultado: dict, destino: str) -> None:
+        if hilo.is_alive():
+            self.after(150, self._esperar_exportacion, hilo, resultado, destino)
+            return
+        if "error" in resultado:
+            self._show_error(resultado["error"])
+        else:
+            messagebox.showinfo("OK", f"{resultado['filas']} filas exportadas a {destino}.")
+
+    def _exportar_entre(self, informe: str, desde: ttk.Entry, hasta: ttk.Entry) -> None:
+        try:
+            fecha_desde = self._parse_fecha(desde.get())
+            fecha_hasta = self._parse_fecha(hasta.get())
+        except Exception as e:
+            self._show_error(e)
+            return
+        self._exportar(informe, fecha_desde, fecha_hasta)
+
+    def _exportar_ingresos_medico(self) -> None:
+        if not self.cmb_med.get():
+            return
+        self._exportar("ingresados_por_medico", self._map_med_label_to_id[self.cmb_med.get()])
+
     # ==================== Camas ocupadas hoy ====================
     def _build_tab_camas_ocupadas(self, nb: ttk.Notebook) -> None:
         tab = ttk.Frame(nb, padding=8, style="Card.TFrame")
@@ -82,7 +280,7 @@ class InformesFrame(ttk.Frame):
 
         header = ttk.Frame(tab, style="Card.TFrame")
         header.grid(row=0, column=0, sticky="ew", pady=(0, 6))
-        for c in range(3):
+        for c in range(4):
             header.columnconfigure(c, weight=1, uniform="hdr")
 
         # 2) Labels centrados en su columna (sticky='ew' + anchor='center')
@@ -100,6 +298,13 @@ class InformesFrame(ttk.Frame):
             command=self._refresh_camas_header
         ).grid(row=0, column=2)  # sin sticky => queda centrado
 
+        ttk.Button(
+            header,
+            text="Exportar",
+            style="Ghost.TButton",
+            command=lambda: self._exportar("camas_ocupadas")
+        ).grid(row=0, column=3)
+
         cols = [
             {"id": "paciente", "title": "Paciente", "width": 220, "stretch": True, "anchor": "w"},
             {"id": "medico", "title": "Médico", "width": 200, "stretch": True, "anchor": "w"},
@@ -116,10 +321,13 @@ class InformesFrame(ttk.Frame):
         # 4) Cargar ambos contadores al iniciar la pestaña
         self._refresh_camas_header()
 
+    @_en_snapshot
     def _refresh_camas_header(self) -> None:
         self._load_camas_ocupadas()
         self._load_total()
 
+    @medido()
+    @_en_snapshot
     def _load_camas_ocupadas(self) -> None:
         filas = MovimientoManager.detalle_camas_ocupadas()
         self.lbl_camas_count.configure(text=f"Camas ocupadas: {len(filas)}")
@@ -152,6 +360,9 @@ class InformesFrame(ttk.Frame):
         self.cmb_med.grid(row=0, column=1, sticky="ew")
         ttk.Button(top, text="Buscar", style="Accent.TButton", command=self._buscar_ingresos_medico)\
             .grid(row=0, column=2, padx=(8,0))
+        self._boton_cancelar(top, "ingresados_por_medico").grid(row=0, column=3, padx=(8,0))
+        ttk.Button(top, text="Exportar", style="Ghost.TButton", command=self._exportar_ingresos_medico)\
+            .grid(row=0, column=4, padx=(8,0))
 
         cols = [
             {"id": "paciente","title":"Paciente","width":220,"stretch":True,"anchor":"w"},
@@ -167,6 +378,7 @@ class InformesFrame(ttk.Frame):
         nb.add(tab, text="Ingresos por médico")
         self._load_medicos_combo()
 
+    @_en_snapshot
     def _load_medicos_combo(self) -> None:
         self._map_med_label_to_id.clear()
         labels = []
@@ -182,7 +394,6 @@ class InformesFrame(ttk.Frame):
         if not self.cmb_med.get():
             return
         medico_id = self._map_med_label_to_id[self.cmb_med.get()]
-        movimientos = MovimientoManager.ingresados_por_medico(medico_id)
 
         from dao.objetos import Movimiento
         def get_row_values(movimiento: Movimiento) -> tuple[str, int, int, str, str, int]:
@@ -198,7 +409,12 @@ class InformesFrame(ttk.Frame):
                 movimiento.id
             )
 
-        self.tbl_ing_med.set_rows(movimientos, iid_getter=lambda movimiento: movimiento.id, values_getter=get_row_values)
+        self._consultar(
+            "ingresados_por_medico",
+            lambda: [(m.id, get_row_values(m)) for m in MovimientoManager.ingresados_por_medico(medico_id)],
+            self._mostrar_en(self.tbl_ing_med),
+            (medico_id,),
+        )
 
     # ==================== Ingresados entre fechas ====================
     def _build_tab_ingresos_entre(self, nb: ttk.Notebook) -> None:
@@ -222,6 +438,10 @@ class InformesFrame(ttk.Frame):
 
         ttk.Button(top, text="Buscar", style="Accent.TButton", command=self._buscar_ingresos_entre)\
             .grid(row=0, column=4, padx=(8,0))
+        self._boton_cancelar(top, "ingresados_entre").grid(row=0, column=5, padx=(8,0))
+        ttk.Button(top, text="Exportar", style="Ghost.TButton",
+                   command=lambda: self._exportar_entre("ingresados_entre", self.desde_entry, self.hasta_entry))\
+            .grid(row=0, column=6, padx=(8,0))
 
         cols = [
             {"id":"paciente","title":"Paciente","width":220,"stretch":True,"anchor":"w"},
@@ -233,6 +453,8 @@ class InformesFrame(ttk.Frame):
         ]
         self.tbl_ing_entre = SimpleTable(tab, columns=cols)
         self.tbl_ing_entre.grid(row=1, column=0, columnspan=2, sticky="nsew")
+        self.lbl_ing_entre_origen = ttk.Label(tab, text="", anchor="w")
+        self.lbl_ing_entre_origen.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(6,0))
 
         nb.add(tab, text="Ingresos entre fechas")
 
@@ -243,7 +465,6 @@ class InformesFrame(ttk.Frame):
         except Exception as e:
             self._show_error(e)
             return
-        movimientos = MovimientoManager.ingresados_entre(fecha_desde, fecha_hasta)
 
         from dao.objetos import Movimiento
         def get_row_values(movimiento: Movimiento) -> tuple[str, str, int | str, int, str, int]:
@@ -260,7 +481,16 @@ class InformesFrame(ttk.Frame):
                 movimiento.id
             )
 
-        self.tbl_ing_entre.set_rows(movimientos, iid_getter=lambda movimiento: movimiento.id, values_getter=get_row_values)
+        def consulta() -> tuple[list[tuple], Optional[datetime]]:
+            movimientos, calculado = self._desde_instantanea(
+                "ingresados_entre", fecha_desde, fecha_hasta,
+                lambda: MovimientoManager.ingresados_entre(fecha_desde, fecha_hasta),
+                MovimientoManager._crear_desde_fila,
+            )
+            return [(m.id, get_row_values(m)) for m in movimientos], calculado
+        self._consultar("ingresados_entre", consulta,
+                        self._mostrar_con_origen(self.tbl_ing_entre, self.lbl_ing_entre_origen),
+                        (fecha_desde, fecha_hasta))
 
     # ==================== Altas entre fechas ====================
     def _build_tab_altas_entre(self, nb: ttk.Notebook) -> None:
@@ -284,6 +514,10 @@ class InformesFrame(ttk.Frame):
 
         ttk.Button(top, text="Buscar", style="Accent.TButton", command=self._buscar_altas_entre)\
             .grid(row=0, column=4, padx=(8,0))
+        self._boton_cancelar(top, "altas_entre").grid(row=0, column=5, padx=(8,0))
+        ttk.Button(top, text="Exportar", style="Ghost.TButton",
+                   command=lambda: self._exportar_entre("altas_entre", self.alt_desde_entry, self.alt_hasta_entry))\
+            .grid(row=0, column=6, padx=(8,0))
 
         cols = [
             {"id":"paciente","title":"Paciente","width":220,"stretch":True,"anchor":"w"},
@@ -296,6 +530,8 @@ class InformesFrame(ttk.Frame):
         ]
         self.tbl_alt_entre = SimpleTable(tab, columns=cols)
         self.tbl_alt_entre.grid(row=1, column=0, columnspan=2, sticky="nsew")
+        self.lbl_alt_entre_origen = ttk.Label(tab, text="", anchor="w")
+        self.lbl_alt_entre_origen.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(6,0))
 
         nb.add(tab, text="Altas entre fechas")
 
@@ -306,7 +542,6 @@ class InformesFrame(ttk.Frame):
         except Exception as e:
             self._show_error(e)
             return
-        movimientos = MovimientoManager.altas_entre(fecha_desde, fecha_hasta)
 
         from dao.objetos import Movimiento
         def get_row_values(movimiento: Movimiento) -> tuple[str, str, int | str, int, str, str, int]:
@@ -323,7 +558,16 @@ class InformesFrame(ttk.Frame):
                 dateformat.to_ui_datetime(movimiento.fecha_egreso),
                 movimiento.id
             )
-        self.tbl_alt_entre.set_rows(movimientos, iid_getter=lambda movimiento: movimiento.id, values_getter=get_row_values)
+        def consulta() -> tuple[list[tuple], Optional[datetime]]:
+            movimientos, calculado = self._desde_instantanea(
+                "altas_entre", fecha_desde, fecha_hasta,
+                lambda: MovimientoManager.altas_entre(fecha_desde, fecha_hasta),
+                MovimientoManager._crear_desde_fila,
+            )
+            return [(m.id, get_row_values(m)) for m in movimientos], calculado
+        self._consultar("altas_entre", consulta,
+                        self._mostrar_con_origen(self.tbl_alt_entre, self.lbl_alt_entre_origen),
+                        (fecha_desde, fecha_hasta))
 
     # ==================== Pacientes con múltiples ingresos ====================
     def _build_tab_multiples(self, nb: ttk.Notebook) -> None:
@@ -335,6 +579,9 @@ class InformesFrame(ttk.Frame):
         top.grid(row=0, column=0, sticky="ew", pady=(0,6))
         ttk.Button(top, text="Refrescar", style="Ghost.TButton", command=self._load_multiples)\
             .grid(row=0, column=0, sticky="w")
+        self._boton_cancelar(top, "multiples_ingresos").grid(row=0, column=1, sticky="w", padx=(8,0))
+        ttk.Button(top, text="Exportar", style="Ghost.TButton", command=lambda: self._exportar("multiples_ingresos"))\
+            .grid(row=0, column=2, sticky="w", padx=(8,0))
 
         cols = [
             {"id":"paciente","title":"Paciente","width":260,"stretch":True,"anchor":"w"},
@@ -342,23 +589,321 @@ class InformesFrame(ttk.Frame):
         ]
         self.tbl_mult = SimpleTable(tab, columns=cols)
         self.tbl_mult.grid(row=1, column=0, sticky="nsew")
+        self.lbl_mult_origen = ttk.Label(tab, text="", anchor="w")
+        self.lbl_mult_origen.grid(row=2, column=0, sticky="ew", pady=(6,0))
 
         nb.add(tab, text="Múltiples ingresos")
-        self._load_multiples()
-
-    def _load_multiples(self) -> None:
-        multiples_ingresos = MovimientoManager.pacientes_con_multiples_ingresos() 
-        filas: list[dict[str, int | str]] = []
-        for paciente_id, cantidad in multiples_ingresos:
-            filas.append({"paciente": self._paciente_nombre(paciente_id), "cantidad": cantidad, "iid": paciente_id})
-        self.tbl_mult.set_rows(
-            filas,
-            iid_getter=lambda fila: fila["iid"],
-            values_getter=lambda fila: (fila["paciente"], fila["cantidad"])
+        self._load_multiples(instantanea_del_dia=True)
+
+    def _load_multiples(self, instantanea_del_dia: bool = False) -> None:
+        """Al abrir, la instantánea calculada hoy si la hay; "Refrescar" consulta siempre en vivo."""
+        def consulta() -> tuple[list[tuple], Optional[datetime]]:
+            instantanea = instantaneas.ultima("multiples_ingresos") if instantanea_del_dia else None
+            if instantanea is not None and instantanea.calculado.date() == date.today():
+                filas, calculado = instantanea.filas, instantanea.calculado
+            else:
+                filas, calculado = MovimientoManager.pacientes_con_multiples_ingresos(), None
+            return [(pid, (self._paciente_nombre(pid), cantidad)) for pid, cantidad in filas], calculado
+        self._consultar("multiples_ingresos", consulta, self._mostrar_con_origen(self.tbl_mult, self.lbl_mult_origen),
+                        (instantanea_del_dia, date.today()))
+
+    # ==================== Censo y ocupación ====================
+    def _build_tab_censo(self, nb: ttk.Notebook) -> None:
+        tab = ttk.Frame(nb, padding=8, style="Card.TFrame")
+        tab.columnconfigure(0, weight=1)
+        tab.rowconfigure(1, weight=1)
+
+        top = ttk.Frame(tab, style="Card.TFrame")
+        top.grid(row=0, column=0, sticky="ew", pady=(0,6))
+        for c in (1,3): top.columnconfigure(c, weight=1)
+
+        ttk.Label(top, text="Desde").grid(row=0, column=0, sticky="w", padx=(4,8))
+        self.censo_desde_entry = ttk.Entry(top)
+        self.censo_desde_entry.grid(row=0, column=1, sticky="ew")
+
+        ttk.Label(top, text="Hasta").grid(row=0, column=2, sticky="w", padx=(8,8))
+        self.censo_hasta_entry = ttk.Entry(top)
+        self.censo_hasta_entry.grid(row=0, column=3, sticky="ew")
+
+        self._censo_por_hora = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top, text="Por hora", variable=self._censo_por_hora).grid(row=0, column=4, padx=(8,0))
+        self._censo_solo_total = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top, text="Solo totales", variable=self._censo_solo_total).grid(row=0, column=5, padx=(8,0))
+
+        ttk.Button(top, text="Calcular", style="Accent.TButton", command=self._buscar_censo)\
+            .grid(row=0, column=6, padx=(8,0))
+        self._boton_cancelar(top, "censo").grid(row=0, column=7, padx=(8,0))
+
+        cols = [
+            {"id":"inicio","title":"Desde","width":150,"stretch":False,"anchor":"center"},
+            {"id":"tipo","title":"Tipo","width":200,"stretch":True,"anchor":"w"},
+            {"id":"camas","title":"Camas","width":80,"stretch":False,"anchor":"center"},
+            {"id":"censo","title":"Ocupadas (cierre)","width":130,"stretch":False,"anchor":"center"},
+            {"id":"pico","title":"Pico","width":80,"stretch":False,"anchor":"center"},
+            {"id":"promedio","title":"Promedio","width":100,"stretch":False,"anchor":"center"},
+            {"id":"ocupacion","title":"Ocupación %","width":110,"stretch":False,"anchor":"center"},
+        ]
+        self.tbl_censo = SimpleTable(tab, columns=cols)
+        self.tbl_censo.grid(row=1, column=0, sticky="nsew")
+
+        nb.add(tab, text="Censo")
+
+    def _buscar_censo(self) -> None:
+        try:
+            fecha_desde = self._parse_fecha(self.censo_desde_entry.get())
+            fecha_hasta = self._parse_fecha(self.censo_hasta_entry.get())
+        except Exception as e:
+            self._show_error(e)
+            return
+        paso = "hora" if self._censo_por_hora.get() else "dia"
+        solo_total = self._censo_solo_total.get()
+
+        def mostrar(filas: list[censo.FilaCenso]) -> None:
+            if solo_total:
+                filas = [f for f in filas if f.tipo == censo.TOTAL]
+            self.tbl_censo.set_rows(
+                filas,
+                iid_getter=lambda f: f"{f.inicio.isoformat()}|{f.tipo}",
+                values_getter=lambda f: (
+                    dateformat.to_ui_datetime(f.inicio), f.tipo, f.camas, f.censo, f.pico,
+                    f"{f.promedio:.1f}", f"{f.ocupacion * 100:.1f}",
+                )
+            )
+        self._consultar("censo", lambda: censo.calcular(fecha_desde, fecha_hasta, paso), mostrar,
+                        (fecha_desde, fecha_hasta, paso))
+
+    # ==================== Ocupación por habitación ====================
+    def _build_tab_ocupacion_habitaciones(self, nb: ttk.Notebook) -> None:
+        tab = ttk.Frame(nb, padding=8, style="Card.TFrame")
+        tab.columnconfigure(0, weight=1)
+        tab.rowconfigure(1, weight=1)
+
+        top = ttk.Frame(tab, style="Card.TFrame")
+        top.grid(row=0, column=0, sticky="ew", pady=(0,6))
+        for c in (1,3): top.columnconfigure(c, weight=1)
+
+        # Por defecto ayer: el período que precalcula la instantánea nocturna.
+        ayer = (date.today() - timedelta(days=1)).strftime(dateformat.UI_DATE_FMT)
+        ttk.Label(top, text="Desde").grid(row=0, column=0, sticky="w", padx=(4,8))
+        self.ocup_desde_entry = ttk.Entry(top)
+        self.ocup_desde_entry.insert(0, ayer)
+        self.ocup_desde_entry.grid(row=0, column=1, sticky="ew")
+
+        ttk.Label(top, text="Hasta").grid(row=0, column=2, sticky="w", padx=(8,8))
+        self.ocup_hasta_entry = ttk.Entry(top)
+        self.ocup_hasta_entry.insert(0, ayer)
+        self.ocup_hasta_entry.grid(row=0, column=3, sticky="ew")
+
+        ttk.Button(top, text="Calcular", style="Accent.TButton", command=self._buscar_ocupacion_habitaciones)\
+            .grid(row=0, column=4, padx=(8,0))
+        self._boton_cancelar(top, "ocupacion_por_habitacion").grid(row=0, column=5, padx=(8,0))
+        ttk.Button(top, text="Exportar", style="Ghost.TButton",
+                   command=lambda: self._exportar_entre("ocupacion_por_habitacion", self.ocup_desde_entry, self.ocup_hasta_entry))\
+            .grid(row=0, column=6, padx=(8,0))
+
+        cols = [
+            {"id":"numero","title":"Habitación","width":110,"stretch":False,"anchor":"center"},
+            {"id":"tipo","title":"Tipo","width":200,"stretch":True,"anchor":"w"},
+            {"id":"camas","title":"Camas","width":80,"stretch":False,"anchor":"center"},
+            {"id":"estadias","title":"Estadías","width":90,"stretch":False,"anchor":"center"},
+            {"id":"promedio","title":"Ocupadas (prom.)","width":130,"stretch":False,"anchor":"center"},
+            {"id":"ocupacion","title":"Ocupación %","width":110,"stretch":False,"anchor":"center"},
+        ]
+        self.tbl_ocup_hab = SimpleTable(tab, columns=cols)
+        self.tbl_ocup_hab.grid(row=1, column=0, sticky="nsew")
+        self.lbl_ocup_hab_origen = ttk.Label(tab, text="", anchor="w")
+        self.lbl_ocup_hab_origen.grid(row=2, column=0, sticky="ew", pady=(6,0))
+
+        nb.add(tab, text="Ocupación por habitación")
+
+    def _buscar_ocupacion_habitaciones(self) -> None:
+        try:
+            fecha_desde = self._parse_fecha(self.ocup_desde_entry.get())
+            fecha_hasta = self._parse_fecha(self.ocup_hasta_entry.get())
+        except Exception as e:
+            self._show_error(e)
+            return
+
+        def consulta() -> tuple[list[tuple], Optional[datetime]]:
+            filas, calculado = self._desde_instantanea(
+                "ocupacion_por_habitacion", fecha_desde, fecha_hasta,
+                lambda: censo.ocupacion_por_habitacion(fecha_desde, fecha_hasta),
+            )
+            return [
+                (hid, (numero, tipo, camas, estadias_, f"{promedio:.2f}",
+                       f"{ocupacion * 100:.1f}" if ocupacion is not None else "-"))
+                for hid, numero, tipo, camas, estadias_, promedio, ocupacion in filas
+            ], calculado
+        self._consultar("ocupacion_por_habitacion", consulta,
+                        self._mostrar_con_origen(self.tbl_ocup_hab, self.lbl_ocup_hab_origen),
+                        (fecha_desde, fecha_hasta))
+
+    # ==================== Duración de estadías ====================
+    def _build_tab_estadias(self, nb: ttk.Notebook) -> None:
+        tab = ttk.Frame(nb, padding=8, style="Card.TFrame")
+        tab.columnconfigure(0, weight=1)
+        tab.rowconfigure(1, weight=1)
+
+        top = ttk.Frame(tab, style="Card.TFrame")
+        top.grid(row=0, column=0, sticky="ew", pady=(0,6))
+        for c in (1,3): top.columnconfigure(c, weight=1)
+
+        ttk.Label(top, text="Altas desde").grid(row=0, column=0, sticky="w", padx=(4,8))
+        self.est_desde_entry = ttk.Entry(top)
+        self.est_desde_entry.grid(row=0, column=1, sticky="ew")
+
+        ttk.Label(top, text="Hasta").grid(row=0, column=2, sticky="w", padx=(8,8))
+        self.est_hasta_entry = ttk.Entry(top)
+        self.est_hasta_entry.grid(row=0, column=3, sticky="ew")
+
+        self._est_dimension = tk.StringVar(value="tipo")
+        for i, (label, val) in enumerate((("Médico","medico"), ("Tipo","tipo"), ("Mes","mes"))):
+            ttk.Radiobutton(top, text=label, value=val, variable=self._est_dimension)\
+                .grid(row=0, column=4 + i, padx=(8,0))
+
+        ttk.Button(top, text="Calcular", style="Accent.TButton", command=self._buscar_estadias)\
+            .grid(row=0, column=7, padx=(8,0))
+        self._boton_cancelar(top, "estadias").grid(row=0, column=8, padx=(8,0))
+
+        cols = [
+            {"id":"grupo","title":"Grupo","width":220,"stretch":True,"anchor":"w"},
+            {"id":"altas","title":"Altas","width":90,"stretch":False,"anchor":"center"},
+            {"id":"promedio","title":"Promedio (d)","width":110,"stretch":False,"anchor":"center"},
+            {"id":"p50","title":"P50","width":80,"stretch":False,"anchor":"center"},
+            {"id":"p90","title":"P90","width":80,"stretch":False,"anchor":"center"},
+            {"id":"p99","title":"P99","width":80,"stretch":False,"anchor":"center"},
+            {"id":"maximo","title":"Máx.","width":80,"stretch":False,"anchor":"center"},
+        ]
+        self.tbl_estadias = SimpleTable(tab, columns=cols)
+        self.tbl_estadias.grid(row=1, column=0, sticky="nsew")
+
+        self.lbl_est_histograma = ttk.Label(tab, text="", anchor="w")
+        self.lbl_est_histograma.grid(row=2, column=0, sticky="ew", pady=(6,0))
+
+        nb.add(tab, text="Estadías")
+
+    def _buscar_estadias(self) -> None:
+        # Sin fechas: toda la historia.
+        try:
+            fecha_desde = fecha_hasta = None
+            if self.est_desde_entry.get().strip() or self.est_hasta_entry.get().strip():
+                fecha_desde = self._parse_fecha(self.est_desde_entry.get())
+                fecha_hasta = self._parse_fecha(self.est_hasta_entry.get())
+        except Exception as e:
+            self._show_error(e)
+            return
+        dimension = self._est_dimension.get()
+
+        def consulta() -> tuple[list[estadias.FilaEstadia], list[int]]:
+            # Modo columnar (dao.columnar): mismos sketches que estadias.analizar, sin un objeto por fila.
+            sketches = estadias.analizar_columnas(fecha_desde, fecha_hasta)
+            filas = estadias.filas(sketches[dimension], dimension) + estadias.filas(sketches["total"], "total")
+            return filas, sketches["total"][""].histograma()
+
+        def mostrar(resultado: tuple[list[estadias.FilaEstadia], list[int]]) -> None:
+            filas, conteos = resultado
+            self.tbl_estadias.set_rows(
+                filas,
+                iid_getter=lambda f: f"{dimension}|{f.clave}",
+                values_getter=lambda f: (
+                    f.etiqueta, f.altas, f"{f.promedio:.2f}", f"{f.p50:.2f}", f"{f.p90:.2f}", f"{f.p99:.2f}", f"{f.maximo:.2f}",
+                )
+            )
+            self.lbl_est_histograma.configure(text="Histograma:  " + "   ".join(
+                f"{etiqueta}: {c}" for etiqueta, c in zip(estadias.etiquetas_histograma(), conteos)))
+        self._consultar("estadias", consulta, mostrar, (fecha_desde, fecha_hasta, dimension))
+
+    # ==================== Reingresos ====================
+    READMISIONES_POR_PAGINA = 200
+
+    def _build_tab_readmisiones(self, nb: ttk.Notebook) -> None:
+        tab = ttk.Frame(nb, padding=8, style="Card.TFrame")
+        tab.columnconfigure(0, weight=1)
+        tab.rowconfigure(1, weight=1)
+
+        top = ttk.Frame(tab, style="Card.TFrame")
+        top.grid(row=0, column=0, sticky="ew", pady=(0,6))
+
+        ttk.Label(top, text="Días desde el alta").grid(row=0, column=0, sticky="w", padx=(4,8))
+        self.readm_dias_entry = ttk.Entry(top, width=6)
+        self.readm_dias_entry.insert(0, "30")
+        self.readm_dias_entry.grid(row=0, column=1, sticky="w")
+
+        ttk.Button(top, text="Buscar", style="Accent.TButton", command=self._buscar_readmisiones)\
+            .grid(row=0, column=2, padx=(8,0))
+        self.btn_readm_mas = ttk.Button(top, text="Más", style="Ghost.TButton", state="disabled",
+                                        command=self._mas_readmisiones)
+        self.btn_readm_mas.grid(row=0, column=3, padx=(8,0))
+        self._boton_cancelar(top, "readmisiones").grid(row=0, column=4, padx=(8,0))
+        ttk.Button(top, text="Exportar", style="Ghost.TButton", command=self._exportar_readmisiones)\
+            .grid(row=0, column=5, padx=(8,0))
+        self.lbl_readm_count = ttk.Label(top, text="")
+        self.lbl_readm_count.grid(row=0, column=6, padx=(12,0))
+
+        cols = [
+            {"id":"paciente","title":"Paciente","width":220,"stretch":True,"anchor":"w"},
+            {"id":"alta_anterior","title":"Alta anterior","width":160,"stretch":False,"anchor":"center"},
+            {"id":"ingreso","title":"Reingreso","width":160,"stretch":False,"anchor":"center"},
+            {"id":"dias","title":"Días","width":80,"stretch":False,"anchor":"center"},
+            {"id":"cama","title":"Cama","width":80,"stretch":False,"anchor":"center"},
+            {"id":"mid","title":"ID Mov.","width":90,"stretch":False,"anchor":"center"},
+        ]
+        self.tbl_readm = SimpleTable(tab, columns=cols)
+        self.tbl_readm.grid(row=1, column=0, sticky="nsew")
+        self._readm_filas: list[dict] = []
+        self._readm_dias = 30
+
+        nb.add(tab, text="Reingresos")
+
+    def _buscar_readmisiones(self) -> None:
+        try:
+            self._readm_dias = int(self.readm_dias_entry.get())
+        except ValueError:
+            self._show_error(ValueError("Ingrese una cantidad de días válida."))
+            return
+        self._readm_filas = []
+        self._mas_readmisiones()
+
+    def _mas_readmisiones(self) -> None:
+        despues_de = self._readm_filas[-1]["clave_pagina"] if self._readm_filas else None
+        dias = self._readm_dias
+
+        def consulta() -> list[dict]:
+            pagina = MovimientoManager.readmisiones(dias, self.READMISIONES_POR_PAGINA, despues_de)
+            return [dict(d, paciente=self._paciente_nombre(d["paciente_id"])) for d in pagina]
+        self._consultar("readmisiones", consulta, self._mostrar_readmisiones,
+                        (dias, self.READMISIONES_POR_PAGINA, despues_de))
+
+    def _mostrar_readmisiones(self, pagina: list[dict]) -> None:
+        self._readm_filas.extend(pagina)
+        hay_mas = len(pagina) == self.READMISIONES_POR_PAGINA
+        self.btn_readm_mas.configure(state="normal" if hay_mas else "disabled")
+        self.lbl_readm_count.configure(text=f"{len(self._readm_filas)} reingresos{' (hay más)' if hay_mas else ''}")
+        self.tbl_readm.set_rows(
+            self._readm_filas,
+            iid_getter=lambda d: d["movimiento_id"],
+            values_getter=lambda d: (
+                d["paciente"],
+                dateformat.to_ui_datetime(d["egreso_anterior"]),
+                dateformat.to_ui_datetime(d["fecha_ingreso"]),
+                f"{d['dias_desde_alta']:.1f}",
+                d["cama_id"],
+                d["movimiento_id"],
+            )
         )
 
+    def _exportar_readmisiones(self) -> None:
+        try:
+            dias = int(self.readm_dias_entry.get())
+        except ValueError:
+            self._show_error(ValueError("Ingrese una cantidad de días válida."))
+            return
+        self._exportar("readmisiones", dias)
+
     # ==================== Total internados hoy ====================
 
+    @medido()
+    @_en_snapshot
     def _load_total(self) -> None:
         n = MovimientoManager.total_internados_hoy()
         self.lbl_total.configure(text=f"Internados hoy: {n}")
@@ -378,6 +923,9 @@ class InformesFrame(ttk.Frame):
 
         ttk.Button(top, text="Ordenar", style="Accent.TButton", command=self._load_medicos_orden)\
             .grid(row=0, column=3, padx=(12,0))
+        ttk.Button(top, text="Exportar", style="Ghost.TButton",
+                   command=lambda: self._exportar("medicos_ordenados", self._orden_var.get()))\
+            .grid(row=0, column=4, padx=(8,0))
 
         cols = [
             {"id":"id","title":"ID","width":80,"stretch":False,"anchor":"center"},
@@ -391,6 +939,8 @@ class InformesFrame(ttk.Frame):
         nb.add(tab, text="Médicos ordenados")
         self._load_medicos_orden()
 
+    @medido()
+    @_en_snapshot
     def _load_medicos_orden(self) -> None:
         criterio = self._orden_var.get()
         medicos = MedicoManager.listar_ordenado(criterio)
@@ -401,12 +951,8 @@ class InformesFrame(ttk.Frame):
         )
 
     # -------------------- integración externa --------------------
-    def refrescar(self) -> None:
-        """Llamada desde el Notebook principal al cambiar a esta pestaña."""
-        # Se refrescan informes rápidos
-        self._load_camas_ocupadas()
-        self._load_total()
-    # -------------------- integración externa --------------------
+    @medido()
+    @_en_snapshot
     def refrescar(self) -> None:
         """Llamada desde el Notebook principal al cambiar a esta pestaña."""
         # Se refrescan informes rápidos
@@ -6,6 +6,7 @@ from typing import Dict, List
 
 from dao.managers import PacienteManager, MedicoManager, CamaManager, MovimientoManager
 from tk_src import dateformat
+from tk_src.perf import medido, medidor
 
 class IngresosFrame(ttk.Frame):
     """
@@ -89,9 +90,11 @@ class IngresosFrame(ttk.Frame):
         self._actualizar_estado_registrar()
 
     # ----------------- API pública -----------------
+    @medido()
     def refrescar(self) -> None:
         """Recarga combos y grilla al volver a la pestaña."""
-        self._cargar_combos()
+        with medidor.fase("combos"):
+            self._cargar_combos()
         self._cargar_internaciones()
         self._actualizar_estado_registrar()
 
@@ -169,19 +172,25 @@ class IngresosFrame(ttk.Frame):
             self.btn_reg.state(["disabled"])
 
     def _cargar_internaciones(self) -> None:
-        self.tree.delete(*self.tree.get_children())
-        filas = MovimientoManager.detalle_camas_ocupadas()
-        for i, d in enumerate(filas):
-            paciente = d.get("paciente", "-") if isinstance(d, dict) else d[1]
-            medico   = d.get("medico", "-") if isinstance(d, dict) else "-"
-            habitac  = d.get("habitacion_numero", "-") if isinstance(d, dict) else d[3]
-            cama_id  = d.get("cama_id", "-") if isinstance(d, dict) else d[2]
-            fecha    = d.get("fecha_ingreso", "-") if isinstance(d, dict) else "-"
-            # >>> formatear a UI si viene datetime/iso <<<
-            fecha_ui = dateformat.to_ui_datetime(fecha) if fecha != "-" else "-"
-            mov_id   = d.get("movimiento_id", "-") if isinstance(d, dict) else d[0]
-            tags = ("alt",) if i % 2 else ()
-            self.tree.insert("", "end", values=(paciente, medico, habitac, cama_id, fecha_ui, mov_id), tags=tags)
+        with medidor.fase("modelo"):
+            filas = MovimientoManager.detalle_camas_ocupadas()
+        with medidor.fase("filas"):
+            valores = []
+            for d in filas:
+                paciente = d.get("paciente", "-") if isinstance(d, dict) else d[1]
+                medico   = d.get("medico", "-") if isinstance(d, dict) else "-"
+                habitac  = d.get("habitacion_numero", "-") if isinstance(d, dict) else d[3]
+                cama_id  = d.get("cama_id", "-") if isinstance(d, dict) else d[2]
+                fecha    = d.get("fecha_ingreso", "-") if isinstance(d, dict) else "-"
+                # >>> formatear a UI si viene datetime/iso <<<
+                fecha_ui = dateformat.to_ui_datetime(fecha) if fecha != "-" else "-"
+                mov_id   = d.get("movimiento_id", "-") if isinstance(d, dict) else d[0]
+                valores.append((paciente, medico, habitac, cama_id, fecha_ui, mov_id))
+        with medidor.fase("treeview"):
+            self.tree.delete(*self.tree.get_children())
+            for i, vals in enumerate(valores):
+                tags = ("alt",) if i % 2 else ()
+                self.tree.insert("", "end", values=vals, tags=tags)
 
     # ----------------- Acciones -----------------
     def _registrar(self) -> None:
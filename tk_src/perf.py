@@ -0,0 +1,345 @@
+# perf.py
+"""
+Instrumentación de los refrescos de la UI: cuánto de cada recarga se va en SQL, en armar los
+objetos y las filas, y en insertar en el Treeview.
+
+Un refresco (BaseABMFrame.refrescar_lista, IngresosFrame.refrescar, una búsqueda de Informes...)
+se divide en fases con nombre ("modelo", "filas", "treeview", "consulta", "mostrar"...). De cada
+fase se toma el tiempo exclusivo (sin sus fases anidadas) y el tiempo de SQLite que corrió dentro
+se separa en la fase "sql": lo mide dao.instrumentacion, que se activa junto con esta. Lo que no
+cae en ninguna fase queda como "resto" (en Informes incluye la espera hasta que la UI levanta el
+resultado del hilo de la consulta).
+
+Se guardan las últimas MAX_MUESTRAS corridas de cada refresco para estadísticas móviles
+(p50/p90/máx) y los últimos MAX_TRAZA refrescos para exportarlos como traza en formato Chrome
+Trace Event (se abre en chrome://tracing o en Perfetto). La BarraRendimiento muestra el desglose
+del último refresco.
+
+Apagada (default), cada punto de medición cuesta un if.
+
+Configuración por variables de entorno (leídas al importar):
+    NOSOCOMIO_UI_PERF=1              activa la instrumentación y la barra de rendimiento
+    NOSOCOMIO_UI_PERF_TRAZA=ruta     exporta la traza al salir
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import tkinter as tk
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import wraps
+from time import perf_counter
+from tkinter import ttk, filedialog, messagebox
+from typing import Iterator
+
+from dao.instrumentacion import instrumentacion
+
+MAX_MUESTRAS = 100
+MAX_TRAZA = 2000
+RESTO = "resto"
+SQL = "sql"
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p
+    i = int(k)
+    j = min(i + 1, len(ordenados) - 1)
+    return ordenados[i] + (ordenados[j] - ordenados[i]) * (k - i)
+
+
+@dataclass
+class Fase:
+    nombre: str
+    inicio: float
+    duracion: float = 0.0
+    sql: float = 0.0
+    anidadas: float = 0.0  # duración de las fases abiertas dentro de esta
+    anidada: bool = False
+    hilo: int = 0
+
+    @property
+    def exclusiva(self) -> float:
+        return max(self.duracion - self.sql - self.anidadas, 0.0)
+
+
+@dataclass
+class Refresco:
+    nombre: str
+    inicio: float
+    duracion: float = 0.0
+    fases: list[Fase] = field(default_factory=list)
+    hilo: int = 0
+    sql_fuera: float = 0.0  # SQL del hilo que inició el refresco, fuera de toda fase
+
+    def desglose(self) -> dict[str, float]:
+        """Segundos por fase (exclusivos), más "sql" y "resto"."""
+        por_fase: dict[str, float] = {}
+        for fase in self.fases:
+            por_fase[fase.nombre] = por_fase.get(fase.nombre, 0.0) + fase.exclusiva
+            if fase.sql:
+                por_fase[SQL] = por_fase.get(SQL, 0.0) + fase.sql
+        if self.sql_fuera:
+            por_fase[SQL] = por_fase.get(SQL, 0.0) + self.sql_fuera
+        # Solo las fases de primer nivel ocupan tiempo del refresco; las anidadas están dentro.
+        medido = sum(f.duracion for f in self.fases if not f.anidada) + self.sql_fuera
+        por_fase[RESTO] = max(self.duracion - medido, 0.0)
+        return por_fase
+
+
+class MedidorUI:
+    def __init__(self):
+        self.activo: bool = False
+        self.ultimo: Refresco | None = None
+        self.version = 0  # sube con cada refresco terminado (la barra lo usa para saber si redibujar)
+        self._historial: dict[str, deque[Refresco]] = {}
+        self._traza: deque[Refresco] = deque(maxlen=MAX_TRAZA)
+        self._origen = perf_counter()
+        self._hilo = threading.local()  # pila de (refresco, fases abiertas) del hilo
+        self._lock = threading.Lock()
+
+    def configurar(self, activo: bool = True, traza_al_salir: str | None = None) -> None:
+        self.activo = activo
+        if activo and not instrumentacion.activa:
+            instrumentacion.configurar()  # para separar el tiempo de SQL de cada fase
+        if traza_al_salir:
+            atexit.register(self.exportar_traza, traza_al_salir)
+
+    def configurar_desde_entorno(self) -> None:
+        if os.environ.get("NOSOCOMIO_UI_PERF", "0") in ("", "0"):
+            return
+        self.configurar(traza_al_salir=os.environ.get("NOSOCOMIO_UI_PERF_TRAZA"))
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._historial.clear()
+            self._traza.clear()
+            self.ultimo = None
+            self.version += 1
+
+    # ---------- registro ----------
+    def _pila(self) -> list:
+        pila = getattr(self._hilo, "pila", None)
+        if pila is None:
+            pila = self._hilo.pila = []
+        return pila
+
+    def iniciar(self, nombre: str) -> Refresco | None:
+        """Refresco que se termina explícitamente (p.ej. una búsqueda que sigue en otro hilo)."""
+        if not self.activo:
+            return None
+        refresco = Refresco(nombre, perf_counter(), hilo=threading.get_ident())
+        refresco.sql_fuera = -instrumentacion.segundos_del_hilo()
+        return refresco
+
+    def terminar(self, refresco: Refresco | None) -> None:
+        if refresco is None:
+            return
+        refresco.duracion = perf_counter() - refresco.inicio
+        if threading.get_ident() == refresco.hilo:
+            refresco.sql_fuera += instrumentacion.segundos_del_hilo()
+            refresco.sql_fuera -= sum(f.sql for f in refresco.fases if f.hilo == refresco.hilo)
+        else:
+            refresco.sql_fuera = 0.0
+        with self._lock:
+            historial = self._historial.get(refresco.nombre)
+            if historial is None:
+                historial = self._historial[refresco.nombre] = deque(maxlen=MAX_MUESTRAS)
+            historial.append(refresco)
+            self._traza.append(refresco)
+            self.ultimo = refresco
+            self.version += 1
+
+    @contextmanager
+    def en(self, refresco: Refresco | None) -> Iterator[None]:
+        """Las fases de este hilo dentro del bloque se anotan en `refresco`."""
+        if refresco is None:
+            yield
+            return
+        pila = self._pila()
+        pila.append((refresco, []))
+        try:
+            yield
+        finally:
+            pila.pop()
+
+    @contextmanager
+    def _refresco(self, nombre: str) -> Iterator[None]:
+        refresco = self.iniciar(nombre)
+        with self.en(refresco):
+            yield
+        self.terminar(refresco)
+
+    def refresco(self, nombre: str):
+        """Mide un refresco completo. Anidado dentro de otro, cuenta como una fase de aquel."""
+        if not self.activo:
+            return nullcontext()
+        if getattr(self._hilo, "pila", None):
+            return self.fase(nombre)
+        return self._refresco(nombre)
+
+    @contextmanager
+    def _fase(self, nombre: str) -> Iterator[None]:
+        refresco, abiertas = self._pila()[-1]
+        fase = Fase(nombre, perf_counter(), anidada=bool(abiertas), hilo=threading.get_ident())
+        sql = instrumentacion.segundos_del_hilo()
+        abiertas.append(fase)
+        try:
+            yield
+        finally:
+            abiertas.pop()
+            fase.duracion = perf_counter() - fase.inicio
+            sql = instrumentacion.segundos_del_hilo() - sql
+            fase.sql += sql  # las anidadas ya descontaron el suyo
+            if abiertas:
+                # el tiempo (y el SQL) de esta fase ya queda en ella: la de afuera no lo vuelve a contar
+                abiertas[-1].anidadas += fase.duracion
+                abiertas[-1].sql -= sql
+            refresco.fases.append(fase)
+
+    def fase(self, nombre: str):
+        """Mide una fase del refresco en curso en este hilo; sin refresco en curso no hace nada."""
+        if not self.activo or not getattr(self._hilo, "pila", None):
+            return nullcontext()
+        return self._fase(nombre)
+
+    # ---------- reportes ----------
+    def estadisticas(self) -> list[tuple[str, int, float, float, float, dict[str, float]]]:
+        """(refresco, corridas, p50, p90, máx, desglose promedio por fase) en segundos, del más lento al más rápido."""
+        with self._lock:
+            historiales = {nombre: list(h) for nombre, h in self._historial.items()}
+        filas = []
+        for nombre, corridas in historiales.items():
+            duraciones = [r.duracion for r in corridas]
+            promedio: dict[str, float] = {}
+            for r in corridas:
+                for fase, segundos in r.desglose().items():
+                    promedio[fase] = promedio.get(fase, 0.0) + segundos / len(corridas)
+            filas.append((nombre, len(corridas), _percentil(duraciones, 0.5), _percentil(duraciones, 0.9),
+                          max(duraciones), promedio))
+        return sorted(filas, key=lambda f: f[2], reverse=True)
+
+    def texto_ultimo(self) -> str:
+        refresco = self.ultimo
+        if refresco is None:
+            return "Sin refrescos medidos todavía."
+        with self._lock:
+            duraciones = [r.duracion for r in self._historial.get(refresco.nombre, ())]
+        fases = "  ".join(f"{fase} {segundos * 1000:.0f}" for fase, segundos in refresco.desglose().items()
+                          if segundos >= 0.0005)
+        return (f"{refresco.nombre}: {refresco.duracion * 1000:.0f} ms = {fases}   "
+                f"(p50 {_percentil(duraciones, 0.5) * 1000:.0f}, p90 {_percentil(duraciones, 0.9) * 1000:.0f} ms, "
+                f"n={len(duraciones)})")
+
+    def exportar_traza(self, destino: str) -> int:
+        """Escribe los últimos refrescos como eventos "X" de Chrome Trace Event. Devuelve cuántos."""
+        with self._lock:
+            refrescos = list(self._traza)
+        pid = os.getpid()
+        eventos = []
+        for r in refrescos:
+            eventos.append({
+                "name": r.nombre, "cat": "refresco", "ph": "X", "pid": pid, "tid": r.hilo,
+                "ts": round((r.inicio - self._origen) * 1e6, 1), "dur": round(r.duracion * 1e6, 1),
+                "args": {f"{fase}_ms": round(s * 1000, 3) for fase, s in r.desglose().items()},
+            })
+            for f in r.fases:
+                eventos.append({
+                    "name": f.nombre, "cat": "fase", "ph": "X", "pid": pid, "tid": f.hilo,
+                    "ts": round((f.inicio - self._origen) * 1e6, 1), "dur": round(f.duracion * 1e6, 1),
+                    "args": {"refresco": r.nombre, "sql_ms": round(f.sql * 1000, 3),
+                             "exclusiva_ms": round(f.exclusiva * 1000, 3)},
+                })
+        with open(destino, "w", encoding="utf-8") as archivo:
+            json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, archivo, ensure_ascii=False)
+        return len(refrescos)
+
+
+medidor = MedidorUI()
+medidor.configurar_desde_entorno()
+
+
+def medido(nombre: str | None = None):
+    """Decorador de métodos de frames: mide cada llamada como un refresco ("Clase.metodo" por default)."""
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            if not medidor.activo:
+                return metodo(self, *args, **kwargs)
+            with medidor.refresco(nombre or f"{type(self).__name__}.{metodo.__name__}"):
+                return metodo(self, *args, **kwargs)
+        return envoltura
+    return decorador
+
+
+class BarraRendimiento(ttk.Frame):
+    """
+    Barra de estado para desarrollo: desglose del último refresco medido, estadísticas móviles
+    de todos ("Detalle") y exportación de la traza.
+    """
+    INTERVALO_MS = 250
+
+    def __init__(self, master=None):
+        super().__init__(master, padding=(10, 2), style="Card.TFrame")
+        self.columnconfigure(0, weight=1)
+        self.lbl = ttk.Label(self, text=medidor.texto_ultimo(), anchor="w")
+        self.lbl.grid(row=0, column=0, sticky="ew")
+        ttk.Button(self, text="Detalle", style="Ghost.TButton", command=self._detalle).grid(row=0, column=1, padx=(8, 0))
+        ttk.Button(self, text="Exportar traza", style="Ghost.TButton", command=self._exportar).grid(row=0, column=2, padx=(8, 0))
+        self._version = -1
+        self._tabla = None  # SimpleTable de la ventana "Detalle", si está abierta
+        self._actualizar()
+
+    def _actualizar(self) -> None:
+        if medidor.version != self._version:
+            self._version = medidor.version
+            self.lbl.configure(text=medidor.texto_ultimo())
+            if self._tabla is not None and self._tabla.winfo_exists():
+                self._cargar_detalle()
+        self.after(self.INTERVALO_MS, self._actualizar)
+
+    def _detalle(self) -> None:
+        if self._tabla is not None and self._tabla.winfo_exists():
+            self._tabla.winfo_toplevel().lift()
+            return
+        from tk_src.table_view import SimpleTable  # table_view usa este módulo
+        ventana = tk.Toplevel(self)
+        ventana.title("Rendimiento de la UI")
+        cols = [
+            {"id": "refresco", "title": "Refresco", "width": 260, "stretch": True, "anchor": "w"},
+            {"id": "n", "title": "n", "width": 50, "stretch": False, "anchor": "e"},
+            {"id": "p50", "title": "p50 ms", "width": 70, "stretch": False, "anchor": "e"},
+            {"id": "p90", "title": "p90 ms", "width": 70, "stretch": False, "anchor": "e"},
+            {"id": "max", "title": "máx ms", "width": 70, "stretch": False, "anchor": "e"},
+            {"id": "fases", "title": "Promedio por fase (ms)", "width": 420, "stretch": True, "anchor": "w"},
+        ]
+        self._tabla = SimpleTable(ventana, columns=cols)
+        self._tabla.pack(fill="both", expand=True, padx=8, pady=8)
+        self._cargar_detalle()
+
+    def _cargar_detalle(self) -> None:
+        self._tabla.set_rows(
+            medidor.estadisticas(),
+            iid_getter=lambda f: f[0],
+            values_getter=lambda f: (
+                f[0], f[1], f"{f[2] * 1000:.1f}", f"{f[3] * 1000:.1f}", f"{f[4] * 1000:.1f}",
+                "  ".join(f"{fase} {s * 1000:.1f}" for fase, s in f[5].items()),
+            ),
+        )
+
+    def _exportar(self) -> None:
+        destino = filedialog.asksaveasfilename(
+            title="Exportar traza", defaultextension=".json", initialfile="traza_ui.json",
+            filetypes=[("Chrome Trace (JSON)", "*.json")])
+        if not destino:
+            return
+        try:
+            n = medidor.exportar_traza(destino)
+        except OSError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        messagebox.showinfo("Traza", f"{n} refrescos exportados a {destino}.")